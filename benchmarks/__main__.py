@@ -0,0 +1,53 @@
+
+"""
+Run the offline micro-benchmark suite.
+
+    python -m benchmarks [--quick] [--only NAME ...] [--output results.json]
+
+Results are printed as JSON: one record per measurement with the benchmark name, the metric, its
+value and unit, and the parameters it was measured with, so runs can be diffed over time.
+"""
+
+import sys
+import json
+import time
+import platform
+import argparse
+import traceback
+
+from typing import List
+
+from benchmarks.suite import BENCHMARKS
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for wela_agents.")
+    parser.add_argument("--quick", action="store_true", help="use smaller inputs and fewer iterations")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": [],
+        "errors": {}
+    }
+    for name in args.only or list(BENCHMARKS):
+        print(f"running {name} ...", file=sys.stderr)
+        try:
+            report["results"].extend(BENCHMARKS[name](args.quick))
+        except Exception:
+            report["errors"][name] = traceback.format_exc().strip().splitlines()[-1]
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+
+"""
+A deterministic stand-in for `TextEmbedding` that needs no model download.
+
+Every word is hashed into one of `dimension` buckets, so related sentences still share dimensions
+and vector search returns meaningful neighbours, while the cost stays negligible next to Qdrant.
+"""
+
+import zlib
+import numpy as np
+
+from typing import Any
+from typing import Dict
+from typing import List
+
+class HashEmbedding:
+
+    def __init__(self, dimension: int = 512) -> None:
+        self.__dimension: int = dimension
+        self.calls: int = 0
+
+    @property
+    def model_name(self) -> str:
+        return "hash-embedding"
+
+    def set_callback(self, callback: Any) -> None:
+        pass
+
+    def __vector(self, sentence: str) -> np.ndarray:
+        vector = np.zeros(self.__dimension, dtype=np.float32)
+        for word in sentence.lower().split():
+            vector[zlib.crc32(word.encode("utf-8")) % self.__dimension] += 1.0
+        vector[zlib.crc32(sentence.encode("utf-8")) % self.__dimension] += 0.1
+        return vector / np.linalg.norm(vector)
+
+    def embed(self, source_sentence: List[str]) -> np.ndarray:
+        self.calls += 1
+        return np.stack([self.__vector(sentence) for sentence in source_sentence])
+
+    def compare_sentences(self, source_sentence: List[str], sentences_to_compare: List[str]) -> List[Dict[str, Any]]:
+        text_embedding = self.embed(source_sentence + sentences_to_compare)
+        source_len = len(source_sentence)
+        return [
+            {
+                "sentence": sentence,
+                "text_embedding": text_embedding[source_len + idx],
+                "score": float(np.dot(text_embedding[0], text_embedding[source_len + idx]))
+            }
+            for idx, sentence in enumerate(sentences_to_compare)
+        ]
+
+__all__ = [
+    "HashEmbedding"
+]
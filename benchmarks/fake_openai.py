@@ -0,0 +1,184 @@
+
+"""
+A local OpenAI-compatible chat completions endpoint for offline benchmarks.
+
+The server answers `POST /v1/chat/completions` deterministically. While the conversation holds fewer
+than `tool_rounds` tool messages and the request offers tools, it calls the first tool; otherwise it
+replies with `reply_tokens` short tokens. Both plain and streamed (SSE) responses are supported.
+Every response can be held back by `delay` seconds, and a `status` other than 200 answers every
+request with that error, to stand in for slow or failing replicas. With `rate_limit` set, only that
+many requests are accepted per `rate_window` seconds and the rest are answered with a 429 that
+carries `retry-after-ms`, like a provider enforcing a requests-per-minute limit.
+"""
+
+import json
+import time
+import threading
+
+from http.server import ThreadingHTTPServer
+from http.server import BaseHTTPRequestHandler
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+class FakeOpenAIServer:
+
+    def __init__(self, reply_tokens: int = 32, tool_rounds: int = 0, tool_arguments: str = "{}", delay: float = 0.0, status: int = 200, rate_limit: int = 0, rate_window: float = 1.0) -> None:
+        self.reply_tokens: int = reply_tokens
+        self.tool_rounds: int = tool_rounds
+        self.tool_arguments: str = tool_arguments
+        self.delay: float = delay
+        self.status: int = status
+        self.rate_limit: int = rate_limit
+        self.rate_window: float = rate_window
+        self.requests: int = 0
+        self.throttled: int = 0
+        self.__accepted: List[float] = []
+        self.__lock: threading.Lock = threading.Lock()
+        self.__server: Optional[ThreadingHTTPServer] = None
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *_: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                fake.requests += 1
+                if fake.delay:
+                    time.sleep(fake.delay)
+                retry_after = fake.admit()
+                if retry_after is not None:
+                    self.__send_json({"error": {"message": "rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}, 429, {"retry-after-ms": str(int(retry_after * 1000))})
+                elif fake.status != 200:
+                    self.__send_json({"error": {"message": "fake failure", "type": "server_error"}}, fake.status)
+                elif body.get("stream"):
+                    self.__send_stream(body)
+                else:
+                    self.__send_json(fake.completion(body))
+
+            def __send_json(self, payload: Dict[str, Any], status: int = 200, headers: Dict[str, str] = {}) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def __send_stream(self, body: Dict[str, Any]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in fake.chunks(body):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.__server.daemon_threads = True
+        # clients drop connections of hedged or cancelled requests, which is not an error here
+        self.__server.handle_error = lambda *_: None
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def admit(self) -> Optional[float]:
+        """Return None if a request is within `rate_limit`, else the seconds until one would be."""
+        if not self.rate_limit:
+            return None
+        with self.__lock:
+            now = time.monotonic()
+            self.__accepted = [accepted for accepted in self.__accepted if accepted > now - self.rate_window]
+            if len(self.__accepted) < self.rate_limit:
+                self.__accepted.append(now)
+                return None
+            self.throttled += 1
+            return self.__accepted[0] + self.rate_window - now
+
+    def __wants_tool(self, body: Dict[str, Any]) -> bool:
+        tool_messages = sum(1 for message in body.get("messages", []) if message.get("role") == "tool")
+        return bool(body.get("tools")) and tool_messages < self.tool_rounds
+
+    def __tool_call(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": f"call_{self.requests}",
+            "type": "function",
+            "function": {
+                "name": body["tools"][0]["function"]["name"],
+                "arguments": self.tool_arguments
+            }
+        }
+
+    def __tokens(self) -> List[str]:
+        return [f"tok{idx} " for idx in range(self.reply_tokens)]
+
+    def __envelope(self, body: Dict[str, Any], obj: str, choices: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{self.requests}",
+            "object": obj,
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": choices
+        }
+
+    def completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        if self.__wants_tool(body):
+            message = {"role": "assistant", "content": None, "tool_calls": [self.__tool_call(body)]}
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": "".join(self.__tokens())}
+            finish_reason = "stop"
+        payload = self.__envelope(body, "chat.completion", [{"index": 0, "message": message, "finish_reason": finish_reason}])
+        payload["usage"] = {"prompt_tokens": 0, "completion_tokens": self.reply_tokens, "total_tokens": self.reply_tokens}
+        return payload
+
+    def chunks(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+            return self.__envelope(body, "chat.completion.chunk", [{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+        if self.__wants_tool(body):
+            tool_call = self.__tool_call(body)
+            chunks = [
+                chunk({"role": "assistant", "tool_calls": [{"index": 0, "id": tool_call["id"], "type": "function", "function": {"name": tool_call["function"]["name"], "arguments": ""}}]}),
+                chunk({"tool_calls": [{"index": 0, "function": {"arguments": tool_call["function"]["arguments"]}}]}),
+                chunk({}, "tool_calls")
+            ]
+        else:
+            chunks = [chunk({"role": "assistant", "content": ""})] + [chunk({"content": token}) for token in self.__tokens()] + [chunk({}, "stop")]
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = self.__envelope(body, "chat.completion.chunk", [])
+            usage["usage"] = {"prompt_tokens": 0, "completion_tokens": self.reply_tokens, "total_tokens": self.reply_tokens}
+            chunks.append(usage)
+        return chunks
+
+__all__ = [
+    "FakeOpenAIServer"
+]
@@ -0,0 +1,142 @@
+
+"""
+Import time regression check.
+
+Every scenario imports its modules in a fresh interpreter and reports the wall time together with
+the heavy optional dependencies that ended up in `sys.modules`. The exit status is non-zero when a
+scenario exceeds its budget, loads a dependency it must not load, or fails to import. A scenario is
+only skipped when the module it is missing is listed in its `optional` dependencies.
+
+    python -m benchmarks.import_time [--budget SECONDS] [--json]
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+
+from typing import Any
+from typing import Dict
+from typing import List
+
+HEAVY_MODULES: List[str] = [
+    "torch",
+    "transformers",
+    "modelscope",
+    "PIL",
+    "qdrant_client",
+    "numpy"
+]
+
+# (scenario name, modules to import, heavy modules the scenario must not load, and optionally the
+# dependencies whose absence skips the scenario instead of failing it)
+SCENARIOS: List[Dict[str, Any]] = [
+    {
+        "name": "meta",
+        "modules": ["wela_agents.agents.meta", "wela_agents.models.openai_chat"],
+        "forbidden": ["torch", "transformers", "modelscope", "PIL", "qdrant_client"]
+    },
+    {
+        "name": "templates",
+        "modules": ["wela_agents.schema.template.openai_chat"],
+        "forbidden": ["torch", "transformers", "modelscope", "PIL", "qdrant_client"]
+    },
+    {
+        "name": "text_embedding",
+        "modules": ["wela_agents.embedding.text_embedding"],
+        "forbidden": ["torch", "transformers", "modelscope"]
+    },
+    {
+        "name": "qdrant_memory",
+        "modules": ["wela_agents.memory.openai_chat.qdrant_memory", "wela_agents.memory.openai_chat.window_qdrant_memory"],
+        "forbidden": ["torch", "transformers", "modelscope"]
+    },
+    {
+        "name": "qdrant_retriever",
+        "modules": ["wela_agents.retriever.qdrant_retriever"],
+        "forbidden": ["torch", "transformers", "modelscope"]
+    }
+]
+
+PROBE = """
+import sys
+import json
+import time
+import importlib
+
+modules = json.loads(sys.argv[1])
+heavy = json.loads(sys.argv[2])
+timings = {}
+start = time.perf_counter()
+for module in modules:
+    module_start = time.perf_counter()
+    try:
+        importlib.import_module(module)
+    except ModuleNotFoundError as e:
+        print(json.dumps({"missing": (e.name or "").split(".")[0], "error": str(e)}))
+        sys.exit(0)
+    timings[module] = time.perf_counter() - module_start
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "modules": timings,
+    "loaded": [name for name in heavy if name in sys.modules]
+}))
+"""
+
+def measure(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(scenario["modules"]), json.dumps(HEAVY_MODULES)],
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"name": scenario["name"], "error": lines[-1] if lines else f"exit status {completed.returncode}"}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["name"] = scenario["name"]
+    if "missing" in result:
+        if result["missing"] in scenario.get("optional", []):
+            return {"name": scenario["name"], "skipped": result["error"]}
+        return {"name": scenario["name"], "error": result["error"]}
+    result["violations"] = [name for name in scenario["forbidden"] if name in result["loaded"]]
+    return result
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report wela_agents import time per module.")
+    parser.add_argument("--budget", type=float, default=1.0, help="maximum seconds allowed for the meta scenario")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    results = [measure(scenario) for scenario in SCENARIOS]
+    failed = False
+    for result in results:
+        if "skipped" in result:
+            continue
+        if "error" in result:
+            failed = True
+            continue
+        result["over_budget"] = result["name"] == "meta" and result["seconds"] > args.budget
+        failed = failed or result["over_budget"] or len(result["violations"]) > 0
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            if "skipped" in result:
+                print(f"{result['name']:<18} skipped: {result['skipped']}")
+                continue
+            if "error" in result:
+                print(f"{result['name']:<18} FAIL: {result['error']}")
+                continue
+            status = "FAIL" if result["over_budget"] or result["violations"] else "ok"
+            print(f"{result['name']:<18} {result['seconds'] * 1000:8.1f} ms  {status}")
+            for module, seconds in result["modules"].items():
+                print(f"    {module:<56} {seconds * 1000:8.1f} ms")
+            if result["loaded"]:
+                print(f"    loaded: {', '.join(result['loaded'])}")
+            if result["violations"]:
+                print(f"    must not load: {', '.join(result['violations'])}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
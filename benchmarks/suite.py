@@ -0,0 +1,296 @@
+
+"""
+Micro-benchmarks for the agent hot paths.
+
+Everything runs offline: chat requests go to a local `FakeOpenAIServer`, vectors come from
+`HashEmbedding`, and Qdrant runs in-process with `QdrantClient(":memory:")`.
+"""
+
+import os
+import time
+import tempfile
+import statistics
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Callable
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fake_embedding import HashEmbedding
+
+Result = Dict[str, Any]
+
+def result(benchmark: str, metric: str, value: float, unit: str, **params: Any) -> Result:
+    return {
+        "benchmark": benchmark,
+        "metric": metric,
+        "value": value,
+        "unit": unit,
+        "params": params
+    }
+
+def measure(func: Callable[[], Any], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        func()
+    samples: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    }
+
+def bench_template_format(quick: bool) -> List[Result]:
+    from wela_agents.schema.template.openai_chat import ChatTemplate
+    from wela_agents.schema.template.openai_chat import MessagePlaceholder
+    from wela_agents.schema.template.openai_chat import SystemMessageTemplate
+    from wela_agents.schema.template.prompt_template import StringPromptTemplate
+
+    template = ChatTemplate([
+        SystemMessageTemplate(StringPromptTemplate("You are a helpful assistant. " * 20)),
+        MessagePlaceholder(placeholder_key="memory"),
+        SystemMessageTemplate(StringPromptTemplate("Current time is: {time}. User name: {name}.")),
+        MessagePlaceholder(placeholder_key="__input__")
+    ])
+    kwargs = {
+        "time": "2024-01-01 00:00:00",
+        "name": "wela",
+        "memory": [{"role": "user", "content": "hello"}] * 10,
+        "__input__": [{"role": "user", "content": "how are you?"}]
+    }
+    iterations = 2000 if quick else 20000
+    stats = measure(lambda: template.format(**kwargs), iterations)
+    return [result("template_format", "formats_per_second", 1.0 / stats["mean"], "1/s", iterations=iterations)]
+
+def bench_tool_loop(quick: bool) -> List[Result]:
+    from wela_agents.agents.llm import LLMAgent
+    from wela_agents.toolkit.tool import Tool
+    from wela_agents.toolkit.toolkit import Toolkit
+    from wela_agents.models.openai_chat import OpenAIChat
+    from wela_agents.schema.template.openai_chat import ChatTemplate
+    from wela_agents.schema.template.openai_chat import MessagePlaceholder
+
+    class NoopTool(Tool):
+        def __init__(self) -> None:
+            super().__init__(name="noop", description="Does nothing.", required=[])
+
+        def _invoke(self, callback: Callable = None, **kwargs: Any) -> Any:
+            return {"result": "ok"}
+
+    results: List[Result] = []
+    rounds = 4
+    iterations = 10 if quick else 50
+    with FakeOpenAIServer(reply_tokens=8, tool_rounds=rounds) as server:
+        for stream in (False, True):
+            model = OpenAIChat(model_name="fake", api_key="sk-benchmark", base_url=server.base_url, stream=stream)
+            agent = LLMAgent(
+                model=model,
+                prompt_template=ChatTemplate([MessagePlaceholder(placeholder_key="__input__")]),
+                toolkit=Toolkit([NoopTool()]),
+                max_loop=rounds + 1
+            )
+            def run() -> Any:
+                prediction = agent.predict(__input__=[{"role": "user", "content": "go"}])
+                if stream:
+                    for _ in prediction:
+                        pass
+            stats = measure(run, iterations)
+            results.append(result("tool_loop", "seconds_per_iteration", stats["mean"] / (rounds + 1), "s", stream=stream, rounds=rounds))
+    return results
+
+def bench_stream_accumulation(quick: bool) -> List[Result]:
+    from wela_agents.models.stream_accumulator import StreamAccumulator
+
+    results: List[Result] = []
+    for tokens in ([1000, 10000] if quick else [1000, 10000, 100000]):
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": f"tok{idx} "} for idx in range(tokens)]
+        def run() -> Any:
+            accumulator = StreamAccumulator()
+            for delta in deltas:
+                accumulator.add(delta)
+            return accumulator.message()
+        stats = measure(run, 3 if quick else 10)
+        results.append(result("stream_accumulation", "seconds_per_token", stats["mean"] / tokens, "s", tokens=tokens))
+
+    from wela_agents.agents.llm import LLMAgent
+    from wela_agents.models.openai_chat import OpenAIChat
+    from wela_agents.schema.template.openai_chat import ChatTemplate
+    from wela_agents.schema.template.openai_chat import MessagePlaceholder
+
+    tokens = 500 if quick else 2000
+    with FakeOpenAIServer(reply_tokens=tokens) as server:
+        model = OpenAIChat(model_name="fake", api_key="sk-benchmark", base_url=server.base_url, stream=True)
+        for stream_mode in ("message", "delta"):
+            agent = LLMAgent(
+                model=model,
+                prompt_template=ChatTemplate([MessagePlaceholder(placeholder_key="__input__")]),
+                stream_mode=stream_mode
+            )
+            def run() -> Any:
+                for _ in agent.predict(__input__=[{"role": "user", "content": "go"}]):
+                    pass
+            stats = measure(run, 3 if quick else 10)
+            results.append(result("stream_agent", "seconds_per_token", stats["mean"] / tokens, "s", tokens=tokens, stream_mode=stream_mode))
+    return results
+
+def bench_memory(quick: bool) -> List[Result]:
+    from qdrant_client import QdrantClient
+    from wela_agents.memory.openai_chat.qdrant_memory import QdrantMemory
+    from wela_agents.memory.openai_chat.window_qdrant_memory import WindowQdrantMemory
+    from wela_agents.memory.openai_chat.numpy_memory import NumpyMemory
+    from wela_agents.memory.openai_chat.window_numpy_memory import WindowNumpyMemory
+
+    results: List[Result] = []
+    checkpoints = [100, 500] if quick else [100, 1000, 5000]
+    for memory_class in (QdrantMemory, WindowQdrantMemory, NumpyMemory, WindowNumpyMemory):
+        if memory_class in (QdrantMemory, WindowQdrantMemory):
+            memory = memory_class("benchmark_memory", HashEmbedding(), QdrantClient(":memory:"))
+        else:
+            memory = memory_class("benchmark_memory", HashEmbedding())
+        saved = 0
+        for checkpoint in checkpoints:
+            while saved < checkpoint:
+                memory.save_context({"role": "user", "content": f"message {saved} about topic {saved % 17}"})
+                saved += 1
+            query = [{"role": "user", "content": [{"type": "text", "text": "topic 3"}, {"type": "text", "text": "message 42"}]}]
+            get_stats = measure(lambda: memory.get_contexts(query), 10 if quick else 50)
+            save_stats = measure(lambda: memory.save_context({"role": "assistant", "content": "ok"}), 10 if quick else 50, warmup=0)
+            saved += (10 if quick else 50)
+            results.append(result("memory_get_contexts", "seconds", get_stats["p50"], "s", memory=memory_class.__name__, history=checkpoint))
+            results.append(result("memory_save_context", "seconds", save_stats["p50"], "s", memory=memory_class.__name__, history=checkpoint))
+    return results
+
+def bench_write_behind(quick: bool) -> List[Result]:
+    from qdrant_client import QdrantClient
+    from wela_agents.memory.openai_chat.qdrant_memory import QdrantMemory
+    from wela_agents.memory.write_behind_memory import WriteBehindMemory
+
+    results: List[Result] = []
+    turns = 100 if quick else 1000
+    for mode in ("sync", "write_behind"):
+        memory = QdrantMemory("benchmark_write_behind", HashEmbedding(), QdrantClient(":memory:"))
+        if mode == "write_behind":
+            memory = WriteBehindMemory(memory)
+        samples: List[float] = []
+        start = time.perf_counter()
+        for turn in range(turns):
+            turn_start = time.perf_counter()
+            memory.save_contexts([
+                {"role": "user", "content": f"question {turn} about topic {turn % 17}"},
+                {"role": "assistant", "content": f"answer {turn} about topic {turn % 17}"}
+            ])
+            samples.append(time.perf_counter() - turn_start)
+        if isinstance(memory, WriteBehindMemory):
+            memory.close()
+        total = time.perf_counter() - start
+        samples.sort()
+        results.append(result("write_behind", "turn_save_seconds", samples[len(samples) // 2], "s", mode=mode, turns=turns))
+        results.append(result("write_behind", "total_seconds", total, "s", mode=mode, turns=turns))
+    return results
+
+def bench_add_documents(quick: bool) -> List[Result]:
+    from qdrant_client import QdrantClient
+    from wela_agents.retriever.qdrant_retriever import QdrantRetriever
+
+    documents = 2000 if quick else 20000
+    retriever = QdrantRetriever("benchmark_documents", HashEmbedding(), QdrantClient(":memory:"))
+    report = retriever.add_documents(
+        {"metadata": {"idx": idx}, "page_content": f"document {idx} about subject {idx % 31}"}
+        for idx in range(documents)
+    )
+    return [result("add_documents", "docs_per_second", report["docs_per_second"], "1/s", documents=documents)]
+
+def bench_hybrid_retrieval(quick: bool) -> List[Result]:
+    from qdrant_client import QdrantClient
+    from wela_agents.retriever.qdrant_retriever import QdrantRetriever
+    from wela_agents.retriever.hybrid_retriever import HybridRetriever
+
+    documents = 500 if quick else 5000
+    dense = QdrantRetriever("benchmark_hybrid", HashEmbedding(), QdrantClient(":memory:"), limit=5)
+    hybrid = HybridRetriever("benchmark_hybrid", dense, limit=5)
+    hybrid.add_documents(
+        {"metadata": {"idx": idx}, "page_content": f"Service {idx % 17} failed with error ERR-{1000 + idx} while syncing subject {idx % 31}"}
+        for idx in range(documents)
+    )
+    queries = [f"ERR-{1000 + idx}" for idx in range(0, documents, max(1, documents // 50))]
+    results: List[Result] = []
+    for name, retriever in (("dense", dense), ("hybrid", hybrid)):
+        hits = sum(1 for query in queries if any(query in document["page_content"] for document in retriever.retrieve(query)))
+        stats = measure(lambda: [retriever.retrieve(query) for query in queries], 3 if quick else 10)
+        results.append(result("hybrid_retrieval", "hit_rate", hits / len(queries), "ratio", retriever=name, documents=documents))
+        results.append(result("hybrid_retrieval", "seconds_per_query", stats["p50"] / len(queries), "s", retriever=name, documents=documents))
+    return results
+
+def bench_encode_image(quick: bool) -> List[Result]:
+    from PIL import Image
+    from wela_agents.schema.template.image_encoder import ImageEncoder
+
+    results: List[Result] = []
+    with tempfile.TemporaryDirectory() as directory:
+        image = Image.linear_gradient("L").resize((1920, 1080)).convert("RGB")
+        paths = []
+        for extension in ("jpg", "png"):
+            path = os.path.join(directory, f"screenshot.{extension}")
+            image.save(path)
+            paths.append(path)
+            cold = ImageEncoder(cache_size=0)
+            stats = measure(lambda: cold.encode(path), 5 if quick else 20)
+            results.append(result("encode_image", "seconds", stats["p50"], "s", format=extension, size="1920x1080", cache="cold"))
+            cached = ImageEncoder()
+            stats = measure(lambda: cached.encode(path), 50 if quick else 200)
+            results.append(result("encode_image", "seconds", stats["p50"], "s", format=extension, size="1920x1080", cache="warm"))
+
+        batch = []
+        for idx in range(8):
+            path = os.path.join(directory, f"page{idx}.jpg")
+            image.save(path)
+            batch.append(path)
+        for max_workers in (1, 4):
+            encoder = ImageEncoder(cache_size=0, max_workers=max_workers)
+            stats = measure(lambda: encoder.encode_many(batch), 3 if quick else 10)
+            results.append(result("encode_images", "seconds", stats["p50"], "s", images=len(batch), max_workers=max_workers))
+    return results
+
+def bench_rate_limit(quick: bool) -> List[Result]:
+    from concurrent.futures import ThreadPoolExecutor
+    from wela_agents.models.openai_chat import OpenAIChat
+    from wela_agents.models.rate_limiter import RateLimitScheduler
+
+    results: List[Result] = []
+    rate_limit, rate_window = 20, 1.0
+    requests = 40 if quick else 120
+    messages = [{"role": "user", "content": "hello"}]
+    for scheduled in (False, True):
+        with FakeOpenAIServer(reply_tokens=8, rate_limit=rate_limit, rate_window=rate_window) as server:
+            scheduler = RateLimitScheduler(requests_per_minute=rate_limit * 60 / rate_window) if scheduled else None
+            model = OpenAIChat(model_name="fake", api_key="EMPTY", base_url=server.base_url, max_retries=0 if scheduled else 5, scheduler=scheduler)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                list(executor.map(lambda _: model.predict(messages=messages), range(requests)))
+            elapsed = time.perf_counter() - start
+            results.append(result("rate_limit", "requests_per_second", requests / elapsed, "req/s", requests=requests, limit=rate_limit / rate_window, scheduled=scheduled))
+            results.append(result("rate_limit", "throttled", server.throttled, "responses", requests=requests, limit=rate_limit / rate_window, scheduled=scheduled))
+    return results
+
+BENCHMARKS: Dict[str, Callable[[bool], List[Result]]] = {
+    "template_format": bench_template_format,
+    "tool_loop": bench_tool_loop,
+    "stream_accumulation": bench_stream_accumulation,
+    "memory": bench_memory,
+    "write_behind": bench_write_behind,
+    "add_documents": bench_add_documents,
+    "hybrid_retrieval": bench_hybrid_retrieval,
+    "encode_image": bench_encode_image,
+    "rate_limit": bench_rate_limit
+}
+
+__all__ = [
+    "BENCHMARKS",
+    "measure",
+    "result"
+]
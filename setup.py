@@ -12,7 +12,7 @@ if __name__ == "__main__":
 	setup(
 		name = "wela_agents",
 		version = "0.0.13",
-		packages = find_packages(),
+		packages = find_packages(exclude=["benchmarks", "benchmarks.*"]),
 		install_requires = requirements,
 		description="An agent framework for Wela",
 		long_description = long_description,
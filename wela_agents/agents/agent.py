@@ -1,9 +1,15 @@
 
 from abc import ABC
 from abc import abstractmethod
+from types import GeneratorType
 from typing import Any
 from typing import Union
 from typing import Generator
+from typing import AsyncGenerator
+
+from wela_agents.callback.callback import Callback
+from wela_agents.utils.concurrency import run_in_thread
+from wela_agents.utils.concurrency import iterate_in_thread
 
 class Agent(ABC):
 
@@ -23,10 +29,32 @@ class Agent(ABC):
     def output_key(self) -> str:
         return self.__output_key
 
+    @property
+    def consumes_stream(self) -> bool:
+        """
+        Whether this agent reads a streamed input incrementally. A pipelined sequential agent hands such
+        an agent the live stream of the stage before it, and every other agent the completed message.
+        The built-in agents format complete messages into their prompts and return False; this is a
+        hook for custom stages, such as one that forwards or filters chunks as they arrive.
+        """
+        return False
+
+    def set_callback(self, callback: Callback) -> None:
+        """
+        Pass a callback down to the components of this agent that report events.
+        """
+        pass
+
     @abstractmethod
     def predict(self, **kwargs: Any) -> Union[Any, Generator[Any, None, None]]:
         pass
 
+    async def apredict(self, **kwargs: Any) -> Union[Any, AsyncGenerator[Any, None]]:
+        prediction = await run_in_thread(self.predict, **kwargs)
+        if isinstance(prediction, GeneratorType):
+            return iterate_in_thread(prediction)
+        return prediction
+
 __all__ = [
     "Agent"
 ]
@@ -0,0 +1,118 @@
+
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Optional
+from typing_extensions import TypedDict
+
+from wela_agents.models.token_counter import TokenCounter
+from wela_agents.schema.prompt.openai_chat import Message
+from wela_agents.schema.prompt.openai_chat import ToolMessage
+
+OMITTED_TOOL_RESULT = "[This tool result was omitted to fit the context budget.]"
+
+class BudgetReport(TypedDict):
+    budget: int
+    """The configured prompt budget in tokens."""
+
+    prompt_tokens: int
+    """Tokens of the last prompt sent to the model, after trimming."""
+
+    dropped: Dict[str, int]
+    """Messages dropped per section: `memory`, `knowledge`, `tool_results` and `attachments`."""
+
+    dropped_tokens: int
+    """Tokens removed from the prompt in total."""
+
+class ContextBudget:
+    """
+    Keep the prompt of every model call within `max_prompt_tokens`.
+
+    Memory and retrieved knowledge are filled into the space the rest of the prompt leaves, section by
+    section in `priority` order: memory keeps its most recent messages and knowledge its best ranked
+    documents. Within the tool loop, results and attachments of earlier rounds are replaced or dropped,
+    oldest first, while the prompt is still over budget; the latest round is always sent in full.
+
+    To see what a call trimmed, pass a report from `new_report` to the agent as `__budget_report__`;
+    it is filled in place. A report per call keeps concurrent calls of one agent apart.
+    """
+
+    def __init__(self, max_prompt_tokens: int, counter: Optional[TokenCounter] = None, priority: List[str] = ["memory", "knowledge"]) -> None:
+        self.__max_prompt_tokens: int = max_prompt_tokens
+        self.__counter: TokenCounter = counter or TokenCounter()
+        self.__priority: List[str] = list(priority)
+
+    @property
+    def max_prompt_tokens(self) -> int:
+        return self.__max_prompt_tokens
+
+    @property
+    def counter(self) -> TokenCounter:
+        return self.__counter
+
+    def new_report(self) -> BudgetReport:
+        return BudgetReport(budget=self.__max_prompt_tokens, prompt_tokens=0, dropped={}, dropped_tokens=0)
+
+    def __drop(self, report: BudgetReport, section: str, tokens: int) -> None:
+        report["dropped"][section] = report["dropped"].get(section, 0) + 1
+        report["dropped_tokens"] += tokens
+
+    def fit_sections(self, base_tokens: int, sections: Dict[str, Tuple[List[Message], bool]], report: BudgetReport) -> Dict[str, List[Message]]:
+        """
+        Fit the messages of each section into the tokens left after `base_tokens`.
+
+        Every section maps to its messages and whether its newest (last) messages are kept first.
+        Returns the kept messages of every section, in their original order.
+        """
+        remaining = self.__max_prompt_tokens - base_tokens
+        order = [name for name in self.__priority if name in sections] + [name for name in sections if name not in self.__priority]
+        kept: Dict[str, List[Message]] = {}
+        for name in order:
+            messages, keep_newest = sections[name]
+            candidates = list(reversed(messages)) if keep_newest else list(messages)
+            selected: List[Message] = []
+            for idx, message in enumerate(candidates):
+                tokens = self.__counter.count_message(message)
+                if tokens > remaining:
+                    for dropped_message in candidates[idx:]:
+                        self.__drop(report, name, self.__counter.count_message(dropped_message))
+                    break
+                remaining -= tokens
+                selected.append(message)
+            kept[name] = list(reversed(selected)) if keep_newest else selected
+        return kept
+
+    def fit_tool_results(self, messages: List[Message], start: int, report: BudgetReport) -> None:
+        """
+        Trim the tool results appended to `messages` from index `start` on, in place, until the prompt
+        fits the budget, and record the size of the prompt in `report`.
+        """
+        total = self.__counter.count_messages(messages)
+        if total > self.__max_prompt_tokens:
+            latest_round = len(messages)
+            for idx in range(len(messages) - 1, start - 1, -1):
+                if messages[idx].get("tool_calls", None):
+                    latest_round = idx
+                    break
+            idx = start
+            while idx < latest_round and total > self.__max_prompt_tokens:
+                message = messages[idx]
+                tokens = self.__counter.count_message(message)
+                if message["role"] == "user":
+                    del messages[idx]
+                    latest_round -= 1
+                    total -= tokens
+                    self.__drop(report, "attachments", tokens)
+                    continue
+                if message["role"] == "tool" and message["content"] != OMITTED_TOOL_RESULT:
+                    messages[idx] = ToolMessage(role="tool", content=OMITTED_TOOL_RESULT, tool_call_id=message["tool_call_id"])
+                    saved = tokens - self.__counter.count_message(messages[idx])
+                    total -= saved
+                    self.__drop(report, "tool_results", saved)
+                idx += 1
+        report["prompt_tokens"] = total
+
+__all__ = [
+    "BudgetReport",
+    "ContextBudget"
+]
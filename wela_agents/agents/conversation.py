@@ -1,16 +1,38 @@
 
+import time
+import asyncio
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
 from typing import Any
+from typing import Dict
+from typing import List
 from typing import Union
+from typing import Callable
+from typing import Coroutine
 from typing import Optional
 from typing import Generator
+from typing import AsyncGenerator
 from typing_extensions import Literal
 
 from wela_agents.agents.llm import LLMAgent
+from wela_agents.agents.context_budget import ContextBudget
+from wela_agents.callback.event import MemoryEvent
+from wela_agents.callback.event import RetrieverEvent
+from wela_agents.callback.callback import Callback
+from wela_agents.callback.callback import MemoryCallback
+from wela_agents.callback.callback import RetrieverCallback
 from wela_agents.models.model import Model
-from wela_agents.models.openai_chat import OpenAIChat
+from wela_agents.models.chat_model import ChatModel
+from wela_agents.models.stream_accumulator import final_message
 from wela_agents.memory.memory import Memory
 from wela_agents.toolkit.toolkit import Toolkit
 from wela_agents.retriever.retriever import Retriever
+from wela_agents.schema.document.document import Document
+from wela_agents.schema.document.document import unique_documents
+from wela_agents.schema.prompt.openai_chat import Message
 from wela_agents.schema.prompt.openai_chat import SystemMessage
 from wela_agents.schema.template.prompt_template import PromptTemplate
 
@@ -23,13 +45,18 @@ class ConversationAgent(LLMAgent):
         verbosity: Literal['low', 'medium', 'high'] | None = None,
         max_completion_tokens: Optional[int] = None,
         toolkit: Toolkit = None,
+        parallel_tool_calls: bool = False,
+        max_tool_workers: int = 4,
+        stream_mode: Literal["message", "delta"] = "message",
+        context_budget: Optional[ContextBudget] = None,
         memory: Memory = None,
         retriever: Retriever = None,
+        lookup_timeout: Optional[float] = None,
         input_key: str = "__input__",
         output_key: str = "__output__",
         max_loop: int = 5
     ) -> None:
-        assert isinstance(model, OpenAIChat), "Unsupported model type"
+        assert isinstance(model, ChatModel), "Unsupported model type"
 
         super().__init__(
             model = model,
@@ -38,67 +65,236 @@ class ConversationAgent(LLMAgent):
             verbosity = verbosity,
             max_completion_tokens = max_completion_tokens,
             toolkit = toolkit,
+            parallel_tool_calls = parallel_tool_calls,
+            max_tool_workers = max_tool_workers,
+            stream_mode = stream_mode,
+            context_budget = context_budget,
             input_key = input_key,
             output_key = output_key,
             max_loop = max_loop
         )
         self.__memory: Memory = memory
         self.__retriever: Retriever = retriever
+        self.__lookup_timeout: Optional[float] = lookup_timeout
+        self.__lookup_lock: threading.Lock = threading.Lock()
+        self.__executor: Optional[ThreadPoolExecutor] = None
+        self.__callback: Optional[Callback] = None
 
-    def predict(self, **kwargs: Any) -> Union[Any, Generator[Any, None, None]]:
+    def set_callback(self, callback: Callback) -> None:
+        super().set_callback(callback)
+        self.__callback = callback
         if self.__memory:
-            kwargs[self.__memory.memory_key] = self.__memory.get_contexts(kwargs[self.input_key])
+            self.__memory.set_callback(callback)
+        if self.__retriever:
+            self.__retriever.set_callback(callback)
+
+    def __memory_started(self, operation: Literal["get_contexts", "save_context"]) -> float:
+        if isinstance(self.__callback, MemoryCallback):
+            self.__callback.before_memory_call(MemoryEvent(self.__memory.memory_key, operation))
+        return time.perf_counter()
+
+    def __memory_finished(self, operation: Literal["get_contexts", "save_context"], start: float) -> None:
+        if isinstance(self.__callback, MemoryCallback):
+            self.__callback.after_memory_call(MemoryEvent(self.__memory.memory_key, operation, time.perf_counter() - start))
+
+    def __retrieve_started(self, queries: List[str]) -> float:
+        if isinstance(self.__callback, RetrieverCallback):
+            self.__callback.before_retrieve(RetrieverEvent(self.__retriever.retriever_key, "\n".join(queries)))
+        return time.perf_counter()
+
+    def __retrieve_finished(self, queries: List[str], start: float, documents: List[Document]) -> None:
+        if isinstance(self.__callback, RetrieverCallback):
+            self.__callback.after_retrieve(RetrieverEvent(self.__retriever.retriever_key, "\n".join(queries), time.perf_counter() - start, len(documents)))
+
+    def __session_memory(self, kwargs: Dict[str, Any]) -> Memory:
+        return self.__memory.for_session(kwargs.get("session_id", None))
 
+    def __save_contexts(self, memory: Memory, messages: List[Message]) -> None:
+        start = self.__memory_started("save_context")
+        memory.save_contexts(messages)
+        self.__memory_finished("save_context", start)
+
+    async def __asave_contexts(self, memory: Memory, messages: List[Message]) -> None:
+        start = self.__memory_started("save_context")
+        await memory.asave_contexts(messages)
+        self.__memory_finished("save_context", start)
+
+    def __text_queries(self, messages: List[Message]) -> List[str]:
+        queries: List[str] = []
+        for message in messages:
+            if isinstance(message["content"], str):
+                queries.append(message["content"])
+            else:
+                for content in message["content"]:
+                    if content["type"] == "text":
+                        queries.append(content["text"])
+        return queries
+
+    def __to_knowladge(self, documents: List[Document]) -> List[SystemMessage]:
+        return [
+            SystemMessage(
+                role = "system",
+                content = document["page_content"]
+            )
+            for document in documents
+        ]
+
+    def __fit_context(self, kwargs: Dict[str, Any]) -> None:
+        if self.context_budget is None or not (self.__memory or self.__retriever):
+            return
+        sections = {}
+        if self.__memory:
+            sections["memory"] = (self.__memory.memory_key, kwargs[self.__memory.memory_key], True)
         if self.__retriever:
-            knowladge = []
-            for message in kwargs[self.input_key]:
-                if isinstance(message["content"], str):
-                    knowladge.extend(
-                        [
-                            SystemMessage(
-                                role = "system",
-                                content = document["page_content"]
-                            )
-                            for document in self.__retriever.retrieve(message["content"])
-                        ]
-                    )
-                else:
-                    for content in message["content"]:
-                        if content["type"] == "text":
-                            knowladge.extend(
-                                [
-                                    SystemMessage(
-                                        role = "system",
-                                        content = document["page_content"]
-                                    )
-                                    for document in self.__retriever.retrieve(content["text"])
-                                ]
-                            )
-            kwargs[self.__retriever.retriever_key] = knowladge
+            sections["knowledge"] = (self.__retriever.retriever_key, kwargs[self.__retriever.retriever_key], False)
+        base_messages = self.prompt_template.format(**{**kwargs, **{key: [] for key, _, _ in sections.values()}})
+        report = kwargs.get("__budget_report__", None) or self.context_budget.new_report()
+        kept = self.context_budget.fit_sections(
+            self.context_budget.counter.count_messages(base_messages),
+            {name: (messages, keep_newest) for name, (_, messages, keep_newest) in sections.items()},
+            report
+        )
+        for name, (key, _, _) in sections.items():
+            kwargs[key] = kept[name]
+        kwargs["__budget_report__"] = report
+
+    def __recall(self, memory: Memory, messages: List[Message]) -> List[Message]:
+        start = self.__memory_started("get_contexts")
+        contexts = memory.get_contexts(messages)
+        self.__memory_finished("get_contexts", start)
+        return contexts
+
+    async def __arecall(self, memory: Memory, messages: List[Message]) -> List[Message]:
+        start = self.__memory_started("get_contexts")
+        contexts = await memory.aget_contexts(messages)
+        self.__memory_finished("get_contexts", start)
+        return contexts
 
+    def __retrieve(self, messages: List[Message]) -> List[SystemMessage]:
+        queries = list(dict.fromkeys(self.__text_queries(messages)))
+        start = self.__retrieve_started(queries)
+        documents = unique_documents(document for documents in self.__retriever.retrieve_many(queries) for document in documents) if queries else []
+        self.__retrieve_finished(queries, start, documents)
+        return self.__to_knowladge(documents)
+
+    async def __aretrieve(self, messages: List[Message]) -> List[SystemMessage]:
+        queries = list(dict.fromkeys(self.__text_queries(messages)))
+        start = self.__retrieve_started(queries)
+        documents = unique_documents(document for documents in await self.__retriever.aretrieve_many(queries) for document in documents) if queries else []
+        self.__retrieve_finished(queries, start, documents)
+        return self.__to_knowladge(documents)
+
+    def __lookup_executor(self) -> ThreadPoolExecutor:
+        with self.__lookup_lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="conversation-lookup")
+            return self.__executor
+
+    def close(self) -> None:
+        """
+        Shut down the lookup pool. Queued lookups are dropped; lookups still running, such as ones
+        that timed out against a hung backend, are left to finish on their threads.
+        """
+        with self.__lookup_lock:
+            executor, self.__executor = self.__executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __lookup(self, memory: Optional[Memory], kwargs: Dict[str, Any]) -> None:
+        """
+        Recall memory and retrieve knowledge on the agent's lookup pool of two threads. A lookup that
+        misses `lookup_timeout` contributes no messages to this turn. It is not cancelled, though: it
+        keeps running on its pool thread until it finishes and its result is dropped, so while a
+        backend hangs, later lookups may queue behind it and time out too. Without a timeout, a single
+        lookup runs inline.
+        """
+        lookups: Dict[str, Callable[[], List[Message]]] = {}
+        if memory:
+            lookups[self.__memory.memory_key] = lambda: self.__recall(memory, kwargs[self.input_key])
+        if self.__retriever:
+            lookups[self.__retriever.retriever_key] = lambda: self.__retrieve(kwargs[self.input_key])
+        if not lookups or (len(lookups) == 1 and self.__lookup_timeout is None):
+            for key, lookup in lookups.items():
+                kwargs[key] = lookup()
+            return
+        executor = self.__lookup_executor()
+        futures = {key: executor.submit(lookup) for key, lookup in lookups.items()}
+        wait(futures.values(), timeout=self.__lookup_timeout)
+        for key, future in futures.items():
+            kwargs[key] = future.result() if future.done() else []
+
+    async def __alookup(self, memory: Optional[Memory], kwargs: Dict[str, Any]) -> None:
+        """
+        Like `__lookup`, with the lookups as tasks. Cancelling a timed-out task does not stop work it
+        already handed to a thread, such as a default `aget_contexts` or `aretrieve_many`; that work
+        runs to completion in the background.
+        """
+        lookups: Dict[str, Callable[[], Coroutine[Any, Any, List[Message]]]] = {}
+        if memory:
+            lookups[self.__memory.memory_key] = lambda: self.__arecall(memory, kwargs[self.input_key])
+        if self.__retriever:
+            lookups[self.__retriever.retriever_key] = lambda: self.__aretrieve(kwargs[self.input_key])
+        if not lookups or (len(lookups) == 1 and self.__lookup_timeout is None):
+            for key, lookup in lookups.items():
+                kwargs[key] = await lookup()
+            return
+        tasks = {key: asyncio.ensure_future(lookup()) for key, lookup in lookups.items()}
+        try:
+            await asyncio.wait(tasks.values(), timeout=self.__lookup_timeout)
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+        for key, task in tasks.items():
+            kwargs[key] = task.result() if task.done() and not task.cancelled() else []
+
+    def predict(self, **kwargs: Any) -> Union[Any, Generator[Any, None, None]]:
+        memory = self.__session_memory(kwargs) if self.__memory else None
+        self.__lookup(memory, kwargs)
+        self.__fit_context(kwargs)
         output_message = super().predict(**kwargs)
 
-        if isinstance(self.model, OpenAIChat):
+        if isinstance(self.model, ChatModel):
             if not self.model.streaming:
-                if self.__memory:
-                    for message in kwargs[self.input_key]:
-                        self.__memory.save_context(message)
-                    self.__memory.save_context(output_message)
+                if memory:
+                    self.__save_contexts(memory, [*kwargs[self.input_key], output_message])
                 return output_message
             def stream() -> Generator[Any, None, None]:
                 final_output_messsage = None
                 for message in output_message:
-                    final_output_messsage = message
+                    final_output_messsage = final_message(message) or final_output_messsage
+                    yield message
+                if memory:
+                    self.__save_contexts(memory, [*kwargs[self.input_key], final_output_messsage])
+            return stream()
+
+    async def apredict(self, **kwargs: Any) -> Union[Any, AsyncGenerator[Any, None]]:
+        memory = self.__session_memory(kwargs) if self.__memory else None
+        await self.__alookup(memory, kwargs)
+        self.__fit_context(kwargs)
+        output_message = await super().apredict(**kwargs)
+
+        if isinstance(self.model, ChatModel):
+            if not self.model.streaming:
+                if memory:
+                    await self.__asave_contexts(memory, [*kwargs[self.input_key], output_message])
+                return output_message
+            async def stream() -> AsyncGenerator[Any, None]:
+                final_output_messsage = None
+                async for message in output_message:
+                    final_output_messsage = final_message(message) or final_output_messsage
                     yield message
-                if self.__memory:
-                    for message in kwargs[self.input_key]:
-                        self.__memory.save_context(message)
-                    self.__memory.save_context(final_output_messsage)
+                if memory:
+                    await self.__asave_contexts(memory, [*kwargs[self.input_key], final_output_messsage])
             return stream()
 
-    def reset_memory(self) -> None:
+    def reset_memory(self, session_id: Optional[str] = None) -> None:
+        """Reset the memory, or only the memory of `session_id` when it is a SessionMemory."""
         if self.__memory:
-            self.__memory.reset_memory()
+            if session_id is None:
+                self.__memory.reset_memory()
+            else:
+                self.__memory.for_session(session_id).reset_memory()
 
 __all__ = [
     "ConversationAgent"
@@ -1,19 +1,30 @@
 
 from typing import Any
+from typing import Dict
 from typing import List
 from typing import Union
 from typing import Optional
 from typing import Generator
+from typing import AsyncGenerator
 from typing_extensions import Literal
 
 from wela_agents.agents.agent import Agent
+from wela_agents.agents.context_budget import BudgetReport
+from wela_agents.agents.context_budget import ContextBudget
+from wela_agents.callback.callback import Callback
+from wela_agents.callback.callback import ToolCallback
+from wela_agents.callback.callback import ModelCallback
 from wela_agents.toolkit.toolkit import Toolkit
+from wela_agents.toolkit.tool_result import ToolResult
 from wela_agents.models.model import Model
-from wela_agents.models.openai_chat import OpenAIChat
+from wela_agents.models.chat_model import ChatModel
+from wela_agents.models.stream_accumulator import StreamDelta
+from wela_agents.models.stream_accumulator import StreamEvent
+from wela_agents.models.stream_accumulator import StreamMessage
+from wela_agents.models.stream_accumulator import StreamAccumulator
 from wela_agents.schema.prompt.openai_chat import Message
 from wela_agents.schema.prompt.openai_chat import ImageURL
 from wela_agents.schema.prompt.openai_chat import ToolCall
-from wela_agents.schema.prompt.openai_chat import Function
 from wela_agents.schema.prompt.openai_chat import ToolMessage
 from wela_agents.schema.prompt.openai_chat import UserMessage
 from wela_agents.schema.prompt.openai_chat import ImageContent
@@ -33,11 +44,15 @@ class LLMAgent(Agent):
         logprobs: Optional[int] = None,
         top_logprobs: Optional[int] = None,
         toolkit: Toolkit = None,
+        parallel_tool_calls: bool = False,
+        max_tool_workers: int = 4,
+        stream_mode: Literal["message", "delta"] = "message",
+        context_budget: Optional[ContextBudget] = None,
         input_key: str = "__input__",
         output_key: str = "__output__",
         max_loop: int = 5
     ) -> None:
-        assert isinstance(model, OpenAIChat), "Unsupported model type"
+        assert isinstance(model, ChatModel), "Unsupported model type"
 
         self.__model: Model = model
         self.__prompt_template: PromptTemplate = prompt_template
@@ -49,6 +64,10 @@ class LLMAgent(Agent):
         self.__logprobs: Optional[int] = logprobs
         self.__top_logprobs: Optional[int] = top_logprobs
         self.__toolkit: Toolkit = toolkit
+        self.__parallel_tool_calls: bool = parallel_tool_calls
+        self.__max_tool_workers: int = max_tool_workers
+        self.__stream_mode: Literal["message", "delta"] = stream_mode
+        self.__context_budget: Optional[ContextBudget] = context_budget
         super().__init__(input_key = input_key, output_key = output_key)
         self.__max_loop: int = max_loop
 
@@ -60,151 +79,169 @@ class LLMAgent(Agent):
     def toolkit(self) -> Toolkit:
         return self.__toolkit
 
+    @property
+    def prompt_template(self) -> PromptTemplate:
+        return self.__prompt_template
+
+    @property
+    def context_budget(self) -> Optional[ContextBudget]:
+        return self.__context_budget
+
+    def __start_budget(self, kwargs: Dict[str, Any]) -> Optional[BudgetReport]:
+        # a report passed as `__budget_report__` is filled in place, so each caller sees its own call
+        if self.__context_budget is None:
+            return None
+        return kwargs.get("__budget_report__", None) or self.__context_budget.new_report()
+
+    def __fit_budget(self, messages: List[Message], start: int, report: Optional[BudgetReport]) -> None:
+        if report is not None:
+            self.__context_budget.fit_tool_results(messages, start, report)
+
+    def set_callback(self, callback: Callback) -> None:
+        if isinstance(callback, ModelCallback) and isinstance(self.__model, ChatModel):
+            self.__model.set_callback(callback)
+        if isinstance(callback, ToolCallback) and self.__toolkit:
+            self.__toolkit.set_callback(callback)
+
+    def __predict_params(self, loop: int) -> Dict[str, Any]:
+        params = {
+            "reasoning_effort": self.__reasoning_effort,
+            "verbosity": self.__verbosity,
+            "max_completion_tokens": self.__max_completion_tokens,
+            "stop": self.__stop,
+            "response_format": self.__response_format,
+            "logprobs": self.__logprobs,
+            "top_logprobs": self.__top_logprobs
+        }
+        if loop != self.__max_loop - 1 and self.__toolkit:
+            params["tools"] = self.__toolkit.to_tools_param()
+            params["parallel_tool_calls"] = self.__parallel_tool_calls
+        return params
+
+    def __run_tools(self, messages: List[Message], tool_calls: List[ToolCall]) -> None:
+        if self.__parallel_tool_calls:
+            tool_results = self.__toolkit.run_many([tool_call["function"] for tool_call in tool_calls], self.__max_tool_workers)
+        else:
+            tool_results = [self.__toolkit.run(tool_call["function"]) for tool_call in tool_calls]
+        for tool_call, tool_result in zip(tool_calls, tool_results):
+            self.__append_tool_result(messages, tool_call, tool_result)
+
+    async def __arun_tools(self, messages: List[Message], tool_calls: List[ToolCall]) -> None:
+        if self.__parallel_tool_calls:
+            tool_results = await self.__toolkit.arun_many([tool_call["function"] for tool_call in tool_calls], self.__max_tool_workers)
+        else:
+            tool_results = [await self.__toolkit.arun(tool_call["function"]) for tool_call in tool_calls]
+        for tool_call, tool_result in zip(tool_calls, tool_results):
+            self.__append_tool_result(messages, tool_call, tool_result)
+
+    def __append_tool_result(self, messages: List[Message], tool_call: ToolCall, tool_result: ToolResult) -> None:
+        messages.append(
+            ToolMessage(
+                content = tool_result["result"],
+                role = "tool",
+                tool_call_id = tool_call["id"]
+            )
+        )
+        if "attachment" in tool_result:
+            for attachment in tool_result["attachment"]:
+                if attachment["type"] == "text":
+                    messages.append(
+                        UserMessage(
+                            role="user",
+                            content=attachment["content"]
+                        )
+                    )
+                elif attachment["type"] == "image_url":
+                    messages.append(
+                        UserMessage(
+                            role="user",
+                            content=[
+                                ImageContent(
+                                    type="image_url",
+                                    image_url=ImageURL(url=attachment["content"])
+                                )
+                            ]
+                        )
+                    )
+
+    def __stream_item(self, accumulator: StreamAccumulator, delta_message: Optional[Message]) -> Optional[Union[Message, StreamEvent]]:
+        fragment = accumulator.add(delta_message)
+        if self.__stream_mode == "delta":
+            return StreamDelta(type="delta", content=fragment) if fragment else None
+        if delta_message is not None and "tool_calls" not in delta_message:
+            return accumulator.message()
+        return None
+
     def predict(self, **kwargs: Any) -> Union[Any, Generator[Any, None, None]]:
-        if isinstance(self.__model, OpenAIChat):
+        if isinstance(self.__model, ChatModel):
             messages: List[Message] = self.__prompt_template.format(**kwargs)
+            prompt_length = len(messages)
+            report = self.__start_budget(kwargs)
             if not self.__model.streaming:
                 for i in range(self.__max_loop):
-                    if i == self.__max_loop - 1 or not self.__toolkit:
-                        response_message = self.__model.predict(
-                            messages = messages,
-                            reasoning_effort=self.__reasoning_effort,
-                            verbosity=self.__verbosity,
-                            max_completion_tokens = self.__max_completion_tokens,
-                            stop = self.__stop,
-                            response_format=self.__response_format,
-                            logprobs=self.__logprobs,
-                            top_logprobs=self.__top_logprobs
-                        )[0]
-                    else:
-                        response_message = self.__model.predict(
-                            messages = messages,
-                            reasoning_effort=self.__reasoning_effort,
-                            verbosity=self.__verbosity,
-                            max_completion_tokens = self.__max_completion_tokens,
-                            stop = self.__stop,
-                            response_format=self.__response_format,
-                            logprobs=self.__logprobs,
-                            top_logprobs=self.__top_logprobs,
-                            tools = self.__toolkit.to_tools_param()
-                        )[0]
+                    self.__fit_budget(messages, prompt_length, report)
+                    response_message = self.__model.predict(messages = messages, **self.__predict_params(i))[0]
                     if "tool_calls" in response_message:
                         tool_calls: List[ToolCall] = response_message["tool_calls"]
                         messages.append(response_message)
-                        for tool_call in tool_calls:
-                            tool_result = self.__toolkit.run(tool_call["function"])
-                            messages.append(
-                                ToolMessage(
-                                    content = tool_result["result"],
-                                    role = "tool",
-                                    tool_call_id = tool_call["id"]
-                                )
-                            )
-                            if "attachment" in tool_result:
-                                for attachment in tool_result["attachment"]:
-                                    if attachment["type"] == "text":
-                                        messages.append(
-                                            UserMessage(
-                                                role="user",
-                                                content=attachment["content"]
-                                            )
-                                        )
-                                    elif attachment["type"] == "image_url":
-                                        messages.append(
-                                            UserMessage(
-                                                role="user",
-                                                content=[
-                                                    ImageContent(
-                                                        type="image_url",
-                                                        image_url=ImageURL(url=attachment["content"])
-                                                    )
-                                                ]
-                                            )
-                                        )
+                        self.__run_tools(messages, tool_calls)
                     else:
                         break
                 return response_message
             else:
                 def stream() -> Generator[Any, None, None]:
                     for i in range(self.__max_loop):
-                        if i == self.__max_loop - 1 or not self.__toolkit:
-                            response_message = self.__model.predict(
-                                messages = messages,
-                                reasoning_effort=self.__reasoning_effort,
-                                verbosity=self.__verbosity,
-                                max_completion_tokens = self.__max_completion_tokens,
-                                stop = self.__stop,
-                                response_format=self.__response_format,
-                                logprobs=self.__logprobs,
-                                top_logprobs=self.__top_logprobs
-                            )
-                        else:
-                            response_message = self.__model.predict(
-                                messages = messages,
-                                reasoning_effort=self.__reasoning_effort,
-                                verbosity=self.__verbosity,
-                                max_completion_tokens = self.__max_completion_tokens,
-                                stop = self.__stop,
-                                response_format=self.__response_format,
-                                logprobs=self.__logprobs,
-                                top_logprobs=self.__top_logprobs,
-                                tools = self.__toolkit.to_tools_param()
-                            )
-                        final_response_message = {"role": "assistant"}
+                        self.__fit_budget(messages, prompt_length, report)
+                        response_message = self.__model.predict(messages = messages, **self.__predict_params(i))
+                        accumulator = StreamAccumulator()
                         for delta_message_list in response_message:
-                            delta_message = delta_message_list[0]
-                            final_response_message["role"] = delta_message.get("role", final_response_message["role"])
-                            if "content" not in final_response_message:
-                                final_response_message["content"] = ""
-                            if "content" in final_response_message and "content" in delta_message and delta_message["content"]:
-                                final_response_message["content"] += delta_message["content"]
-                            if "tool_calls" in delta_message:
-                                if "tool_calls" not in final_response_message:
-                                    final_response_message["tool_calls"] = [ToolCall() for _ in range(len(delta_message["tool_calls"]))]
-                                for index in range(len(delta_message["tool_calls"])):
-                                    final_response_message["tool_calls"][index]["id"] = delta_message["tool_calls"][index]["id"] if "id" in delta_message["tool_calls"][index] else final_response_message["tool_calls"][index]["id"]
-                                    final_response_message["tool_calls"][index]["type"] = delta_message["tool_calls"][index]["type"] if "type" in delta_message["tool_calls"][index] else final_response_message["tool_calls"][index]["type"]
-                                    if "function" not in final_response_message["tool_calls"][index]:
-                                        final_response_message["tool_calls"][index]["function"] = Function(arguments="")
-                                    final_response_message["tool_calls"][index]["function"]["name"] = delta_message["tool_calls"][index]["function"]["name"] if "name" in delta_message["tool_calls"][index]["function"] else final_response_message["tool_calls"][index]["function"]["name"]
-                                    if "arguments" in delta_message["tool_calls"][index]["function"]:
-                                        final_response_message["tool_calls"][index]["function"]["arguments"] += delta_message["tool_calls"][index]["function"]["arguments"]
-                            else:
-                                yield final_response_message
+                            item = self.__stream_item(accumulator, delta_message_list[0])
+                            if item is not None:
+                                yield item
+                        final_response_message = accumulator.message()
                         if "tool_calls" not in final_response_message:
                             break
                         else:
                             messages.append(final_response_message)
-                            for tool_call in final_response_message["tool_calls"]:
-                                tool_result = self.__toolkit.run(tool_call["function"])
-                                messages.append(
-                                    ToolMessage(
-                                        content = tool_result["result"],
-                                        role = "tool",
-                                        tool_call_id = tool_call["id"]
-                                    )
-                                )
-                                if "attachment" in tool_result:
-                                    for attachment in tool_result["attachment"]:
-                                        if attachment["type"] == "text":
-                                            messages.append(
-                                                UserMessage(
-                                                    role="user",
-                                                    content=attachment["content"]
-                                                )
-                                            )
-                                        elif attachment["type"] == "image_url":
-                                            messages.append(
-                                                UserMessage(
-                                                    role="user",
-                                                    content=[
-                                                        ImageContent(
-                                                            type="image_url",
-                                                            image_url=ImageURL(url=attachment["content"])
-                                                        )
-                                                    ]
-                                                )
-                                            )
+                            self.__run_tools(messages, final_response_message["tool_calls"])
+                    if self.__stream_mode == "delta":
+                        yield StreamMessage(type="message", message=final_response_message)
+                return stream()
+
+    async def apredict(self, **kwargs: Any) -> Union[Any, AsyncGenerator[Any, None]]:
+        if isinstance(self.__model, ChatModel):
+            messages: List[Message] = self.__prompt_template.format(**kwargs)
+            prompt_length = len(messages)
+            report = self.__start_budget(kwargs)
+            if not self.__model.streaming:
+                for i in range(self.__max_loop):
+                    self.__fit_budget(messages, prompt_length, report)
+                    response_message = (await self.__model.apredict(messages = messages, **self.__predict_params(i)))[0]
+                    if "tool_calls" in response_message:
+                        tool_calls: List[ToolCall] = response_message["tool_calls"]
+                        messages.append(response_message)
+                        await self.__arun_tools(messages, tool_calls)
+                    else:
+                        break
+                return response_message
+            else:
+                async def stream() -> AsyncGenerator[Any, None]:
+                    for i in range(self.__max_loop):
+                        self.__fit_budget(messages, prompt_length, report)
+                        response_message = await self.__model.apredict(messages = messages, **self.__predict_params(i))
+                        accumulator = StreamAccumulator()
+                        async for delta_message_list in response_message:
+                            item = self.__stream_item(accumulator, delta_message_list[0])
+                            if item is not None:
+                                yield item
+                        final_response_message = accumulator.message()
+                        if "tool_calls" not in final_response_message:
+                            break
+                        else:
+                            messages.append(final_response_message)
+                            await self.__arun_tools(messages, final_response_message["tool_calls"])
+                    if self.__stream_mode == "delta":
+                        yield StreamMessage(type="message", message=final_response_message)
                 return stream()
 
 __all__ = [
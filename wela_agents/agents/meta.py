@@ -6,13 +6,15 @@ from typing import List
 from typing import Union
 from typing import Optional
 from typing import Generator
+from typing import AsyncGenerator
 from typing_extensions import Literal
 
 from wela_agents.memory.memory import Memory
 from wela_agents.toolkit.toolkit import Toolkit
 from wela_agents.models.model import Model
-from wela_agents.models.openai_chat import OpenAIChat
+from wela_agents.models.chat_model import ChatModel
 from wela_agents.agents.conversation import ConversationAgent
+from wela_agents.agents.context_budget import ContextBudget
 from wela_agents.retriever.retriever import Retriever
 from wela_agents.schema.template.openai_chat import ChatTemplate
 from wela_agents.schema.template.openai_chat import MessageTemplate
@@ -34,13 +36,18 @@ class Meta(ConversationAgent):
         max_completion_tokens: Optional[int] = None,
         memory: Memory = None,
         toolkit: Toolkit = None,
+        parallel_tool_calls: bool = False,
+        max_tool_workers: int = 4,
+        stream_mode: Literal["message", "delta"] = "message",
+        context_budget: Optional[ContextBudget] = None,
         retriever: Retriever = None,
+        lookup_timeout: Optional[float] = None,
         input_key: str = "__input__",
         output_key: str = "__output__"
     ) -> None:
-        assert isinstance(model, OpenAIChat), "Unsupported model type"
+        assert isinstance(model, ChatModel), "Unsupported model type"
 
-        if isinstance(model, OpenAIChat):
+        if isinstance(model, ChatModel):
             message_template_list: List[MessageTemplate] = []
             message_template_list.append(SystemMessageTemplate(StringPromptTemplate(prompt)))
             if memory:
@@ -58,16 +65,28 @@ class Meta(ConversationAgent):
             verbosity = verbosity,
             max_completion_tokens = max_completion_tokens,
             toolkit = toolkit,
+            parallel_tool_calls = parallel_tool_calls,
+            max_tool_workers = max_tool_workers,
+            stream_mode = stream_mode,
+            context_budget = context_budget,
             memory = memory,
             retriever = retriever,
+            lookup_timeout = lookup_timeout,
             input_key = input_key,
             output_key = output_key
         )
 
+    def __system_hint(self) -> str:
+        return "Current time is: {}".format(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()))
+
     def predict(self, **kwargs: Any) -> Union[Any, Generator[Any, None, None]]:
-        kwargs["__system_hint__"] = "Current time is: {}".format(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()))
+        kwargs["__system_hint__"] = self.__system_hint()
         return super().predict(**kwargs)
 
+    async def apredict(self, **kwargs: Any) -> Union[Any, AsyncGenerator[Any, None]]:
+        kwargs["__system_hint__"] = self.__system_hint()
+        return await super().apredict(**kwargs)
+
 __all__ = [
     "Meta"
 ]
@@ -1,22 +1,59 @@
 
+from types import GeneratorType
+from types import AsyncGeneratorType
 from typing import Any
 from typing import List
 from typing import Union
 from typing import Callable
 from typing import Generator
+from typing import AsyncGenerator
 
 from wela_agents.agents.agent import Agent
+from wela_agents.callback.callback import Callback
+from wela_agents.models.stream_accumulator import collect
+from wela_agents.models.stream_accumulator import acollect
 
 class SimpleSequentialAgent(Agent):
+    """
+    Runs its agents one after another, each one seeing the outputs of the ones before it.
 
-    def __init__(self, *, agents: List[Agent], input_key: str = "__input__", output_key: str = "__output__") -> None:
+    With `pipelined`, a streamed output is passed on live to a next stage that consumes streams
+    incrementally and drained to its final message for any other stage, and only the last stage
+    streams to the caller. No built-in agent consumes streams, so between built-in stages pipelining
+    only saves holding intermediate streams open; see `Agent.consumes_stream`.
+    """
+
+    def __init__(self, *, agents: List[Agent], pipelined: bool = False, input_key: str = "__input__", output_key: str = "__output__") -> None:
         self.__agents: List[Agent] = agents
+        self.__pipelined: bool = pipelined
         super().__init__(input_key=input_key, output_key=output_key)
 
+    @property
+    def consumes_stream(self) -> bool:
+        return self.__pipelined and len(self.__agents) > 0 and self.__agents[0].consumes_stream
+
+    def __drains(self, idx: int) -> bool:
+        return self.__pipelined and idx < len(self.__agents) - 1 and not self.__agents[idx + 1].consumes_stream
+
+    def set_callback(self, callback: Callback) -> None:
+        for agent in self.__agents:
+            agent.set_callback(callback)
+
     def predict(self, **kwargs: Any) -> Union[Any, Generator[Any, None, None]]:
         prediction = None
-        for agent in self.__agents:
+        for idx, agent in enumerate(self.__agents):
             prediction = agent.predict(**kwargs)
+            if isinstance(prediction, GeneratorType) and self.__drains(idx):
+                prediction = collect(prediction)
+            kwargs[agent.output_key] = prediction
+        return prediction
+
+    async def apredict(self, **kwargs: Any) -> Union[Any, AsyncGenerator[Any, None]]:
+        prediction = None
+        for idx, agent in enumerate(self.__agents):
+            prediction = await agent.apredict(**kwargs)
+            if isinstance(prediction, AsyncGeneratorType) and self.__drains(idx):
+                prediction = await acollect(prediction)
             kwargs[agent.output_key] = prediction
         return prediction
 
@@ -27,6 +64,10 @@ class CycleSequentialAgent(Agent):
         self.__condition: Callable = condition
         super().__init__(input_key=input_key, output_key=output_key)
 
+    def set_callback(self, callback: Callback) -> None:
+        for agent in self.__agents:
+            agent.set_callback(callback)
+
     def predict(self, **kwargs: Any) -> Union[Any, Generator[Any, None, None]]:
         prediction = None
         while True:
@@ -37,6 +78,16 @@ class CycleSequentialAgent(Agent):
                 break
         return prediction
 
+    async def apredict(self, **kwargs: Any) -> Union[Any, AsyncGenerator[Any, None]]:
+        prediction = None
+        while True:
+            for agent in self.__agents:
+                prediction = await agent.apredict(**kwargs)
+                kwargs[agent.output_key] = prediction
+            if self.__condition is None or not self.__condition(**kwargs):
+                break
+        return prediction
+
 __all__ = [
     "CycleSequentialAgent",
     "SimpleSequentialAgent"
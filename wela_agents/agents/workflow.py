@@ -1,11 +1,24 @@
 
+import asyncio
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from types import GeneratorType
+from types import AsyncGeneratorType
 from typing import Any
 from typing import Dict
+from typing import List
 from typing import Union
+from typing import Optional
 from typing import Callable
 from typing import Generator
+from typing import AsyncGenerator
 
 from wela_agents.agents.agent import Agent
+from wela_agents.callback.callback import Callback
+from wela_agents.models.stream_accumulator import collect
+from wela_agents.models.stream_accumulator import acollect
 
 START = "__WORKFLOW_START_POINT__"
 END = "__WORKFLOW_END_POINT__"
@@ -23,6 +36,103 @@ class StatefulAgent(Agent):
         super().__init__(input_key=input_key, output_key=output_key)
         self.__state: Dict[Any, Any] = state
 
+class ParallelAgent(StatefulAgent):
+    """
+    A fan-out and join node: runs its branches concurrently on the same inputs and waits for all of
+    them, or for the first `wait_for` to finish.
+
+    The prediction maps the output key of every awaited branch, in branch order, to its output, or
+    is `merge` applied to that mapping. Streamed branch outputs are drained to their final message,
+    since a join needs complete results. Inside a `Workflow` the branch outputs are also merged into
+    the inputs of the following agents, so the step takes as long as its slowest awaited branch.
+
+    With `wait_for`, the branches that are not awaited are not stopped. In `predict` they run to
+    completion on their threads after the node returns, with their outputs and errors dropped, so
+    their model calls are still made and paid for. In `apredict` they are cancelled at their next
+    await, but work they already handed to a thread still runs to completion.
+    """
+
+    def __init__(
+        self,
+        *,
+        state: Dict[Any, Any],
+        branches: List[StatefulAgent],
+        wait_for: Optional[int] = None,
+        merge: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        max_workers: Optional[int] = None,
+        input_key: str,
+        output_key: str
+    ) -> None:
+        assert branches, "A parallel node needs at least one branch"
+        assert wait_for is None or 0 < wait_for <= len(branches), "wait_for must be between 1 and the number of branches"
+
+        super().__init__(state=state, input_key=input_key, output_key=output_key)
+        self.__branches: List[StatefulAgent] = branches
+        self.__wait_for: int = wait_for or len(branches)
+        self.__merge: Optional[Callable[[Dict[str, Any]], Any]] = merge
+        self.__max_workers: int = max_workers or len(branches)
+
+    @property
+    def branches(self) -> List[StatefulAgent]:
+        return self.__branches
+
+    def set_callback(self, callback: Callback) -> None:
+        for branch in self.__branches:
+            branch.set_callback(callback)
+
+    def __run_branch(self, branch: StatefulAgent, kwargs: Dict[str, Any]) -> Any:
+        prediction = branch.predict(**kwargs)
+        if isinstance(prediction, GeneratorType):
+            return collect(prediction)
+        return prediction
+
+    async def __arun_branch(self, branch: StatefulAgent, kwargs: Dict[str, Any]) -> Any:
+        prediction = await branch.apredict(**kwargs)
+        if isinstance(prediction, AsyncGeneratorType):
+            return await acollect(prediction)
+        return prediction
+
+    def run_branches(self, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Run the branches concurrently and return the outputs of the awaited ones by output key. The
+        other branches keep running in the background until they finish.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.__max_workers)
+        try:
+            futures = {executor.submit(self.__run_branch, branch, dict(kwargs)): branch for branch in self.__branches}
+            pending = set(futures)
+            done = []
+            while len(done) < self.__wait_for:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                done.extend(future for future in futures if future in finished)
+            awaited = set(done[:self.__wait_for])
+            return {branch.output_key: future.result() for future, branch in futures.items() if future in awaited}
+        finally:
+            executor.shutdown(wait=self.__wait_for == len(self.__branches), cancel_futures=True)
+
+    async def arun_branches(self, **kwargs: Any) -> Dict[str, Any]:
+        tasks = {asyncio.ensure_future(self.__arun_branch(branch, dict(kwargs))): branch for branch in self.__branches}
+        pending = set(tasks)
+        done = []
+        try:
+            while len(done) < self.__wait_for:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                done.extend(task for task in tasks if task in finished)
+        finally:
+            for task in pending:
+                task.cancel()
+        awaited = set(done[:self.__wait_for])
+        return {branch.output_key: task.result() for task, branch in tasks.items() if task in awaited}
+
+    def join(self, outputs: Dict[str, Any]) -> Any:
+        return outputs if self.__merge is None else self.__merge(outputs)
+
+    def predict(self, **kwargs: Any) -> Any:
+        return self.join(self.run_branches(**kwargs))
+
+    async def apredict(self, **kwargs: Any) -> Any:
+        return self.join(await self.arun_branches(**kwargs))
+
 class Workflow(StatefulAgent):
     """
     A workflow agent that manages a sequence of agents with state and conditions.
@@ -44,22 +154,56 @@ class Workflow(StatefulAgent):
             "choice": choice if choice is not None else {}
         }
 
+    def set_callback(self, callback: Callback) -> None:
+        agents = []
+        for from_agent, next in self.__agent_mapping.items():
+            choices = next["choice"].values() if isinstance(next["choice"], dict) else [next["choice"]]
+            for agent in [from_agent, *choices]:
+                if isinstance(agent, Agent) and agent not in agents:
+                    agents.append(agent)
+        for agent in agents:
+            agent.set_callback(callback)
+
+    def __next_agent(self, current_agent: Union[str, StatefulAgent]) -> Union[str, StatefulAgent]:
+        next = self.__agent_mapping[current_agent]
+        if next["condition"]:
+            condition = next["condition"](self.state)
+            return next["choice"].get(condition, None)
+        else:
+            return next["choice"]
+
     def predict(self, **kwargs: Any) -> Union[Any, Generator[Any, None, None]]:
         current_agent = START
         while True:
-            next = self.__agent_mapping[current_agent]
-            if next["condition"]:
-                condition = next["condition"](self.state)
-                current_agent = next["choice"].get(condition, None)
+            current_agent = self.__next_agent(current_agent)
+            if current_agent == END:
+                break
+            if isinstance(current_agent, ParallelAgent):
+                outputs = current_agent.run_branches(**kwargs)
+                kwargs.update(outputs)
+                prediction = current_agent.join(outputs)
             else:
-                current_agent = next["choice"]
+                prediction = current_agent.predict(**kwargs)
+            kwargs[current_agent.output_key] = prediction
+        return prediction
+
+    async def apredict(self, **kwargs: Any) -> Union[Any, AsyncGenerator[Any, None]]:
+        current_agent = START
+        while True:
+            current_agent = self.__next_agent(current_agent)
             if current_agent == END:
                 break
-            prediction = current_agent.predict(**kwargs)
+            if isinstance(current_agent, ParallelAgent):
+                outputs = await current_agent.arun_branches(**kwargs)
+                kwargs.update(outputs)
+                prediction = current_agent.join(outputs)
+            else:
+                prediction = await current_agent.apredict(**kwargs)
             kwargs[current_agent.output_key] = prediction
         return prediction
 
 __all__ = [
     "StatefulAgent",
+    "ParallelAgent",
     "Workflow"
 ]
@@ -1,5 +1,9 @@
 
 from wela_agents.callback.event import ToolEvent
+from wela_agents.callback.event import ModelEvent
+from wela_agents.callback.event import MemoryEvent
+from wela_agents.callback.event import RetrieverEvent
+from wela_agents.callback.event import EmbeddingEvent
 
 class Callback():
     pass
@@ -15,7 +19,54 @@ class ToolCallback(Callback):
     def after_tool_call(self, _: ToolEvent) -> None:
         pass
 
+class ModelCallback(Callback):
+
+    def before_model_call(self, _: ModelEvent) -> None:
+        pass
+
+    def on_first_token(self, _: ModelEvent) -> None:
+        pass
+
+    def after_model_call(self, _: ModelEvent) -> None:
+        pass
+
+class MemoryCallback(Callback):
+
+    def before_memory_call(self, _: MemoryEvent) -> None:
+        pass
+
+    def after_memory_call(self, _: MemoryEvent) -> None:
+        pass
+
+class RetrieverCallback(Callback):
+
+    def before_retrieve(self, _: RetrieverEvent) -> None:
+        pass
+
+    def after_retrieve(self, _: RetrieverEvent) -> None:
+        pass
+
+class EmbeddingCallback(Callback):
+
+    def before_embed(self, _: EmbeddingEvent) -> None:
+        pass
+
+    def after_embed(self, _: EmbeddingEvent) -> None:
+        pass
+
+class InstrumentationCallback(ToolCallback, ModelCallback, MemoryCallback, RetrieverCallback, EmbeddingCallback):
+    """
+    Receives every event of a turn: model requests, memory and retriever lookups, embeddings and tools.
+    All `after_*` events carry monotonic durations in seconds.
+    """
+    pass
+
 __all__ = [
     "Callback",
-    "ToolCallback"
+    "ToolCallback",
+    "ModelCallback",
+    "MemoryCallback",
+    "RetrieverCallback",
+    "EmbeddingCallback",
+    "InstrumentationCallback"
 ]
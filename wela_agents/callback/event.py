@@ -2,6 +2,8 @@
 from abc import ABC
 from typing import Any
 from typing import Dict
+from typing import Optional
+from typing_extensions import Literal
 
 from wela_agents.toolkit.tool_result import ToolResult
 
@@ -10,11 +12,12 @@ class Event(ABC):
 
 class ToolEvent(Event):
 
-    def __init__(self, tool_name: str, arguments: Dict[str, Any], result: ToolResult = None) -> None:
+    def __init__(self, tool_name: str, arguments: Dict[str, Any], result: ToolResult = None, duration: Optional[float] = None) -> None:
         super().__init__()
         self.__tool_name = tool_name
         self.__arguments = arguments
         self.__result = result
+        self.__duration = duration
 
     @property
     def tool_name(self) -> str:
@@ -28,7 +31,134 @@ class ToolEvent(Event):
     def result(self) -> ToolResult:
         return self.__result
 
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds spent running the tool, set on `after_tool_call`."""
+        return self.__duration
+
+class ModelEvent(Event):
+
+    def __init__(
+        self,
+        model_name: str,
+        stream: bool,
+        duration: Optional[float] = None,
+        time_to_first_token: Optional[float] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        cached: bool = False,
+        error: Optional[Exception] = None
+    ) -> None:
+        super().__init__()
+        self.__model_name = model_name
+        self.__stream = stream
+        self.__duration = duration
+        self.__time_to_first_token = time_to_first_token
+        self.__usage = usage
+        self.__cached = cached
+        self.__error = error
+
+    @property
+    def model_name(self) -> str:
+        return self.__model_name
+
+    @property
+    def stream(self) -> bool:
+        return self.__stream
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds from sending the request until the response, or the whole stream, was received."""
+        return self.__duration
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from sending the request until the first streamed chunk arrived."""
+        return self.__time_to_first_token
+
+    @property
+    def usage(self) -> Optional[Dict[str, Any]]:
+        """The token usage reported by the API, if any."""
+        return self.__usage
+
+    @property
+    def cached(self) -> bool:
+        return self.__cached
+
+    @property
+    def error(self) -> Optional[Exception]:
+        return self.__error
+
+class MemoryEvent(Event):
+
+    def __init__(self, memory_key: str, operation: Literal["get_contexts", "save_context"], duration: Optional[float] = None) -> None:
+        super().__init__()
+        self.__memory_key = memory_key
+        self.__operation = operation
+        self.__duration = duration
+
+    @property
+    def memory_key(self) -> str:
+        return self.__memory_key
+
+    @property
+    def operation(self) -> Literal["get_contexts", "save_context"]:
+        return self.__operation
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.__duration
+
+class RetrieverEvent(Event):
+
+    def __init__(self, retriever_key: str, query: str, duration: Optional[float] = None, documents: Optional[int] = None) -> None:
+        super().__init__()
+        self.__retriever_key = retriever_key
+        self.__query = query
+        self.__duration = duration
+        self.__documents = documents
+
+    @property
+    def retriever_key(self) -> str:
+        return self.__retriever_key
+
+    @property
+    def query(self) -> str:
+        return self.__query
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.__duration
+
+    @property
+    def documents(self) -> Optional[int]:
+        """Number of documents retrieved, set on `after_retrieve`."""
+        return self.__documents
+
+class EmbeddingEvent(Event):
+
+    def __init__(self, model_name: str, sentences: int, duration: Optional[float] = None) -> None:
+        super().__init__()
+        self.__model_name = model_name
+        self.__sentences = sentences
+        self.__duration = duration
+
+    @property
+    def model_name(self) -> str:
+        return self.__model_name
+
+    @property
+    def sentences(self) -> int:
+        return self.__sentences
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.__duration
+
 __all__ = [
     "Event",
-    "ToolEvent"
+    "ToolEvent",
+    "ModelEvent",
+    "MemoryEvent",
+    "RetrieverEvent",
+    "EmbeddingEvent"
 ]
@@ -0,0 +1,170 @@
+
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+from collections import OrderedDict
+from typing import Dict
+from typing import List
+from typing import Optional
+
+class MmapEmbeddingStore:
+    """
+    An append-only on-disk store of float32 vectors.
+
+    Vectors live in one raw float32 file that is memory-mapped for reads, and the row of every key
+    is kept in a sidecar text file, so reopening a store only reads the keys.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.__directory: str = directory
+        self.__vectors_path: str = os.path.join(directory, "vectors.f32")
+        self.__keys_path: str = os.path.join(directory, "keys.txt")
+        self.__meta_path: str = os.path.join(directory, "meta.json")
+        self.__lock: threading.Lock = threading.Lock()
+        self.__rows: Dict[str, int] = {}
+        self.__dimension: Optional[int] = None
+        self.__mmap: Optional[np.memmap] = None
+
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.__meta_path):
+            with open(self.__meta_path, "r") as f:
+                self.__dimension = json.load(f)["dimension"]
+        if self.__dimension:
+            self.__realign()
+
+    def __realign(self) -> None:
+        # a write interrupted between the two files leaves one of them ahead, or the last key cut
+        # short; cut both back to the rows they share, so that new rows line up in both files
+        content = ""
+        if os.path.exists(self.__keys_path):
+            with open(self.__keys_path, "r") as f:
+                content = f.read()
+        keys = content.splitlines()
+        torn = bool(content) and not content.endswith("\n")
+        if torn:
+            keys.pop()
+        vector_bytes = os.path.getsize(self.__vectors_path) if os.path.exists(self.__vectors_path) else 0
+        rows = min(len(keys), vector_bytes // (4 * self.__dimension))
+        if vector_bytes != rows * 4 * self.__dimension:
+            with open(self.__vectors_path, "ab") as f:
+                f.truncate(rows * 4 * self.__dimension)
+        if rows != len(keys) or torn:
+            with open(self.__keys_path, "w") as f:
+                f.write("".join(f"{key}\n" for key in keys[:rows]))
+        for row, key in enumerate(keys[:rows]):
+            self.__rows[key] = row
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self.__lock:
+            row = self.__rows.get(key, None)
+            if row is None:
+                return None
+            if self.__mmap is None or self.__mmap.shape[0] <= row:
+                self.__mmap = np.memmap(self.__vectors_path, dtype=np.float32, mode="r", shape=(len(self.__rows), self.__dimension))
+            return np.array(self.__mmap[row])
+
+    def put_many(self, keys: List[str], vectors: List[np.ndarray]) -> None:
+        with self.__lock:
+            new_keys: List[str] = []
+            new_vectors: List[np.ndarray] = []
+            for key, vector in zip(keys, vectors):
+                if key not in self.__rows and key not in new_keys:
+                    new_keys.append(key)
+                    new_vectors.append(np.asarray(vector, dtype=np.float32))
+            if not new_keys:
+                return
+            if self.__dimension is None:
+                self.__dimension = int(new_vectors[0].shape[-1])
+                with open(self.__meta_path, "w") as f:
+                    json.dump({"dimension": self.__dimension}, f)
+            with open(self.__vectors_path, "ab") as f:
+                f.write(np.stack(new_vectors).astype(np.float32).tobytes())
+            with open(self.__keys_path, "a") as f:
+                f.write("".join(f"{key}\n" for key in new_keys))
+            for key in new_keys:
+                self.__rows[key] = len(self.__rows)
+
+class EmbeddingCache:
+    """
+    A content-addressed cache of sentence embeddings.
+
+    Entries are keyed by a hash of the model name and the text. Lookups hit an in-memory LRU first and
+    then, when `cache_dir` is given, a memory-mapped on-disk store that survives restarts.
+    """
+
+    def __init__(self, model: str, max_size: int = 10000, cache_dir: Optional[str] = None) -> None:
+        self.__model: str = model
+        self.__max_size: int = max_size
+        self.__lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__store: Optional[MmapEmbeddingStore] = MmapEmbeddingStore(cache_dir) if cache_dir else None
+        self.__hits: int = 0
+        self.__misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def __len__(self) -> int:
+        return len(self.__lru)
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.__model}\0{text}".encode("utf-8")).hexdigest()
+
+    def __remember(self, key: str, vector: np.ndarray) -> None:
+        self.__lru[key] = vector
+        self.__lru.move_to_end(key)
+        while len(self.__lru) > self.__max_size:
+            self.__lru.popitem(last=False)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.key(text)
+        with self.__lock:
+            vector = self.__lru.get(key, None)
+            if vector is not None:
+                self.__lru.move_to_end(key)
+        if vector is None and self.__store is not None:
+            vector = self.__store.get(key)
+            if vector is not None:
+                with self.__lock:
+                    self.__remember(key, vector)
+        with self.__lock:
+            if vector is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+        return vector
+
+    def put_many(self, texts: List[str], vectors: List[np.ndarray]) -> None:
+        keys = [self.key(text) for text in texts]
+        vectors = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+        with self.__lock:
+            for key, vector in zip(keys, vectors):
+                self.__remember(key, vector)
+        if self.__store is not None:
+            self.__store.put_many(keys, vectors)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__lru.clear()
+            self.__hits = 0
+            self.__misses = 0
+
+__all__ = [
+    "MmapEmbeddingStore",
+    "EmbeddingCache"
+]
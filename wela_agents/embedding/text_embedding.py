@@ -1,27 +1,86 @@
 
+import time
+import numpy as np
+
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import Optional
 
-from modelscope.pipelines import pipeline
-from modelscope.utils.constant import Tasks
+from wela_agents.callback.event import EmbeddingEvent
+from wela_agents.callback.callback import EmbeddingCallback
+from wela_agents.embedding.embedding_cache import EmbeddingCache
 
 class TextEmbedding:
-    def __init__(self, model: str) -> None:
+    def __init__(self, model: str, cache_size: int = 0, cache_dir: Optional[str] = None, callback: Optional[EmbeddingCallback] = None) -> None:
+        # modelscope pulls in torch and transformers, so it is only imported once a model is actually built
+        from modelscope.pipelines import pipeline
+        from modelscope.utils.constant import Tasks
+
+        self.__model: str = model
         self.__pipeline = pipeline(
             Tasks.sentence_embedding,
             model=model,
             sequence_length=512
         )
+        self.__cache: Optional[EmbeddingCache] = None
+        if cache_size > 0 or cache_dir:
+            self.__cache = EmbeddingCache(model, max_size=cache_size, cache_dir=cache_dir)
+        self.__callback: Optional[EmbeddingCallback] = callback
 
-    def embed(self, source_sentence: List[str]) -> Any:
+    @property
+    def model_name(self) -> str:
+        return self.__model
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        return self.__cache
+
+    def set_callback(self, callback: Optional[EmbeddingCallback]) -> None:
+        self.__callback = callback
+
+    def __embed(self, source_sentence: List[str]) -> Any:
         return self.__pipeline(
             input={
                 "source_sentence": source_sentence
             }
         )["text_embedding"]
 
+    def embed(self, source_sentence: List[str]) -> Any:
+        if self.__callback is None:
+            return self.__embed_cached(source_sentence)
+
+        self.__callback.before_embed(EmbeddingEvent(self.__model, len(source_sentence)))
+        start = time.perf_counter()
+        text_embedding = self.__embed_cached(source_sentence)
+        self.__callback.after_embed(EmbeddingEvent(self.__model, len(source_sentence), time.perf_counter() - start))
+        return text_embedding
+
+    def __embed_cached(self, source_sentence: List[str]) -> Any:
+        if self.__cache is None:
+            return self.__embed(source_sentence)
+
+        vectors = [self.__cache.get(sentence) for sentence in source_sentence]
+        missing = list(dict.fromkeys(sentence for sentence, vector in zip(source_sentence, vectors) if vector is None))
+        if missing:
+            embedded = dict(zip(missing, [np.asarray(vector, dtype=np.float32) for vector in self.__embed(missing)]))
+            self.__cache.put_many(missing, list(embedded.values()))
+            vectors = [embedded[sentence] if vector is None else vector for sentence, vector in zip(source_sentence, vectors)]
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
     def compare_sentences(self, source_sentence: List[str], sentences_to_compare: List[str]) -> List[Dict[str, Any]]:
+        if self.__cache is not None:
+            text_embedding = self.embed(source_sentence + sentences_to_compare)
+            source_len = len(source_sentence)
+            return [
+                {
+                    "sentence": sentence,
+                    "text_embedding": text_embedding[source_len + idx],
+                    "score": float(np.dot(text_embedding[0], text_embedding[source_len + idx]))
+                }
+                for idx, sentence in enumerate(sentences_to_compare)
+            ]
+
         pipeline_result = self.__pipeline(
             input={
                 "source_sentence": source_sentence,
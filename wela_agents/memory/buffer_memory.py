@@ -1,5 +1,6 @@
 
 from typing import List
+from typing import Optional
 from typing import TypeVar
 
 from wela_agents.memory.memory import Memory
@@ -21,6 +22,12 @@ class BufferMemory(Memory[T]):
     def reset_memory(self) -> None:
         self._buffer.clear()
 
+    def export_state(self) -> List[T]:
+        return list(self._buffer)
+
+    def import_state(self, state: Optional[List[T]]) -> None:
+        self._buffer = list(state or [])
+
 __all__ = [
     "BufferMemory"
 ]
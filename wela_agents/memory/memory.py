@@ -3,9 +3,13 @@ from abc import ABC
 from abc import abstractmethod
 from typing import Any
 from typing import List
+from typing import Optional
 from typing import TypeVar
 from typing import Generic
 
+from wela_agents.callback.callback import Callback
+from wela_agents.utils.concurrency import run_in_thread
+
 T = TypeVar("T")
 
 class Memory(ABC, Generic[T]):
@@ -29,6 +33,41 @@ class Memory(ABC, Generic[T]):
     def reset_memory(self) -> None:
         pass
 
+    def save_contexts(self, contexts: List[T]) -> None:
+        """Save several contexts in order. Memories that can write in batches override this."""
+        for context in contexts:
+            self.save_context(context)
+
+    def export_state(self) -> Any:
+        """
+        Return the state held in this process as JSON-compatible data, or None when the memory keeps
+        its state elsewhere, such as in a vector database.
+        """
+        return None
+
+    def import_state(self, state: Any) -> None:
+        """Restore state returned by `export_state`."""
+        pass
+
+    def set_callback(self, callback: Callback) -> None:
+        """
+        Pass a callback down to the components of this memory that report events.
+        """
+        pass
+
+    def for_session(self, session_id: Optional[str]) -> "Memory[T]":
+        """Return the memory of one conversation. A memory that is not session-aware shares itself."""
+        return self
+
+    async def asave_context(self, context: T) -> Any:
+        return await run_in_thread(self.save_context, context)
+
+    async def asave_contexts(self, contexts: List[T]) -> None:
+        await run_in_thread(self.save_contexts, contexts)
+
+    async def aget_contexts(self, contexts: List[T]) -> List[T]:
+        return await run_in_thread(self.get_contexts, contexts)
+
 __all__ = [
     "Memory"
 ]
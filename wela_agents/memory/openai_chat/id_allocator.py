@@ -0,0 +1,103 @@
+
+import os
+import time
+import tempfile
+import threading
+
+from typing import IO
+from typing import List
+from typing import Tuple
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class PointIdAllocator:
+    """
+    Allocate time-ordered integer point ids locally, without asking the server for a count.
+
+    An id packs 41 bits of milliseconds since `EPOCH_MS`, a 10 bit writer id and a 12 bit sequence,
+    so ids from one writer are strictly increasing, ids from different writers never collide as long
+    as their writer ids differ, and sorting by id keeps the order in which messages were saved.
+
+    Without a `writer_id`, the allocator claims the first free one by locking a file in `lock_dir`,
+    and holds it until the process exits. That only keeps apart the writers of one host; writers on
+    different hosts sharing a collection must be given distinct writer ids. Use `shared` to let every
+    memory of a process allocate from one allocator.
+    """
+
+    EPOCH_MS: int = 1704067200000
+    WRITER_BITS: int = 10
+    SEQUENCE_BITS: int = 12
+
+    __shared: Optional["PointIdAllocator"] = None
+    __shared_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, writer_id: Optional[int] = None, lock_dir: Optional[str] = None) -> None:
+        max_writer_id = (1 << self.WRITER_BITS) - 1
+        self.__lock_file: Optional[IO] = None
+        if writer_id is None:
+            writer_id, self.__lock_file = self.__claim(lock_dir or os.path.join(tempfile.gettempdir(), "wela_agents_writers"))
+        assert 0 <= writer_id <= max_writer_id, f"writer_id must be between 0 and {max_writer_id}"
+
+        self.__writer_id: int = writer_id
+        self.__lock: threading.Lock = threading.Lock()
+        self.__last_ms: int = 0
+        self.__sequence: int = 0
+
+    @classmethod
+    def shared(cls) -> "PointIdAllocator":
+        """The allocator of this process, created with a claimed writer id on first use."""
+        with cls.__shared_lock:
+            if cls.__shared is None:
+                cls.__shared = cls()
+            return cls.__shared
+
+    @classmethod
+    def __claim(cls, lock_dir: str) -> Tuple[int, IO]:
+        # the lock is released by the OS when the process exits, so a crashed writer frees its id
+        os.makedirs(lock_dir, exist_ok=True)
+        for writer_id in range(1 << cls.WRITER_BITS):
+            lock_file = open(os.path.join(lock_dir, f"writer-{writer_id}.lock"), "a+")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                lock_file.close()
+                continue
+            return writer_id, lock_file
+        raise RuntimeError(f"every writer id in {lock_dir} is in use")
+
+    @property
+    def writer_id(self) -> int:
+        return self.__writer_id
+
+    def allocate(self, count: int = 1) -> List[int]:
+        max_sequence = (1 << self.SEQUENCE_BITS) - 1
+        ids: List[int] = []
+        with self.__lock:
+            for _ in range(count):
+                now_ms = time.time_ns() // 1_000_000 - self.EPOCH_MS
+                if now_ms > self.__last_ms:
+                    self.__last_ms = now_ms
+                    self.__sequence = 0
+                elif self.__sequence < max_sequence:
+                    self.__sequence += 1
+                else:
+                    self.__last_ms += 1
+                    self.__sequence = 0
+                ids.append(
+                    (self.__last_ms << (self.WRITER_BITS + self.SEQUENCE_BITS))
+                    | (self.__writer_id << self.SEQUENCE_BITS)
+                    | self.__sequence
+                )
+        return ids
+
+__all__ = [
+    "PointIdAllocator"
+]
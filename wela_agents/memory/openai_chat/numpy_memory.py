@@ -0,0 +1,102 @@
+
+from uuid import uuid4
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from wela_agents.memory.memory import Memory
+from wela_agents.callback.callback import Callback
+from wela_agents.callback.callback import EmbeddingCallback
+from wela_agents.embedding.text_embedding import TextEmbedding
+from wela_agents.schema.prompt.openai_chat import Message
+from wela_agents.vectorstore.numpy_store import VectorHit
+from wela_agents.vectorstore.numpy_store import NumpyVectorStore
+
+class NumpyMemory(Memory[Message]):
+    """
+    The QdrantMemory contract on an in-process NumpyVectorStore: every text part of a message is
+    embedded and stored, and `get_contexts` returns the best matching messages in the order they were
+    saved. The store is kept in `directory` when given; otherwise its state travels through
+    `export_state`, so that a SessionMemory can evict it.
+    """
+    def __init__(self, memory_key: str, embedding: TextEmbedding, limit: int = 10, score_threshold: Optional[float] = None, directory: Optional[str] = None) -> None:
+        super().__init__(memory_key)
+
+        self.__score_threshold: Optional[float] = score_threshold
+        self.__limit: int = limit
+        self.__embedding: TextEmbedding = embedding
+        self.__persistent: bool = directory is not None
+        self.__store: NumpyVectorStore = NumpyVectorStore(directory)
+
+    @property
+    def store(self) -> NumpyVectorStore:
+        return self.__store
+
+    def set_callback(self, callback: Callback) -> None:
+        if isinstance(callback, EmbeddingCallback):
+            self.__embedding.set_callback(callback)
+
+    def _get_sentences_by_message(self, message: Message) -> List[str]:
+        if isinstance(message["content"], str):
+            return [message["content"]]
+        sentence_list = []
+        for content in message["content"]:
+            if content["type"] == "text":
+                sentence_list.append(content["text"])
+        return sentence_list
+
+    def save_context(self, context: Message) -> Any:
+        self.save_contexts([context])
+
+    def save_contexts(self, contexts: List[Message]) -> None:
+        sentences: List[str] = []
+        payloads: List[Dict[str, Any]] = []
+        for context in contexts:
+            payload = {"uuid": str(uuid4()), "message": context}
+            for sentence in self._get_sentences_by_message(context):
+                sentences.append(sentence)
+                payloads.append(payload)
+        if sentences:
+            self.__store.add(self.__embedding.embed(sentences), payloads)
+
+    def _get_hits_by_message_list(self, message_list: List[Message]) -> List[VectorHit]:
+        sentence_list: List[str] = []
+        for message in message_list:
+            sentence_list.extend(self._get_sentences_by_message(message))
+        sentence_list = list(dict.fromkeys(sentence_list))
+        if not sentence_list or not len(self.__store):
+            return []
+        hits: List[VectorHit] = []
+        for query_hits in self.__store.search(self.__embedding.embed(sentence_list), self.__limit, self.__score_threshold):
+            hits.extend(query_hits)
+        return hits
+
+    def _get_last_n_hits(self, n: int) -> List[VectorHit]:
+        return self.__store.last(n)
+
+    def _select(self, hits: List[VectorHit], limit: int) -> List[Message]:
+        best: Dict[str, VectorHit] = {}
+        for hit in hits:
+            uuid = hit["payload"]["uuid"]
+            if uuid not in best or hit["score"] > best[uuid]["score"]:
+                best[uuid] = hit
+        selected = sorted(best.values(), key=lambda hit: hit["score"])[-limit:]
+        return [hit["payload"]["message"] for hit in sorted(selected, key=lambda hit: hit["id"])]
+
+    def get_contexts(self, contexts: List[Message]) -> List[Message]:
+        return self._select(self._get_hits_by_message_list(contexts), self.__limit)
+
+    def reset_memory(self) -> None:
+        self.__store.clear()
+
+    def export_state(self) -> Optional[Dict[str, Any]]:
+        return None if self.__persistent else self.__store.export_state()
+
+    def import_state(self, state: Optional[Dict[str, Any]]) -> None:
+        if not self.__persistent:
+            self.__store.import_state(state)
+
+__all__ = [
+    "NumpyMemory"
+]
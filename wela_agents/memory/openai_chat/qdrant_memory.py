@@ -5,14 +5,25 @@ from typing import List
 from typing import Optional
 from qdrant_client import QdrantClient
 from qdrant_client.models import Record
+from qdrant_client.models import Filter
+from qdrant_client.models import OrderBy
 from qdrant_client.models import Distance
+from qdrant_client.models import Direction
+from qdrant_client.models import MatchValue
 from qdrant_client.models import PointStruct
+from qdrant_client.models import QueryRequest
+from qdrant_client.models import FieldCondition
+from qdrant_client.models import FilterSelector
 from qdrant_client.models import VectorParams
+from qdrant_client.models import PayloadSchemaType
 from qdrant_client.models import ExtendedPointId
 from qdrant_client.conversions.common_types import ScoredPoint
 
 from wela_agents.memory.memory import Memory
+from wela_agents.callback.callback import Callback
+from wela_agents.callback.callback import EmbeddingCallback
 from wela_agents.embedding.text_embedding import TextEmbedding
+from wela_agents.memory.openai_chat.id_allocator import PointIdAllocator
 from wela_agents.schema.prompt.openai_chat import Message
 
 def unique(scored_points: List[ScoredPoint]) -> List[ScoredPoint]:
@@ -32,42 +43,95 @@ def sort_key_score(scored_point: ScoredPoint) -> float:
     return scored_point.score
 
 class QdrantMemory(Memory[Message]):
-    def __init__(self, memory_key: str, embedding: TextEmbedding, qdrant_client: QdrantClient, limit: int=10, score_threshold: Optional[float] = None) -> None:
+    """
+    Conversation memory in the Qdrant collection named `memory_key`. With a `session_id`, points are
+    tagged with it and only the session's own points are searched and reset, so that the sessions of
+    a SessionMemory share one collection.
+    """
+    def __init__(self, memory_key: str, embedding: TextEmbedding, qdrant_client: QdrantClient, limit: int=10, score_threshold: Optional[float] = None, id_allocator: Optional[PointIdAllocator] = None, session_id: Optional[str] = None) -> None:
         super().__init__(memory_key)
 
         self.__score_threshold: Optional[float] = score_threshold
         self.__limit: int = limit
         self.__client: QdrantClient = qdrant_client
         self.__embedding = embedding
+        self.__id_allocator: PointIdAllocator = id_allocator if id_allocator else PointIdAllocator.shared()
+        self.__session_id: Optional[str] = session_id
+        self.__filter: Optional[Filter] = Filter(must=[FieldCondition(key="session_id", match=MatchValue(value=session_id))]) if session_id is not None else None
 
         if not self.__client.collection_exists(collection_name=self.memory_key):
-            self.__client.create_collection(
+            self.__create_collection()
+        else:
+            self.__create_payload_indexes()
+
+    def __create_collection(self) -> None:
+        self.__client.create_collection(
+            collection_name=self.memory_key,
+            vectors_config=VectorParams(size=512, distance=Distance.COSINE)
+        )
+        self.__create_payload_indexes()
+
+    def __create_payload_indexes(self) -> None:
+        # the recent window is read back by ordering on "seq", which needs a range index, and the
+        # points of a session are filtered by "session_id"; both are created on existing collections
+        # too, since the collection may have been made by a memory without a session
+        self.__client.create_payload_index(
+            collection_name=self.memory_key,
+            field_name="seq",
+            field_schema=PayloadSchemaType.INTEGER
+        )
+        if self.__session_id is not None:
+            self.__client.create_payload_index(
                 collection_name=self.memory_key,
-                vectors_config=VectorParams(size=512, distance=Distance.COSINE)
+                field_name="session_id",
+                field_schema=PayloadSchemaType.KEYWORD
             )
 
-    def save_context(self, context: Message) -> Any:
-        payload={
-            "uuid": str(uuid4()),
-            "message": context
-        }
-        if isinstance(context["content"], str):
-            sentences = [context["content"]]
-        else:
-            sentences = []
-            for content in context["content"]:
-                if content["type"] == "text":
-                    sentences.append(content["text"])
-        sentences_embedding = self.__embedding.embed(sentences)
+    @property
+    def session_id(self) -> Optional[str]:
+        return self.__session_id
+
+    def set_callback(self, callback: Callback) -> None:
+        if isinstance(callback, EmbeddingCallback):
+            self.__embedding.set_callback(callback)
 
-        count = self.__client.count(collection_name=self.memory_key).count
+    def _get_sentences_by_message(self, message: Message) -> List[str]:
+        if isinstance(message["content"], str):
+            return [message["content"]]
+        sentence_list = []
+        for content in message["content"]:
+            if content["type"] == "text":
+                sentence_list.append(content["text"])
+        return sentence_list
+
+    def save_context(self, context: Message) -> Any:
+        self.save_contexts([context])
+
+    def save_contexts(self, contexts: List[Message]) -> None:
+        """
+        Save several messages in order with one embedding call and one upsert.
+        """
+        entries = []
+        for context in contexts:
+            uuid = str(uuid4())
+            entries.extend((uuid, context, sentence) for sentence in self._get_sentences_by_message(context))
+        if not entries:
+            return
+        sentences_embedding = self.__embedding.embed([sentence for _, _, sentence in entries])
+
+        ids = self.__id_allocator.allocate(len(entries))
         points = [
             PointStruct(
-                id = count + idx,
+                id = id,
                 vector = [float(x) for x in sentence_embedding],
-                payload = payload
+                payload = {
+                    "uuid": uuid,
+                    "seq": id,
+                    "message": context,
+                    **({"session_id": self.__session_id} if self.__session_id is not None else {})
+                }
             )
-            for idx, sentence_embedding in enumerate(sentences_embedding)
+            for id, sentence_embedding, (uuid, context, _) in zip(ids, sentences_embedding, entries)
         ]
 
         self.__client.upsert(
@@ -76,44 +140,50 @@ class QdrantMemory(Memory[Message]):
         )
 
     def _get_points_by_sentence(self, sentence: str) -> List[ScoredPoint]:
-        sentence_embedding = self.__embedding.embed([sentence])[0]
-        vector = [float(x) for x in sentence_embedding]
-        return self.__client.search(
-            collection_name=self.memory_key,
-            query_vector=vector,
-            limit=self.__limit,
-            score_threshold = self.__score_threshold,
-        )
+        return self._get_points_by_sentence_list([sentence])
 
     def _get_points_by_sentence_list(self, sentence_list: List[str]) -> List[ScoredPoint]:
+        sentence_list = list(dict.fromkeys(sentence_list))
+        if not sentence_list:
+            return []
+        sentences_embedding = self.__embedding.embed(sentence_list)
+        responses = self.__client.query_batch_points(
+            collection_name=self.memory_key,
+            requests=[
+                QueryRequest(
+                    query=[float(x) for x in sentence_embedding],
+                    limit=self.__limit,
+                    score_threshold=self.__score_threshold,
+                    filter=self.__filter,
+                    with_payload=True
+                )
+                for sentence_embedding in sentences_embedding
+            ]
+        )
         scored_points: List[ScoredPoint] = []
-        for sentence in sentence_list:
-            scored_points.extend( self._get_points_by_sentence(sentence) )
+        for response in responses:
+            scored_points.extend(response.points)
         return scored_points
 
     def _get_points_by_message(self, message: Message) -> List[ScoredPoint]:
-        if isinstance(message["content"], str):
-            sentence_list = [message["content"]]
-        else:
-            sentence_list = []
-            for content in message["content"]:
-                if content["type"] == "text":
-                    sentence_list.append(content["text"])
-        return self._get_points_by_sentence_list(sentence_list)
+        return self._get_points_by_sentence_list(self._get_sentences_by_message(message))
 
     def _get_points_by_message_list(self, message_list: List[Message]) -> List[ScoredPoint]:
-        scored_points: List[ScoredPoint] = []
+        sentence_list: List[str] = []
         for message in message_list:
-            scored_points.extend(self._get_points_by_message(message))
-        return scored_points
+            sentence_list.extend(self._get_sentences_by_message(message))
+        return self._get_points_by_sentence_list(sentence_list)
 
     def _get_last_n_points(self, n: int) -> List[ScoredPoint]:
-        ids: List[int] = [id + 1 for id in range(0, self.__client.count(collection_name=self.memory_key).count)][-n:]
-        records: List[Record] = self.__client.retrieve(
+        records: List[Record]
+        records, _ = self.__client.scroll(
             collection_name=self.memory_key,
-            ids=ids
+            limit=n,
+            scroll_filter=self.__filter,
+            order_by=OrderBy(key="seq", direction=Direction.DESC),
+            with_payload=True
         )
-        return [ScoredPoint(id=record.id, version=record.id-1, score=1.0, payload=record.payload, vector=record.vector) for record in records]
+        return [ScoredPoint(id=record.id, version=0, score=1.0, payload=record.payload, vector=record.vector) for record in reversed(records)]
 
     def get_contexts(self, contexts: List[Message]) -> List[Message]:
         scored_points = self._get_points_by_message_list(contexts)
@@ -125,12 +195,13 @@ class QdrantMemory(Memory[Message]):
         return [scored_point.payload["message"] for scored_point in scored_points]
 
     def reset_memory(self) -> None:
+        if self.__filter is not None:
+            self.__client.delete(collection_name=self.memory_key, points_selector=FilterSelector(filter=self.__filter))
+            return
+
         self.__client.delete_collection(self.memory_key)
 
-        self.__client.create_collection(
-            collection_name=self.memory_key,
-            vectors_config=VectorParams(size=512, distance=Distance.COSINE),
-        )
+        self.__create_collection()
 
 __all__ = [
     "QdrantMemory",
@@ -0,0 +1,21 @@
+
+from typing import List
+from typing import Optional
+
+from wela_agents.schema.prompt.openai_chat import Message
+from wela_agents.embedding.text_embedding import TextEmbedding
+from wela_agents.memory.openai_chat.numpy_memory import NumpyMemory
+
+class WindowNumpyMemory(NumpyMemory):
+    def __init__(self, memory_key: str, embedding: TextEmbedding, limit: int = 15, window_size: int = 5, score_threshold: Optional[float] = None, directory: Optional[str] = None) -> None:
+        super().__init__(memory_key, embedding, limit, score_threshold, directory)
+        self.__limit: int = limit
+        self.__window_size: int = window_size
+
+    def get_contexts(self, contexts: List[Message]) -> List[Message]:
+        hits = self._get_hits_by_message_list(contexts) + self._get_last_n_hits(self.__window_size)
+        return self._select(hits, self.__limit)
+
+__all__ = [
+    "WindowNumpyMemory"
+]
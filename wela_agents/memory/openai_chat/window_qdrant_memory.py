@@ -6,14 +6,15 @@ from qdrant_client import QdrantClient
 
 from wela_agents.schema.prompt.openai_chat import Message
 from wela_agents.embedding.text_embedding import TextEmbedding
+from wela_agents.memory.openai_chat.id_allocator import PointIdAllocator
 from wela_agents.memory.openai_chat.qdrant_memory import QdrantMemory
 from wela_agents.memory.openai_chat.qdrant_memory import unique
 from wela_agents.memory.openai_chat.qdrant_memory import sort_key_id
 from wela_agents.memory.openai_chat.qdrant_memory import sort_key_score
 
 class WindowQdrantMemory(QdrantMemory):
-    def __init__(self, memory_key: str, embedding: TextEmbedding, qdrant_client: QdrantClient, limit: int=15, window_size: int = 5, score_threshold: Optional[float] = None) -> None:
-        super().__init__(memory_key, embedding, qdrant_client, limit, score_threshold)
+    def __init__(self, memory_key: str, embedding: TextEmbedding, qdrant_client: QdrantClient, limit: int=15, window_size: int = 5, score_threshold: Optional[float] = None, id_allocator: Optional[PointIdAllocator] = None, session_id: Optional[str] = None) -> None:
+        super().__init__(memory_key, embedding, qdrant_client, limit, score_threshold, id_allocator=id_allocator, session_id=session_id)
         self.__limit: int = limit
         self.__window_size: int = window_size
 
@@ -0,0 +1,239 @@
+
+import threading
+
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import TypeVar
+from typing import Callable
+from typing import Optional
+
+from wela_agents.memory.memory import Memory
+from wela_agents.callback.callback import Callback
+from wela_agents.memory.session_store import SessionStore
+
+T = TypeVar("T")
+
+DEFAULT_SESSION = "default"
+
+class SessionEntry:
+
+    def __init__(self, memory: Optional[Memory] = None) -> None:
+        self.memory: Optional[Memory] = memory
+        self.pins: int = 0
+        self.ready: threading.Event = threading.Event()
+        self.error: Optional[BaseException] = None
+        if memory is not None:
+            self.ready.set()
+
+class SessionMemory(Memory[T]):
+    """
+    Keep a separate memory per session, so that one agent can serve many conversations.
+
+    `factory` builds the memory of a session from its id, for example a BufferMemory, or a QdrantMemory
+    that filters a shared collection by `session_id`. At most `max_sessions` memories are kept in
+    process; the least recently used idle one is evicted and its `export_state` saved to `store`, from
+    which it is restored the next time the session is used. Without a store, evicted state is lost.
+    Without a session id, the calls go to the "default" session.
+
+    Building, restoring and saving a session run outside the lock, so a slow store only holds up the
+    calls of the session concerned; concurrent first calls of one session wait for a single build.
+    """
+
+    def __init__(self, memory_key: str, factory: Callable[[str], Memory[T]], max_sessions: int = 1024, store: Optional[SessionStore] = None) -> None:
+        super().__init__(memory_key)
+        self.__factory: Callable[[str], Memory[T]] = factory
+        self.__max_sessions: int = max_sessions
+        self.__store: Optional[SessionStore] = store
+        self.__sessions: OrderedDict[str, SessionEntry] = OrderedDict()
+        self.__evicting: Dict[str, threading.Event] = {}
+        self.__callback: Optional[Callback] = None
+        self.__lock: threading.Lock = threading.Lock()
+        self.__evictions: int = 0
+        self.__rehydrations: int = 0
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self.__sessions)
+
+    @property
+    def evictions(self) -> int:
+        return self.__evictions
+
+    @property
+    def rehydrations(self) -> int:
+        return self.__rehydrations
+
+    def __evict(self) -> List[Tuple[str, SessionEntry, threading.Event]]:
+        # must hold the lock; sessions in use are skipped and evicted once they are released. The
+        # evicted sessions are saved by `__save` after the lock is released.
+        evicted: List[Tuple[str, SessionEntry, threading.Event]] = []
+        for session_id in list(self.__sessions):
+            if len(self.__sessions) <= self.__max_sessions:
+                break
+            entry = self.__sessions[session_id]
+            if entry.pins > 0:
+                continue
+            del self.__sessions[session_id]
+            self.__evictions += 1
+            if self.__store is not None:
+                saved = threading.Event()
+                self.__evicting[session_id] = saved
+                evicted.append((session_id, entry, saved))
+        return evicted
+
+    def __save(self, evicted: List[Tuple[str, SessionEntry, threading.Event]]) -> None:
+        for session_id, entry, saved in evicted:
+            try:
+                state = entry.memory.export_state()
+                if state is not None:
+                    self.__store.save(self.memory_key, session_id, state)
+            finally:
+                with self.__lock:
+                    if self.__evicting.get(session_id, None) is saved:
+                        del self.__evicting[session_id]
+                saved.set()
+
+    def __build(self, session_id: str, entry: SessionEntry) -> None:
+        try:
+            with self.__lock:
+                saving = self.__evicting.get(session_id, None)
+            if saving is not None:
+                # the session was just evicted; restore it from the state being saved
+                saving.wait()
+            memory = self.__factory(session_id)
+            if self.__callback is not None:
+                memory.set_callback(self.__callback)
+            if self.__store is not None:
+                state = self.__store.load(self.memory_key, session_id)
+                if state is not None:
+                    memory.import_state(state)
+                    with self.__lock:
+                        self.__rehydrations += 1
+            entry.memory = memory
+        except BaseException as e:
+            entry.error = e
+            with self.__lock:
+                if self.__sessions.get(session_id, None) is entry:
+                    del self.__sessions[session_id]
+            raise
+        finally:
+            entry.ready.set()
+
+    def __acquire(self, session_id: str) -> SessionEntry:
+        with self.__lock:
+            entry = self.__sessions.get(session_id, None)
+            build = entry is None
+            if build:
+                entry = SessionEntry()
+                self.__sessions[session_id] = entry
+            self.__sessions.move_to_end(session_id)
+            entry.pins += 1
+        try:
+            if build:
+                self.__build(session_id, entry)
+            else:
+                entry.ready.wait()
+                if entry.error is not None:
+                    raise entry.error
+        except BaseException:
+            self.__release(entry)
+            raise
+        return entry
+
+    def __release(self, entry: SessionEntry) -> None:
+        with self.__lock:
+            entry.pins -= 1
+            evicted = self.__evict()
+        self.__save(evicted)
+
+    def call(self, session_id: Optional[str], func: Callable[[Memory[T]], Any]) -> Any:
+        """
+        Run `func` on the memory of a session. The session cannot be evicted while `func` runs.
+        """
+        entry = self.__acquire(session_id or DEFAULT_SESSION)
+        try:
+            return func(entry.memory)
+        finally:
+            self.__release(entry)
+
+    def set_callback(self, callback: Callback) -> None:
+        """Pass a callback to the memory of every session, including the ones built later."""
+        with self.__lock:
+            self.__callback = callback
+            memories = [entry.memory for entry in self.__sessions.values() if entry.memory is not None]
+        for memory in memories:
+            memory.set_callback(callback)
+
+    def for_session(self, session_id: Optional[str]) -> Memory[T]:
+        return BoundSessionMemory(self, session_id or DEFAULT_SESSION)
+
+    def save_context(self, context: T) -> Any:
+        return self.call(None, lambda memory: memory.save_context(context))
+
+    def save_contexts(self, contexts: List[T]) -> None:
+        self.call(None, lambda memory: memory.save_contexts(contexts))
+
+    def get_contexts(self, contexts: List[T]) -> List[T]:
+        return self.call(None, lambda memory: memory.get_contexts(contexts))
+
+    def reset_session(self, session_id: Optional[str]) -> None:
+        session_id = session_id or DEFAULT_SESSION
+        self.call(session_id, lambda memory: memory.reset_memory())
+        if self.__store is not None:
+            self.__store.delete(self.memory_key, session_id)
+
+    def reset_memory(self) -> None:
+        """Reset every session, in process and in the store."""
+        with self.__lock:
+            session_ids = list(self.__sessions)
+        if self.__store is not None:
+            session_ids.extend(self.__store.session_ids(self.memory_key))
+        for session_id in dict.fromkeys(session_ids):
+            self.reset_session(session_id)
+
+    def flush(self) -> None:
+        """Save the state of every session still in process to the store, for example before exiting."""
+        if self.__store is None:
+            return
+        with self.__lock:
+            entries = [(session_id, entry) for session_id, entry in self.__sessions.items() if entry.memory is not None]
+        for session_id, entry in entries:
+            state = entry.memory.export_state()
+            if state is not None:
+                self.__store.save(self.memory_key, session_id, state)
+
+class BoundSessionMemory(Memory[T]):
+    """
+    The memory of one session of a SessionMemory, as returned by `SessionMemory.for_session`.
+    """
+
+    def __init__(self, sessions: SessionMemory[T], session_id: str) -> None:
+        super().__init__(sessions.memory_key)
+        self.__sessions: SessionMemory[T] = sessions
+        self.__session_id: str = session_id
+
+    @property
+    def session_id(self) -> str:
+        return self.__session_id
+
+    def save_context(self, context: T) -> Any:
+        return self.__sessions.call(self.__session_id, lambda memory: memory.save_context(context))
+
+    def save_contexts(self, contexts: List[T]) -> None:
+        self.__sessions.call(self.__session_id, lambda memory: memory.save_contexts(contexts))
+
+    def get_contexts(self, contexts: List[T]) -> List[T]:
+        return self.__sessions.call(self.__session_id, lambda memory: memory.get_contexts(contexts))
+
+    def reset_memory(self) -> None:
+        self.__sessions.reset_session(self.__session_id)
+
+__all__ = [
+    "DEFAULT_SESSION",
+    "SessionEntry",
+    "SessionMemory",
+    "BoundSessionMemory"
+]
@@ -0,0 +1,90 @@
+
+import json
+import time
+import sqlite3
+import threading
+
+from abc import ABC
+from abc import abstractmethod
+from typing import Any
+from typing import List
+from typing import Optional
+
+class SessionStore(ABC):
+    """
+    Persistent storage for the state of sessions that were evicted from process memory.
+    """
+
+    @abstractmethod
+    def load(self, memory_key: str, session_id: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def save(self, memory_key: str, session_id: str, state: Any) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, memory_key: str, session_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def session_ids(self, memory_key: str) -> List[str]:
+        pass
+
+class SQLiteSessionStore(SessionStore):
+    """
+    A SessionStore in a local SQLite file. States are stored as JSON, one row per session.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.__lock: threading.Lock = threading.Lock()
+        self.__connection: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "memory_key TEXT NOT NULL, "
+                "session_id TEXT NOT NULL, "
+                "state TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, "
+                "PRIMARY KEY (memory_key, session_id))"
+            )
+
+    def load(self, memory_key: str, session_id: str) -> Optional[Any]:
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT state FROM sessions WHERE memory_key = ? AND session_id = ?",
+                (memory_key, session_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, memory_key: str, session_id: str, state: Any) -> None:
+        data = json.dumps(state, ensure_ascii=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO sessions (memory_key, session_id, state, updated_at) VALUES (?, ?, ?, ?)",
+                (memory_key, session_id, data, time.time())
+            )
+
+    def delete(self, memory_key: str, session_id: str) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "DELETE FROM sessions WHERE memory_key = ? AND session_id = ?",
+                (memory_key, session_id)
+            )
+
+    def session_ids(self, memory_key: str) -> List[str]:
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT session_id FROM sessions WHERE memory_key = ?",
+                (memory_key,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+__all__ = [
+    "SessionStore",
+    "SQLiteSessionStore"
+]
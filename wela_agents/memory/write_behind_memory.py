@@ -0,0 +1,248 @@
+
+import queue
+import threading
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import TypeVar
+from typing import Optional
+
+from wela_agents.memory.memory import Memory
+from wela_agents.callback.callback import Callback
+
+T = TypeVar("T")
+
+_STOP = object()
+
+class WriteBehindMemory(Memory[T]):
+    """
+    Save contexts to the wrapped memory on a background thread, so that a turn does not wait for
+    embedding and upserting its messages.
+
+    Saves are queued and written in batches of up to `batch_size` contexts through `save_contexts`.
+    Sessions are spread by id over `writers` writer threads, each with its own queue, so the saves of
+    one session stay in order while a slow session holds up only the sessions sharing its writer.
+    Reads of a session wait for the saves queued to that session before them, so the next turn always
+    sees the previous one, but not for the saves of other sessions. When `max_pending` saves are
+    queued on a writer, further saves to it block until it catches up. An error in the writer is kept
+    for its session and raised by the next save or read of that session, or by `flush`. Call `flush`
+    or `close` before the process exits.
+    """
+
+    def __init__(self, memory: Memory[T], batch_size: int = 32, max_pending: int = 256, writers: int = 4) -> None:
+        super().__init__(memory.memory_key)
+        self.__memory: Memory[T] = memory
+        self.__batch_size: int = batch_size
+        self.__queues: List[queue.Queue] = [queue.Queue(maxsize=max_pending) for _ in range(max(1, writers))]
+        self.__condition: threading.Condition = threading.Condition()
+        self.__enqueued: Dict[Optional[str], int] = {}
+        self.__completed: Dict[Optional[str], int] = {}
+        self.__errors: Dict[Optional[str], BaseException] = {}
+        self.__workers: List[threading.Thread] = []
+
+    @property
+    def memory(self) -> Memory[T]:
+        return self.__memory
+
+    @property
+    def pending(self) -> int:
+        with self.__condition:
+            return sum(self.__enqueued.values()) - sum(self.__completed.values())
+
+    def __start(self) -> None:
+        with self.__condition:
+            if not self.__workers:
+                self.__workers = [
+                    threading.Thread(target=self.__run, args=(items,), name=f"write-behind-{self.memory_key}-{idx}", daemon=True)
+                    for idx, items in enumerate(self.__queues)
+                ]
+                for worker in self.__workers:
+                    worker.start()
+
+    def __queue(self, session_id: Optional[str]) -> queue.Queue:
+        return self.__queues[hash(session_id) % len(self.__queues)]
+
+    def __target(self, session_id: Optional[str]) -> Memory[T]:
+        return self.__memory if session_id is None else self.__memory.for_session(session_id)
+
+    def __write(self, session_id: Optional[str], contexts: List[T]) -> None:
+        try:
+            self.__target(session_id).save_contexts(contexts)
+        except BaseException as e:
+            with self.__condition:
+                # the first error of a session is kept until it is raised; later ones share its cause
+                self.__errors.setdefault(session_id, e)
+        finally:
+            with self.__condition:
+                self.__completed[session_id] = self.__completed.get(session_id, 0) + len(contexts)
+                self.__condition.notify_all()
+
+    def __drain(self, items: List[Tuple[Optional[str], List[T]]]) -> None:
+        # consecutive saves of the same session are written as one batch, keeping their order
+        start = 0
+        for idx in range(1, len(items) + 1):
+            if idx == len(items) or items[idx][0] != items[start][0]:
+                self.__write(items[start][0], [context for _, contexts in items[start:idx] for context in contexts])
+                start = idx
+
+    def __run(self, items_queue: queue.Queue) -> None:
+        while True:
+            item = items_queue.get()
+            if item is _STOP:
+                return
+            items = [item]
+            size = len(item[1])
+            stop = False
+            while size < self.__batch_size:
+                try:
+                    item = items_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                items.append(item)
+                size += len(item[1])
+            self.__drain(items)
+            if stop:
+                return
+
+    def __raise(self, session_id: Optional[str]) -> None:
+        with self.__condition:
+            error = self.__errors.pop(session_id, None)
+        if error is not None:
+            raise error
+
+    def enqueue(self, session_id: Optional[str], contexts: List[T], block: bool = True) -> bool:
+        """
+        Queue contexts for a session, or for the wrapped memory itself when `session_id` is None.
+        Without `block`, nothing is queued and False is returned if the queue has no room.
+        """
+        self.__raise(session_id)
+        if not contexts:
+            return True
+        self.__start()
+        contexts = list(contexts)
+        with self.__condition:
+            self.__enqueued[session_id] = self.__enqueued.get(session_id, 0) + len(contexts)
+        try:
+            if block:
+                self.__queue(session_id).put((session_id, contexts))
+            else:
+                self.__queue(session_id).put_nowait((session_id, contexts))
+        except BaseException as e:
+            with self.__condition:
+                self.__enqueued[session_id] -= len(contexts)
+                self.__condition.notify_all()
+            if isinstance(e, queue.Full):
+                return False
+            raise
+        return True
+
+    def wait_session(self, session_id: Optional[str], timeout: Optional[float] = None) -> bool:
+        """Wait until every save queued so far to one session is written. Returns False on timeout."""
+        with self.__condition:
+            target = self.__enqueued.get(session_id, 0)
+            return self.__condition.wait_for(lambda: self.__completed.get(session_id, 0) >= target, timeout)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every save queued so far is written. Returns False on timeout."""
+        with self.__condition:
+            targets = dict(self.__enqueued)
+            return self.__condition.wait_for(lambda: all(self.__completed.get(key, 0) >= target for key, target in targets.items()), timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait for every queued save, then raise the first error kept since the last flush, if any."""
+        if not self.wait(timeout):
+            raise TimeoutError(f"{self.pending} contexts of {self.memory_key} were not written in time")
+        with self.__condition:
+            errors, self.__errors = list(self.__errors.values()), {}
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        with self.__condition:
+            workers, self.__workers = self.__workers, []
+        for items_queue in self.__queues[:len(workers)]:
+            items_queue.put(_STOP)
+        for worker in workers:
+            worker.join()
+        self.flush()
+
+    def read(self, session_id: Optional[str]) -> None:
+        """Wait for the saves queued to a session and raise an error kept for it, before reading it."""
+        self.wait_session(session_id)
+        self.__raise(session_id)
+
+    def save_context(self, context: T) -> Any:
+        self.enqueue(None, [context])
+
+    def save_contexts(self, contexts: List[T]) -> None:
+        self.enqueue(None, contexts)
+
+    async def asave_context(self, context: T) -> Any:
+        await self.asave_contexts([context])
+
+    async def asave_contexts(self, contexts: List[T]) -> None:
+        if not self.enqueue(None, contexts, block=False):
+            await super().asave_contexts(contexts)
+
+    def get_contexts(self, contexts: List[T]) -> List[T]:
+        self.read(None)
+        return self.__memory.get_contexts(contexts)
+
+    def reset_memory(self) -> None:
+        self.wait()
+        self.__memory.reset_memory()
+
+    def export_state(self) -> Any:
+        self.wait()
+        return self.__memory.export_state()
+
+    def import_state(self, state: Any) -> None:
+        self.wait()
+        self.__memory.import_state(state)
+
+    def set_callback(self, callback: Callback) -> None:
+        self.__memory.set_callback(callback)
+
+    def for_session(self, session_id: Optional[str]) -> Memory[T]:
+        return WriteBehindSession(self, session_id)
+
+class WriteBehindSession(Memory[T]):
+    """
+    One session of the memory wrapped by a WriteBehindMemory, as returned by `for_session`.
+    """
+
+    def __init__(self, writer: WriteBehindMemory[T], session_id: Optional[str]) -> None:
+        super().__init__(writer.memory_key)
+        self.__writer: WriteBehindMemory[T] = writer
+        self.__session_id: Optional[str] = session_id
+
+    def __memory(self) -> Memory[T]:
+        return self.__writer.memory.for_session(self.__session_id)
+
+    def save_context(self, context: T) -> Any:
+        self.__writer.enqueue(self.__session_id, [context])
+
+    def save_contexts(self, contexts: List[T]) -> None:
+        self.__writer.enqueue(self.__session_id, contexts)
+
+    async def asave_contexts(self, contexts: List[T]) -> None:
+        if not self.__writer.enqueue(self.__session_id, contexts, block=False):
+            await super().asave_contexts(contexts)
+
+    def get_contexts(self, contexts: List[T]) -> List[T]:
+        self.__writer.read(self.__session_id)
+        return self.__memory().get_contexts(contexts)
+
+    def reset_memory(self) -> None:
+        self.__writer.read(self.__session_id)
+        self.__memory().reset_memory()
+
+__all__ = [
+    "WriteBehindMemory",
+    "WriteBehindSession"
+]
@@ -0,0 +1,19 @@
+
+from typing import Optional
+
+from wela_agents.models.model import Model
+from wela_agents.callback.callback import ModelCallback
+from wela_agents.schema.prompt.openai_chat import Message
+
+class ChatModel(Model[Message]):
+    """
+    A model that takes and returns chat messages in the OpenAI chat completions format. Agents accept
+    any chat model: a single endpoint such as `OpenAIChat`, or a router over several of them.
+    """
+
+    def set_callback(self, callback: Optional[ModelCallback]) -> None:
+        pass
+
+__all__ = [
+    "ChatModel"
+]
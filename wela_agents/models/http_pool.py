@@ -0,0 +1,211 @@
+
+import httpx
+import threading
+import importlib.util
+
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+from typing import AsyncIterator
+from typing_extensions import TypedDict
+
+class PoolStats(TypedDict):
+    max_connections: Optional[int]
+    """The configured limit of open connections per pool."""
+
+    max_keepalive_connections: Optional[int]
+    """The configured limit of idle connections kept alive per pool."""
+
+    connections: int
+    """Connections currently open in the sync and async pools."""
+
+    idle_connections: int
+    """Open connections that are waiting for a request."""
+
+    active_requests: int
+    """Requests that were sent and whose response has not been read to the end."""
+
+    peak_active_requests: int
+    """The highest number of simultaneously active requests so far."""
+
+    requests: int
+    """Requests sent in total."""
+
+class RequestCounter:
+
+    def __init__(self) -> None:
+        self.__lock: threading.Lock = threading.Lock()
+        self.active: int = 0
+        self.peak: int = 0
+        self.total: int = 0
+
+    def started(self) -> None:
+        with self.__lock:
+            self.active += 1
+            self.total += 1
+            self.peak = max(self.peak, self.active)
+
+    def finished(self) -> None:
+        with self.__lock:
+            self.active -= 1
+
+class CountedStream(httpx.SyncByteStream):
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[[], None]) -> None:
+        self.__stream: httpx.SyncByteStream = stream
+        self.__on_close: Optional[Callable[[], None]] = on_close
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self.__stream:
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self.__stream.close()
+        finally:
+            if self.__on_close:
+                self.__on_close()
+                self.__on_close = None
+
+class AsyncCountedStream(httpx.AsyncByteStream):
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]) -> None:
+        self.__stream: httpx.AsyncByteStream = stream
+        self.__on_close: Optional[Callable[[], None]] = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.__stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.__stream.aclose()
+        finally:
+            if self.__on_close:
+                self.__on_close()
+                self.__on_close = None
+
+class CountingTransport(httpx.HTTPTransport):
+
+    def __init__(self, counter: RequestCounter, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.__counter: RequestCounter = counter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.__counter.started()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self.__counter.finished()
+            raise
+        response.stream = CountedStream(response.stream, self.__counter.finished)
+        return response
+
+class AsyncCountingTransport(httpx.AsyncHTTPTransport):
+
+    def __init__(self, counter: RequestCounter, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.__counter: RequestCounter = counter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.__counter.started()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self.__counter.finished()
+            raise
+        response.stream = AsyncCountedStream(response.stream, self.__counter.finished)
+        return response
+
+class HTTPPool:
+    """
+    A connection pool that several OpenAIChat instances share, so that they reuse keep-alive
+    connections and TLS sessions instead of each opening its own.
+
+    The sync and async httpx clients are created on first use with the configured limits, keep-alive
+    expiry, HTTP/2 and timeouts. `stats` reports open and idle connections and request concurrency,
+    which helps to size `max_connections` for the concurrency an application actually reaches.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry: Optional[float] = 5.0,
+        http2: bool = False,
+        timeout: Optional[float] = 600.0,
+        connect_timeout: Optional[float] = 5.0
+    ) -> None:
+        if http2 and importlib.util.find_spec("h2") is None:
+            raise ImportError("HTTP/2 needs the h2 package; install it with `pip install httpx[http2]`")
+        self.__limits: httpx.Limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.__http2: bool = http2
+        self.__timeout: httpx.Timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.__counter: RequestCounter = RequestCounter()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__transport: Optional[CountingTransport] = None
+        self.__async_transport: Optional[AsyncCountingTransport] = None
+        self.__client: Optional[httpx.Client] = None
+        self.__async_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        with self.__lock:
+            if self.__client is None:
+                self.__transport = CountingTransport(self.__counter, limits=self.__limits, http2=self.__http2)
+                self.__client = httpx.Client(transport=self.__transport, timeout=self.__timeout, follow_redirects=True)
+            return self.__client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        with self.__lock:
+            if self.__async_client is None:
+                self.__async_transport = AsyncCountingTransport(self.__counter, limits=self.__limits, http2=self.__http2)
+                self.__async_client = httpx.AsyncClient(transport=self.__async_transport, timeout=self.__timeout, follow_redirects=True)
+            return self.__async_client
+
+    def __connections(self, transport: Optional[httpx.BaseTransport]) -> list:
+        # httpx does not expose its connection pool, so this reads it defensively
+        pool = getattr(transport, "_pool", None)
+        return list(getattr(pool, "connections", []))
+
+    def stats(self) -> PoolStats:
+        connections = self.__connections(self.__transport) + self.__connections(self.__async_transport)
+        return PoolStats(
+            max_connections=self.__limits.max_connections,
+            max_keepalive_connections=self.__limits.max_keepalive_connections,
+            connections=len(connections),
+            idle_connections=sum(1 for connection in connections if connection.is_idle()),
+            active_requests=self.__counter.active,
+            peak_active_requests=self.__counter.peak,
+            requests=self.__counter.total
+        )
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__client is not None:
+                self.__client.close()
+                self.__client = None
+                self.__transport = None
+
+    async def aclose(self) -> None:
+        with self.__lock:
+            async_client, self.__async_client, self.__async_transport = self.__async_client, None, None
+        if async_client is not None:
+            await async_client.aclose()
+
+__all__ = [
+    "PoolStats",
+    "RequestCounter",
+    "CountedStream",
+    "AsyncCountedStream",
+    "CountingTransport",
+    "AsyncCountingTransport",
+    "HTTPPool"
+]
@@ -1,11 +1,16 @@
 
 from abc import ABC
 from abc import abstractmethod
+from types import GeneratorType
 from typing import List
 from typing import Union
 from typing import TypeVar
 from typing import Generic
 from typing import Generator
+from typing import AsyncGenerator
+
+from wela_agents.utils.concurrency import run_in_thread
+from wela_agents.utils.concurrency import iterate_in_thread
 
 T = TypeVar("T")
 
@@ -25,6 +30,12 @@ class Model(ABC, Generic[T]):
     def predict(self, **kargs) -> Union[List[T], Generator[List[T], None, None]]:
         pass
 
+    async def apredict(self, **kargs) -> Union[List[T], AsyncGenerator[List[T], None]]:
+        prediction = await run_in_thread(self.predict, **kargs)
+        if isinstance(prediction, GeneratorType):
+            return iterate_in_thread(prediction)
+        return prediction
+
 __all__ = [
     "Model"
 ]
@@ -1,23 +1,84 @@
 
+import time
 import httpx
 
+from types import GeneratorType
+
+from typing import Any
 from typing import Dict
 from typing import List
+from typing import Tuple
 from typing import Union
+from typing import Callable
 from typing import Optional
+from typing import Awaitable
 from typing import Generator
+from typing import AsyncGenerator
 from typing_extensions import Literal
 from openai import OpenAI
-from openai import Stream
+from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletion
 from openai.types.chat import ChatCompletionChunk
 from openai.types.chat import ChatCompletionToolParam
 from openai.types.chat.completion_create_params import ResponseFormat
-from wela_agents.models.model import Model
+from wela_agents.models.chat_model import ChatModel
+from wela_agents.models.http_pool import HTTPPool
+from wela_agents.models.rate_limiter import RateLimitScheduler
+from wela_agents.callback.event import ModelEvent
+from wela_agents.callback.callback import ModelCallback
+from wela_agents.models.response_cache import ResponseCache
+from wela_agents.utils.concurrency import run_in_thread
+from wela_agents.utils.concurrency import iterate_async
+from wela_agents.utils.concurrency import iterate_in_thread
 from wela_agents.schema.prompt.openai_chat import Message
 from wela_agents.schema.prompt.openai_chat import AIMessage
 
-class OpenAIChat(Model[Message]):
+class ModelCall:
+    """
+    Reports one model request to a ModelCallback: timing, time to first token and usage.
+    Without a callback every method is a no-op.
+    """
+
+    def __init__(self, callback: Optional[ModelCallback], model_name: str, stream: bool) -> None:
+        self.__callback: Optional[ModelCallback] = callback
+        self.__model_name: str = model_name
+        self.__stream: bool = stream
+        self.__start: float = time.perf_counter()
+        self.__time_to_first_token: Optional[float] = None
+        self.__usage: Optional[Dict[str, Any]] = None
+        self.__finished: bool = False
+        if self.__callback:
+            self.__callback.before_model_call(ModelEvent(model_name, stream))
+
+    def observe(self, response: Any) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.__usage = usage.to_dict() if hasattr(usage, "to_dict") else usage
+
+    def first_token(self) -> None:
+        if self.__time_to_first_token is None:
+            self.__time_to_first_token = time.perf_counter() - self.__start
+            if self.__callback:
+                self.__callback.on_first_token(ModelEvent(self.__model_name, self.__stream, time_to_first_token=self.__time_to_first_token))
+
+    def finish(self, error: Optional[Exception] = None, cached: bool = False) -> None:
+        if self.__finished:
+            return
+        self.__finished = True
+        if self.__callback:
+            self.__callback.after_model_call(
+                ModelEvent(
+                    self.__model_name,
+                    self.__stream,
+                    duration=time.perf_counter() - self.__start,
+                    time_to_first_token=self.__time_to_first_token,
+                    usage=self.__usage,
+                    cached=cached,
+                    error=error
+                )
+            )
+
+class OpenAIChat(ChatModel):
     def __init__(
         self,
         *,
@@ -28,16 +89,31 @@ class OpenAIChat(Model[Message]):
         top_p: Optional[float] = None,
         frequency_penalty: Optional[float] = None,
         presence_penalty: Optional[float] = None,
-        stream: Optional[Literal[False]] | Literal[True] = None
+        stream: Optional[Literal[False]] | Literal[True] = None,
+        stream_usage: bool = False,
+        cache: Optional[ResponseCache] = None,
+        callback: Optional[ModelCallback] = None,
+        http_pool: Optional[HTTPPool] = None,
+        max_retries: int = 2,
+        scheduler: Optional[RateLimitScheduler] = None,
+        priority: int = 0,
+        raise_errors: bool = False
     ) -> None:
         super().__init__()
         self.__model_name: str = model_name
-        self.__client: OpenAI = OpenAI(api_key=api_key, base_url=base_url)
+        self.__http_pool: Optional[HTTPPool] = http_pool
+        self.__client: OpenAI = OpenAI(api_key=api_key, base_url=base_url, http_client=http_pool.client if http_pool else None, max_retries=max_retries)
         self.__temperature: Optional[float] = temperature
         self.__top_p: Optional[float] = top_p
         self.__frequency_penalty: Optional[float] = frequency_penalty
         self.__presence_penalty: Optional[float] = presence_penalty
         self.__stream: Optional[Literal[False]] | Literal[True] = stream
+        self.__stream_usage: bool = stream_usage
+        self.__cache: Optional[ResponseCache] = cache
+        self.__callback: Optional[ModelCallback] = callback
+        self.__scheduler: Optional[RateLimitScheduler] = scheduler
+        self.__priority: int = priority
+        self.__raise_errors: bool = raise_errors
 
     @property
     def model_name(self) -> str:
@@ -47,7 +123,23 @@ class OpenAIChat(Model[Message]):
     def streaming(self) -> bool:
         return self.__stream is True
 
-    def __create(
+    @property
+    def http_pool(self) -> Optional[HTTPPool]:
+        return self.__http_pool
+
+    @property
+    def scheduler(self) -> Optional[RateLimitScheduler]:
+        return self.__scheduler
+
+    @property
+    def raise_errors(self) -> bool:
+        """Whether a failed request raises, instead of being answered with the error as assistant text."""
+        return self.__raise_errors
+
+    def set_callback(self, callback: Optional[ModelCallback]) -> None:
+        self.__callback = callback
+
+    def _create_params(
         self,
         *,
         messages: List[Message],
@@ -59,8 +151,9 @@ class OpenAIChat(Model[Message]):
         response_format : ResponseFormat = None,
         tools: List[ChatCompletionToolParam] = None,
         logprobs: bool | None = None,
-        top_logprobs: int | None = None
-    ) -> Union[ChatCompletion, Stream[ChatCompletionChunk]]:
+        top_logprobs: int | None = None,
+        parallel_tool_calls: bool = False
+    ) -> Dict:
         params: Dict = {
             "model": self.__model_name,
             "stream": self.__stream,
@@ -148,12 +241,16 @@ class OpenAIChat(Model[Message]):
             })
         if tools != None:
             params.update({
-                "parallel_tool_calls": False
+                "parallel_tool_calls": parallel_tool_calls
             })
         if response_format != None:
             params.update({
                 "response_format": response_format
             })
+        if self.__stream and self.__stream_usage:
+            params.update({
+                "stream_options": {"include_usage": True}
+            })
         if self.__model_name in [
             "gpt-5",
             "gpt-5-mini",
@@ -167,12 +264,9 @@ class OpenAIChat(Model[Message]):
                 "reasoning_effort": reasoning_effort,
                 "verbosity": verbosity
             })
-        return self.__client.chat.completions.create(**{k: v for k, v in params.items() if v != None})
-
-    def predict(self, **kwargs) -> Union[List[Message], Generator[List[Message], None, None]]:
-
-        assert "messages" in kwargs, "messages is required"
+        return {k: v for k, v in params.items() if v != None}
 
+    def _request_params(self, **kwargs) -> Dict:
         messages: List[Message] = kwargs["messages"]
         reasoning_effort: Optional[Literal["minimal", "low", "medium", "high"]] = kwargs.get("reasoning_effort", None)
         verbosity: Optional[Literal['low', 'medium', 'high']] = kwargs.get("verbosity", None)
@@ -185,39 +279,243 @@ class OpenAIChat(Model[Message]):
 
         logprobs: bool | None = kwargs.get("logprobs", None)
         top_logprobs: int | None = kwargs.get("top_logprobs", None)
+        parallel_tool_calls: bool = kwargs.get("parallel_tool_calls", False)
+
+        return self._create_params(
+            messages=messages,
+            reasoning_effort=reasoning_effort,
+            verbosity=verbosity,
+            n=n,
+            max_completion_tokens=max_completion_tokens,
+            stop=stop,
+            response_format=response_format,
+            tools=tools,
+            logprobs=logprobs,
+            top_logprobs=top_logprobs,
+            parallel_tool_calls=parallel_tool_calls
+        )
+
+    def _completion_messages(self, completion: ChatCompletion) -> List[Message]:
+        return [choice.message.to_dict() for choice in completion.choices]
+
+    def _chunk_messages(self, chunk: ChatCompletionChunk, n: Optional[int]) -> Generator[List[Message], None, None]:
+        messages = [None for _ in range(1 if n == None else n)]
+        for choice in chunk.choices:
+            index = choice.index
+            messages[index] = choice.delta.to_dict()
+            if not choice.finish_reason:
+                yield messages
+
+    def _cache_lookup(self, params: Dict) -> Tuple[Optional[str], Optional[Any]]:
+        if self.__cache is None:
+            return None, None
+        # the same model name may be served by different endpoints, so the endpoint is part of the key
+        key = self.__cache.key({**params, "base_url": str(self.__client.base_url)})
+        return key, self.__cache.get(key)
+
+    def _cache_store(self, key: Optional[str], value: Any) -> None:
+        if self.__cache is not None and key is not None:
+            self.__cache.put(key, value)
+
+    def _replay(self, chunks: List[List[Message]]) -> Generator[List[Message], None, None]:
+        for messages in chunks:
+            yield messages
 
+    def _schedule(self, create: Callable[..., Any], params: Dict, priority: Optional[int]) -> Any:
+        if self.__scheduler is None:
+            return create(**params)
+        return self.__scheduler.call(lambda: create(**params), params, self.__priority if priority is None else priority)
+
+    async def _aschedule(self, create: Callable[..., Awaitable[Any]], params: Dict, priority: Optional[int]) -> Any:
+        if self.__scheduler is None:
+            return await create(**params)
+        return await self.__scheduler.acall(lambda: create(**params), params, self.__priority if priority is None else priority)
+
+    def _observe_usage(self, params: Dict, chunk: ChatCompletionChunk) -> None:
+        # streamed responses report their usage in the last chunk when `stream_usage` is on
+        if self.__scheduler is not None and getattr(chunk, "usage", None) is not None:
+            self.__scheduler.record_usage(self.__scheduler.estimate(params), chunk.usage.total_tokens)
+
+    def _model_call(self) -> ModelCall:
+        return ModelCall(self.__callback, self.__model_name, self.streaming)
+
+    def _error_messages(self, e: Exception, n: Optional[int]) -> List[Message]:
+        return [AIMessage(role="assistant", content=f"{e}") for _ in range(1 if n == None else n)]
+
+    def _request(self, **kwargs) -> Union[List[Message], Generator[List[Message], None, None]]:
+        """
+        Like `predict`, but raises when the request fails instead of answering with the error text.
+        """
+        n: Optional[int] = kwargs.get("n", None)
+
+        call = self._model_call()
         try:
-            completions = self.__create(
-                messages=messages,
-                reasoning_effort=reasoning_effort,
-                verbosity=verbosity,
-                n=n,
-                max_completion_tokens=max_completion_tokens,
-                stop=stop,
-                response_format=response_format,
-                tools=tools,
-                logprobs=logprobs,
-                top_logprobs=top_logprobs
-            )
+            params = self._request_params(**kwargs)
+            key, cached = self._cache_lookup(params)
+            if cached is not None:
+                call.finish(cached=True)
+                return cached if not self.__stream else self._replay(cached)
+            completions = self._schedule(self.__client.chat.completions.create, params, kwargs.get("priority", None))
             if not self.__stream:
-                return [choice.message.to_dict() for choice in completions.choices]
+                call.observe(completions)
+                call.finish()
+                messages = self._completion_messages(completions)
+                self._cache_store(key, messages)
+                return messages
             def stream():
-                for chunk in completions:
-                    messages = [None for _ in range(1 if n == None else n)]
-                    for choice in chunk.choices:
-                        index = choice.index
-                        messages[index] = choice.delta.to_dict()
-                        if not choice.finish_reason:
+                chunks = []
+                error = None
+                try:
+                    for chunk in completions:
+                        call.observe(chunk)
+                        self._observe_usage(params, chunk)
+                        for messages in self._chunk_messages(chunk, n):
+                            call.first_token()
+                            chunks.append(list(messages))
                             yield messages
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    call.finish(error)
+                self._cache_store(key, chunks)
             return stream()
         except Exception as e:
-            if not self.__stream:
-                return [AIMessage(role="assistant", content=f"{e}")]
-            else:
-                def stream(e: Exception):
-                    yield [AIMessage(role="assistant", content=f"{e}") for _ in range(1 if n == None else n)]
-            return stream(e)
+            call.finish(e)
+            raise
+
+    async def _arequest(self, **kwargs) -> Union[List[Message], AsyncGenerator[List[Message], None]]:
+        """
+        Like `apredict`, but raises when the request fails instead of answering with the error text.
+        """
+        prediction = await run_in_thread(self._request, **kwargs)
+        if isinstance(prediction, GeneratorType):
+            return iterate_in_thread(prediction)
+        return prediction
+
+    def _failed(self, e: Exception, n: Optional[int]) -> Union[List[Message], Generator[List[Message], None, None]]:
+        if not self.__stream:
+            return [AIMessage(role="assistant", content=f"{e}")]
+        def stream():
+            yield self._error_messages(e, n)
+        return stream()
+
+    def _afailed(self, e: Exception, n: Optional[int]) -> Union[List[Message], AsyncGenerator[List[Message], None]]:
+        if not self.__stream:
+            return [AIMessage(role="assistant", content=f"{e}")]
+        async def stream():
+            yield self._error_messages(e, n)
+        return stream()
+
+    def predict(self, **kwargs) -> Union[List[Message], Generator[List[Message], None, None]]:
+
+        assert "messages" in kwargs, "messages is required"
+
+        try:
+            return self._request(**kwargs)
+        except Exception as e:
+            if self.__raise_errors:
+                raise
+            return self._failed(e, kwargs.get("n", None))
+
+    async def apredict(self, **kwargs) -> Union[List[Message], AsyncGenerator[List[Message], None]]:
+
+        assert "messages" in kwargs, "messages is required"
+
+        try:
+            return await self._arequest(**kwargs)
+        except Exception as e:
+            if self.__raise_errors:
+                raise
+            return self._afailed(e, kwargs.get("n", None))
+
+class AsyncOpenAIChat(OpenAIChat):
+    """
+    An OpenAIChat whose `apredict` runs natively on the asyncio event loop through `AsyncOpenAI`.
+    The blocking `predict` stays available for synchronous callers.
+    """
+
+    def __init__(
+        self,
+        *,
+        model_name: str,
+        api_key: str | None = None,
+        base_url: str | httpx.URL | None = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        frequency_penalty: Optional[float] = None,
+        presence_penalty: Optional[float] = None,
+        stream: Optional[Literal[False]] | Literal[True] = None,
+        stream_usage: bool = False,
+        cache: Optional[ResponseCache] = None,
+        callback: Optional[ModelCallback] = None,
+        http_pool: Optional[HTTPPool] = None,
+        max_retries: int = 2,
+        scheduler: Optional[RateLimitScheduler] = None,
+        priority: int = 0,
+        raise_errors: bool = False
+    ) -> None:
+        super().__init__(
+            model_name=model_name,
+            api_key=api_key,
+            base_url=base_url,
+            temperature=temperature,
+            top_p=top_p,
+            frequency_penalty=frequency_penalty,
+            presence_penalty=presence_penalty,
+            stream=stream,
+            stream_usage=stream_usage,
+            cache=cache,
+            callback=callback,
+            http_pool=http_pool,
+            max_retries=max_retries,
+            scheduler=scheduler,
+            priority=priority,
+            raise_errors=raise_errors
+        )
+        self.__async_client: AsyncOpenAI = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_pool.async_client if http_pool else None, max_retries=max_retries)
+
+    async def _arequest(self, **kwargs) -> Union[List[Message], AsyncGenerator[List[Message], None]]:
+        n: Optional[int] = kwargs.get("n", None)
+
+        call = self._model_call()
+        try:
+            params = self._request_params(**kwargs)
+            key, cached = self._cache_lookup(params)
+            if cached is not None:
+                call.finish(cached=True)
+                return cached if not self.streaming else iterate_async(cached)
+            completions = await self._aschedule(self.__async_client.chat.completions.create, params, kwargs.get("priority", None))
+            if not self.streaming:
+                call.observe(completions)
+                call.finish()
+                messages = self._completion_messages(completions)
+                self._cache_store(key, messages)
+                return messages
+            async def stream():
+                chunks = []
+                error = None
+                try:
+                    async for chunk in completions:
+                        call.observe(chunk)
+                        self._observe_usage(params, chunk)
+                        for messages in self._chunk_messages(chunk, n):
+                            call.first_token()
+                            chunks.append(list(messages))
+                            yield messages
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    call.finish(error)
+                self._cache_store(key, chunks)
+            return stream()
+        except Exception as e:
+            call.finish(e)
+            raise
 
 __all__ = [
-    "OpenAIChat"
+    "ModelCall",
+    "OpenAIChat",
+    "AsyncOpenAIChat"
 ]
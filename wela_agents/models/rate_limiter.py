@@ -0,0 +1,279 @@
+
+import re
+import json
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+
+from email.utils import parsedate_to_datetime
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Callable
+from typing import Optional
+from typing import Awaitable
+
+from openai import RateLimitError
+
+from wela_agents.models.token_counter import TokenCounter
+
+class TokenBucket:
+    """
+    A bucket holding up to `capacity` units that refills continuously at `rate` units per second.
+    A request larger than the capacity waits for a full bucket and then leaves it in debt. The bucket
+    starts with `level` units, full by default.
+    """
+
+    def __init__(self, capacity: float, rate: float, level: Optional[float] = None) -> None:
+        self.__capacity: float = capacity
+        self.__rate: float = rate
+        self.__level: float = capacity if level is None else min(level, capacity)
+        self.__updated: float = time.monotonic()
+
+    @property
+    def capacity(self) -> float:
+        return self.__capacity
+
+    def __refill(self, now: float) -> None:
+        self.__level = min(self.__capacity, self.__level + (now - self.__updated) * self.__rate)
+        self.__updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self.__refill(now)
+        amount = min(amount, self.__capacity)
+        return 0.0 if self.__level >= amount else (amount - self.__level) / self.__rate
+
+    def take(self, amount: float, now: float) -> None:
+        self.__refill(now)
+        self.__level -= amount
+
+    def give(self, amount: float, now: float) -> None:
+        self.__refill(now)
+        self.__level = min(self.__capacity, self.__level + amount)
+
+class RateLimitScheduler:
+    """
+    Schedule chat requests under a requests-per-minute and a tokens-per-minute limit.
+
+    Every request waits in a priority queue, higher `priority` first and then in arrival order, until
+    both token buckets can cover it. The buckets refill evenly and hold `burst_seconds` worth of the
+    limits, because providers enforce per-minute limits over shorter intervals too. They start filled
+    to `initial_fill` of that, empty by default, so that the first minute admits no more than the
+    limits; a full start would add a burst on top of the minute's refill. Its token cost is estimated
+    before sending from the prompt, the tools and the completion allowance, and corrected once the
+    response reports its usage. A 429 answer pauses the whole queue for as long as the server's retry
+    hints ask, or for an exponential backoff with jitter, and the request is retried up to
+    `max_retries` times. Models using a scheduler are best built with `max_retries=0`, so that
+    retries are not hidden in the client. Once the retries are exhausted the RateLimitError is
+    raised; a model built without `raise_errors` turns it into an assistant message, like any
+    other error.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        counter: Optional[TokenCounter] = None,
+        completion_tokens: int = 512,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        burst_seconds: float = 1.0,
+        initial_fill: float = 0.0
+    ) -> None:
+        self.__requests: Optional[TokenBucket] = self.__bucket(requests_per_minute, burst_seconds, initial_fill)
+        self.__tokens: Optional[TokenBucket] = self.__bucket(tokens_per_minute, burst_seconds, initial_fill)
+        self.__counter: TokenCounter = counter or TokenCounter()
+        self.__completion_tokens: int = completion_tokens
+        self.__max_retries: int = max_retries
+        self.__base_delay: float = base_delay
+        self.__max_delay: float = max_delay
+        self.__condition: threading.Condition = threading.Condition()
+        self.__queue: List[Tuple[int, int]] = []
+        self.__sequence: itertools.count = itertools.count()
+        self.__paused_until: float = 0.0
+        self.__throttled: int = 0
+
+    def __bucket(self, per_minute: Optional[float], burst_seconds: float, initial_fill: float) -> Optional[TokenBucket]:
+        if not per_minute:
+            return None
+        rate = per_minute / 60.0
+        capacity = max(1.0, rate * burst_seconds)
+        return TokenBucket(capacity, rate, capacity * initial_fill)
+
+    @property
+    def queued(self) -> int:
+        return len(self.__queue)
+
+    @property
+    def throttled(self) -> int:
+        """Number of 429 answers received so far."""
+        return self.__throttled
+
+    def estimate(self, params: Dict[str, Any]) -> int:
+        tokens = self.__counter.count_messages(params.get("messages", None) or [])
+        if params.get("tools", None):
+            tokens += self.__counter.count_text(json.dumps(params["tools"], ensure_ascii=False))
+        completion_tokens = params.get("max_completion_tokens", None) or params.get("max_tokens", None) or self.__completion_tokens
+        return tokens + completion_tokens * (params.get("n", None) or 1)
+
+    def __enqueue(self, priority: int) -> Tuple[int, int]:
+        ticket = (-priority, next(self.__sequence))
+        with self.__condition:
+            heapq.heappush(self.__queue, ticket)
+        return ticket
+
+    def __try_acquire(self, ticket: Tuple[int, int], tokens: int) -> Optional[float]:
+        """
+        Take the capacity for a request if it is first in line. Returns 0 once taken, the seconds to
+        wait when it is first in line, or None when it is not its turn yet. Must hold the condition.
+        """
+        if self.__queue[0] != ticket:
+            return None
+        now = time.monotonic()
+        wait_time = max(
+            self.__paused_until - now,
+            self.__requests.wait_time(1, now) if self.__requests else 0.0,
+            self.__tokens.wait_time(tokens, now) if self.__tokens else 0.0
+        )
+        if wait_time > 0:
+            return wait_time
+        if self.__requests:
+            self.__requests.take(1, now)
+        if self.__tokens:
+            self.__tokens.take(tokens, now)
+        heapq.heappop(self.__queue)
+        self.__condition.notify_all()
+        return 0.0
+
+    def __withdraw(self, ticket: Tuple[int, int]) -> None:
+        with self.__condition:
+            if ticket in self.__queue:
+                self.__queue.remove(ticket)
+                heapq.heapify(self.__queue)
+                self.__condition.notify_all()
+
+    def acquire(self, tokens: int, priority: int = 0) -> None:
+        ticket = self.__enqueue(priority)
+        try:
+            with self.__condition:
+                while True:
+                    wait_time = self.__try_acquire(ticket, tokens)
+                    if wait_time == 0.0:
+                        return
+                    self.__condition.wait(wait_time)
+        except BaseException:
+            self.__withdraw(ticket)
+            raise
+
+    async def aacquire(self, tokens: int, priority: int = 0) -> None:
+        ticket = self.__enqueue(priority)
+        try:
+            while True:
+                with self.__condition:
+                    wait_time = self.__try_acquire(ticket, tokens)
+                if wait_time == 0.0:
+                    return
+                await asyncio.sleep(min(wait_time, 0.05) if wait_time is not None else 0.01)
+        except BaseException:
+            self.__withdraw(ticket)
+            raise
+
+    def record_usage(self, estimated: int, actual: int) -> None:
+        """Correct the token bucket by the difference between an estimate and the reported usage."""
+        if self.__tokens is None or actual == estimated:
+            return
+        with self.__condition:
+            now = time.monotonic()
+            if actual < estimated:
+                self.__tokens.give(estimated - actual, now)
+            else:
+                self.__tokens.take(actual - estimated, now)
+            self.__condition.notify_all()
+
+    def __retry_after(self, error: RateLimitError, attempt: int) -> float:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        delay = None
+        if headers.get("retry-after-ms", None):
+            delay = float(headers["retry-after-ms"]) / 1000
+        elif headers.get("retry-after", None):
+            try:
+                delay = float(headers["retry-after"])
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(headers["retry-after"]).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+        if delay is None:
+            resets = [parse_duration(headers.get(name, None)) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+            resets = [reset for reset in resets if reset is not None]
+            delay = max(resets) if resets else None
+        if delay is None or delay <= 0:
+            delay = self.__base_delay * (2 ** attempt) * (0.5 + random.random())
+        return min(delay, self.__max_delay)
+
+    def __throttle(self, error: RateLimitError, attempt: int) -> None:
+        delay = self.__retry_after(error, attempt)
+        with self.__condition:
+            self.__throttled += 1
+            self.__paused_until = max(self.__paused_until, time.monotonic() + delay)
+            self.__condition.notify_all()
+
+    def __reconcile(self, tokens: int, response: Any) -> None:
+        total_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if total_tokens is not None:
+            self.record_usage(tokens, total_tokens)
+
+    def call(self, func: Callable[[], Any], params: Dict[str, Any], priority: int = 0) -> Any:
+        """
+        Call `func` once the request described by `params` is within the limits, retrying it on 429.
+        """
+        tokens = self.estimate(params)
+        for attempt in range(self.__max_retries + 1):
+            self.acquire(tokens, priority)
+            try:
+                response = func()
+            except RateLimitError as e:
+                if attempt == self.__max_retries:
+                    raise
+                self.__throttle(e, attempt)
+                continue
+            self.__reconcile(tokens, response)
+            return response
+
+    async def acall(self, func: Callable[[], Awaitable[Any]], params: Dict[str, Any], priority: int = 0) -> Any:
+        tokens = self.estimate(params)
+        for attempt in range(self.__max_retries + 1):
+            await self.aacquire(tokens, priority)
+            try:
+                response = await func()
+            except RateLimitError as e:
+                if attempt == self.__max_retries:
+                    raise
+                self.__throttle(e, attempt)
+                continue
+            self.__reconcile(tokens, response)
+            return response
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate limit reset duration such as `1s`, `6m0s` or `120ms` into seconds.
+    """
+    if not value:
+        return None
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    unit_seconds = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(number) * unit_seconds[unit] for number, unit in parts)
+
+__all__ = [
+    "TokenBucket",
+    "RateLimitScheduler",
+    "parse_duration"
+]
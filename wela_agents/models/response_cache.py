@@ -0,0 +1,120 @@
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import Tuple
+from typing import Optional
+
+class ResponseCache:
+    """
+    A cache of chat completion responses keyed on the canonicalised request.
+
+    Values are kept as JSON in an in-memory LRU, and optionally in one file per key under `cache_dir`,
+    so every lookup hands back a fresh copy. Entries older than `ttl` seconds are treated as missing,
+    and their files are removed when they are read.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None, cache_dir: Optional[str] = None) -> None:
+        self.__max_size: int = max_size
+        self.__ttl: Optional[float] = ttl
+        self.__cache_dir: Optional[str] = cache_dir
+        self.__lru: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__hits: int = 0
+        self.__misses: int = 0
+
+        if self.__cache_dir:
+            os.makedirs(self.__cache_dir, exist_ok=True)
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def key(self, params: Dict[str, Any]) -> str:
+        canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.__cache_dir, key[:2], f"{key}.json")
+
+    def __expired(self, created: float) -> bool:
+        return self.__ttl is not None and time.time() - created > self.__ttl
+
+    def __read_disk(self, key: str) -> Optional[Tuple[float, str]]:
+        try:
+            with open(self.__path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry["created"], entry["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def __write_disk(self, key: str, created: float, value: str) -> None:
+        path = self.__path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": created, "value": value}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def __remove_disk(self, key: str, created: float) -> None:
+        # another writer may have replaced the entry since it was read, so only the expired one is removed
+        entry = self.__read_disk(key)
+        if entry is not None and entry[0] == created:
+            try:
+                os.remove(self.__path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.__lock:
+            entry = self.__lru.get(key, None)
+            if entry is not None:
+                self.__lru.move_to_end(key)
+        if entry is None and self.__cache_dir:
+            entry = self.__read_disk(key)
+        if entry is not None and self.__expired(entry[0]):
+            if self.__cache_dir:
+                self.__remove_disk(key, entry[0])
+            entry = None
+        with self.__lock:
+            if entry is None:
+                self.__lru.pop(key, None)
+                self.__misses += 1
+                return None
+            self.__remember(key, entry)
+            self.__hits += 1
+        return json.loads(entry[1])
+
+    def __remember(self, key: str, entry: Tuple[float, str]) -> None:
+        self.__lru[key] = entry
+        self.__lru.move_to_end(key)
+        while len(self.__lru) > self.__max_size:
+            self.__lru.popitem(last=False)
+
+    def put(self, key: str, value: Any) -> None:
+        created = time.time()
+        serialized = json.dumps(value, ensure_ascii=False, default=str)
+        with self.__lock:
+            self.__remember(key, (created, serialized))
+        if self.__cache_dir:
+            self.__write_disk(key, created, serialized)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__lru.clear()
+            self.__hits = 0
+            self.__misses = 0
+
+__all__ = [
+    "ResponseCache"
+]
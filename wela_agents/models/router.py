@@ -0,0 +1,425 @@
+
+import time
+import random
+import asyncio
+import weakref
+import threading
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Union
+from typing import Optional
+from typing import Generator
+from typing import AsyncGenerator
+from typing_extensions import TypedDict
+
+from wela_agents.models.chat_model import ChatModel
+from wela_agents.models.openai_chat import OpenAIChat
+from wela_agents.callback.callback import ModelCallback
+from wela_agents.schema.prompt.openai_chat import Message
+
+class EndpointStatus(TypedDict):
+    index: int
+    model_name: str
+    latency: Optional[float]
+    """Moving average of the latency in seconds: the whole response, or the first chunk of a stream."""
+    error_rate: float
+    """Moving average of the share of failed requests."""
+    in_flight: int
+    requests: int
+    failures: int
+    hedges: int
+    """Requests this endpoint received as the hedge of a slow request."""
+    healthy: bool
+
+class EndpointStats:
+
+    def __init__(self, window: int, alpha: float) -> None:
+        self.__alpha: float = alpha
+        self.__samples: deque = deque(maxlen=window)
+        self.latency: Optional[float] = None
+        self.error_rate: float = 0.0
+        self.in_flight: int = 0
+        self.requests: int = 0
+        self.failures: int = 0
+        self.hedges: int = 0
+        self.consecutive_failures: int = 0
+        self.unhealthy_until: float = 0.0
+
+    @property
+    def samples(self) -> int:
+        return len(self.__samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.__samples:
+            return None
+        samples = sorted(self.__samples)
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+    def succeeded(self, latency: float) -> None:
+        self.__samples.append(latency)
+        self.latency = latency if self.latency is None else self.latency + self.__alpha * (latency - self.latency)
+        self.error_rate -= self.__alpha * self.error_rate
+        self.consecutive_failures = 0
+
+    def failed(self) -> None:
+        self.failures += 1
+        self.error_rate += self.__alpha * (1.0 - self.error_rate)
+        self.consecutive_failures += 1
+
+class Attempt:
+
+    def __init__(self, endpoint: int, messages: Optional[List[Message]] = None, first: Optional[List[Message]] = None, stream: Any = None) -> None:
+        self.endpoint: int = endpoint
+        self.messages: Optional[List[Message]] = messages
+        self.first: Optional[List[Message]] = first
+        self.stream: Any = stream
+        self.settled: bool = False
+
+class RouterChat(ChatModel):
+    """
+    A chat model that spreads requests over several OpenAI-compatible endpoints, such as replicas of
+    a self-hosted model.
+
+    Each request goes to the better of two randomly drawn healthy endpoints, scored by their moving
+    average latency, error rate and requests in flight. With `hedge_percentile`, a duplicate request
+    is sent to another endpoint once the first has taken longer than that percentile of its recent
+    latencies, and whichever answers first wins. A failed request is retried on another endpoint,
+    and an endpoint that fails `failure_threshold` times in a row is skipped for `cooldown` seconds.
+    For streams, latency is the time to the first chunk, and hedging and failover happen before any
+    chunk has been passed on; a stream that breaks later counts as a failure of its endpoint, and a
+    stream that is dropped unread stops counting as in flight once it is garbage collected. When
+    every attempt fails, the last error is raised if the endpoints were built with `raise_errors`,
+    and returned as assistant text otherwise. Endpoints are best built with a low `max_retries`, so
+    that failing over is not delayed by the client retrying the same endpoint.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[OpenAIChat],
+        *,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        max_attempts: Optional[int] = None,
+        failure_threshold: int = 3,
+        cooldown: float = 10.0,
+        latency_window: int = 100,
+        alpha: float = 0.2
+    ) -> None:
+        super().__init__()
+        assert endpoints, "At least one endpoint is required"
+        assert all(endpoint.streaming == endpoints[0].streaming for endpoint in endpoints), "All endpoints must have the same stream setting"
+        assert all(endpoint.raise_errors == endpoints[0].raise_errors for endpoint in endpoints), "All endpoints must have the same raise_errors setting"
+
+        self.__endpoints: List[OpenAIChat] = endpoints
+        self.__stats: List[EndpointStats] = [EndpointStats(latency_window, alpha) for _ in endpoints]
+        self.__hedge_percentile: Optional[float] = hedge_percentile
+        self.__hedge_min_samples: int = hedge_min_samples
+        self.__max_attempts: int = max_attempts or len(endpoints)
+        self.__failure_threshold: int = failure_threshold
+        self.__cooldown: float = cooldown
+        self.__lock: threading.Lock = threading.Lock()
+        self.__random: random.Random = random.Random()
+        self.__executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def model_name(self) -> str:
+        return self.__endpoints[0].model_name
+
+    @property
+    def streaming(self) -> bool:
+        return self.__endpoints[0].streaming
+
+    @property
+    def endpoints(self) -> List[OpenAIChat]:
+        return self.__endpoints
+
+    def set_callback(self, callback: Optional[ModelCallback]) -> None:
+        for endpoint in self.__endpoints:
+            endpoint.set_callback(callback)
+
+    def status(self) -> List[EndpointStatus]:
+        now = time.monotonic()
+        with self.__lock:
+            return [
+                EndpointStatus(
+                    index=idx,
+                    model_name=endpoint.model_name,
+                    latency=stats.latency,
+                    error_rate=stats.error_rate,
+                    in_flight=stats.in_flight,
+                    requests=stats.requests,
+                    failures=stats.failures,
+                    hedges=stats.hedges,
+                    healthy=stats.unhealthy_until <= now
+                )
+                for idx, (endpoint, stats) in enumerate(zip(self.__endpoints, self.__stats))
+            ]
+
+    def __score(self, idx: int) -> float:
+        stats = self.__stats[idx]
+        if stats.latency is None:
+            return 0.0
+        return stats.latency * (1 + stats.in_flight) / max(0.05, 1.0 - stats.error_rate)
+
+    def __choose(self, tried: List[int]) -> Optional[int]:
+        now = time.monotonic()
+        with self.__lock:
+            candidates = [idx for idx in range(len(self.__endpoints)) if idx not in tried]
+            healthy = [idx for idx in candidates if self.__stats[idx].unhealthy_until <= now]
+            candidates = healthy or candidates
+            if not candidates:
+                return None
+            if len(candidates) > 2:
+                candidates = self.__random.sample(candidates, 2)
+            return min(candidates, key=self.__score)
+
+    def __started(self, idx: int, hedge: bool) -> float:
+        with self.__lock:
+            stats = self.__stats[idx]
+            stats.in_flight += 1
+            stats.requests += 1
+            if hedge:
+                stats.hedges += 1
+        return time.perf_counter()
+
+    def __succeeded(self, idx: int, start: float) -> None:
+        with self.__lock:
+            self.__stats[idx].succeeded(time.perf_counter() - start)
+
+    def __record_failure(self, idx: int) -> None:
+        # must hold the lock
+        stats = self.__stats[idx]
+        stats.in_flight -= 1
+        stats.failed()
+        if stats.consecutive_failures >= self.__failure_threshold:
+            stats.unhealthy_until = time.monotonic() + self.__cooldown
+
+    def __failed(self, idx: int) -> None:
+        with self.__lock:
+            self.__record_failure(idx)
+
+    def __settle(self, attempt: Attempt, failed: bool = False) -> None:
+        """Release a delivered stream from the in-flight count once, recording a failure if it broke."""
+        with self.__lock:
+            if attempt.settled:
+                return
+            attempt.settled = True
+            if failed:
+                self.__record_failure(attempt.endpoint)
+            else:
+                self.__stats[attempt.endpoint].in_flight -= 1
+
+    def __abandon(self, attempt: Attempt) -> None:
+        # runs when a delivered stream is collected; a stream never iterated never runs its finally
+        if not attempt.settled:
+            if hasattr(attempt.stream, "close"):
+                attempt.stream.close()
+            self.__settle(attempt)
+
+    def __finished(self, idx: int) -> None:
+        with self.__lock:
+            self.__stats[idx].in_flight -= 1
+
+    def __hedge_delay(self, idx: int) -> Optional[float]:
+        if self.__hedge_percentile is None or len(self.__endpoints) < 2:
+            return None
+        with self.__lock:
+            stats = self.__stats[idx]
+            if stats.samples < self.__hedge_min_samples:
+                return None
+            return stats.percentile(self.__hedge_percentile)
+
+    def __attempt(self, idx: int, kwargs: Dict[str, Any], hedge: bool = False) -> Attempt:
+        start = self.__started(idx, hedge)
+        try:
+            prediction = self.__endpoints[idx]._request(**kwargs)
+            if not self.streaming:
+                self.__succeeded(idx, start)
+                self.__finished(idx)
+                return Attempt(idx, messages=prediction)
+            first = next(prediction, None)
+            self.__succeeded(idx, start)
+            return Attempt(idx, first=first, stream=prediction)
+        except Exception:
+            self.__failed(idx)
+            raise
+
+    def __deliver(self, attempt: Attempt) -> Union[List[Message], Generator[List[Message], None, None]]:
+        if not self.streaming:
+            return attempt.messages
+        def stream() -> Generator[List[Message], None, None]:
+            try:
+                if attempt.first is not None:
+                    yield attempt.first
+                    for messages in attempt.stream:
+                        yield messages
+            except Exception:
+                self.__settle(attempt, failed=True)
+                raise
+            finally:
+                attempt.stream.close()
+                self.__settle(attempt)
+        generator = stream()
+        weakref.finalize(generator, self.__abandon, attempt)
+        return generator
+
+    def __discard(self, future: Future) -> None:
+        def discard(future: Future) -> None:
+            if future.exception() is None and future.result().stream is not None:
+                future.result().stream.close()
+                self.__settle(future.result())
+        future.add_done_callback(discard)
+
+    def __executor_instance(self) -> ThreadPoolExecutor:
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.__endpoints)))
+            return self.__executor
+
+    def __call(self, idx: int, tried: List[int], kwargs: Dict[str, Any]) -> Attempt:
+        delay = self.__hedge_delay(idx)
+        if delay is None:
+            return self.__attempt(idx, kwargs)
+        executor = self.__executor_instance()
+        primary = executor.submit(self.__attempt, idx, kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        hedge_idx = self.__choose(tried)
+        if hedge_idx is None:
+            return primary.result()
+        tried.append(hedge_idx)
+        pending = {primary, executor.submit(self.__attempt, hedge_idx, kwargs, True)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winners = [future for future in done if future.exception() is None]
+            if winners:
+                for loser in [*winners[1:], *pending]:
+                    self.__discard(loser)
+                return winners[0].result()
+            error = next(iter(done)).exception()
+        raise error
+
+    def predict(self, **kwargs) -> Union[List[Message], Generator[List[Message], None, None]]:
+
+        assert "messages" in kwargs, "messages is required"
+
+        tried: List[int] = []
+        error: Optional[Exception] = None
+        for _ in range(self.__max_attempts):
+            idx = self.__choose(tried)
+            if idx is None:
+                break
+            tried.append(idx)
+            try:
+                return self.__deliver(self.__call(idx, tried, kwargs))
+            except Exception as e:
+                error = e
+        if self.__endpoints[0].raise_errors and error is not None:
+            raise error
+        return self.__endpoints[0]._failed(error, kwargs.get("n", None))
+
+    async def __aattempt(self, idx: int, kwargs: Dict[str, Any], hedge: bool = False) -> Attempt:
+        start = self.__started(idx, hedge)
+        try:
+            prediction = await self.__endpoints[idx]._arequest(**kwargs)
+            if not self.streaming:
+                self.__succeeded(idx, start)
+                self.__finished(idx)
+                return Attempt(idx, messages=prediction)
+            first = await anext(prediction, None)
+            self.__succeeded(idx, start)
+            return Attempt(idx, first=first, stream=prediction)
+        except asyncio.CancelledError:
+            self.__finished(idx)
+            raise
+        except Exception:
+            self.__failed(idx)
+            raise
+
+    def __adeliver(self, attempt: Attempt) -> Union[List[Message], AsyncGenerator[List[Message], None]]:
+        if not self.streaming:
+            return attempt.messages
+        async def stream() -> AsyncGenerator[List[Message], None]:
+            try:
+                if attempt.first is not None:
+                    yield attempt.first
+                    async for messages in attempt.stream:
+                        yield messages
+            except Exception:
+                self.__settle(attempt, failed=True)
+                raise
+            finally:
+                await attempt.stream.aclose()
+                self.__settle(attempt)
+        generator = stream()
+        # an abandoned endpoint stream is closed by the event loop's async generator hooks
+        weakref.finalize(generator, self.__settle, attempt)
+        return generator
+
+    async def __adiscard(self, attempt: Attempt) -> None:
+        if attempt.stream is not None:
+            await attempt.stream.aclose()
+            self.__settle(attempt)
+
+    async def __acall(self, idx: int, tried: List[int], kwargs: Dict[str, Any]) -> Attempt:
+        delay = self.__hedge_delay(idx)
+        if delay is None:
+            return await self.__aattempt(idx, kwargs)
+        primary = asyncio.ensure_future(self.__aattempt(idx, kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        hedge_idx = self.__choose(tried)
+        if hedge_idx is None:
+            return await primary
+        tried.append(hedge_idx)
+        pending = {primary, asyncio.ensure_future(self.__aattempt(hedge_idx, kwargs, True))}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winners = [task for task in done if task.exception() is None]
+            if winners:
+                for loser in pending:
+                    loser.cancel()
+                for loser in winners[1:]:
+                    await self.__adiscard(loser.result())
+                return winners[0].result()
+            error = next(iter(done)).exception()
+        raise error
+
+    async def apredict(self, **kwargs) -> Union[List[Message], AsyncGenerator[List[Message], None]]:
+
+        assert "messages" in kwargs, "messages is required"
+
+        tried: List[int] = []
+        error: Optional[Exception] = None
+        for _ in range(self.__max_attempts):
+            idx = self.__choose(tried)
+            if idx is None:
+                break
+            tried.append(idx)
+            try:
+                return self.__adeliver(await self.__acall(idx, tried, kwargs))
+            except Exception as e:
+                error = e
+        if self.__endpoints[0].raise_errors and error is not None:
+            raise error
+        return self.__endpoints[0]._afailed(error, kwargs.get("n", None))
+
+__all__ = [
+    "EndpointStatus",
+    "EndpointStats",
+    "Attempt",
+    "RouterChat"
+]
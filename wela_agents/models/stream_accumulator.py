@@ -0,0 +1,133 @@
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Union
+from typing import Iterable
+from typing import AsyncIterable
+from typing import Optional
+from typing_extensions import Literal
+from typing_extensions import Required
+from typing_extensions import TypedDict
+
+from wela_agents.schema.prompt.openai_chat import Message
+from wela_agents.schema.prompt.openai_chat import AIMessage
+from wela_agents.schema.prompt.openai_chat import ToolCall
+from wela_agents.schema.prompt.openai_chat import Function
+
+class StreamDelta(TypedDict, total=False):
+    type: Required[Literal["delta"]]
+    """The event type, in this case `delta`."""
+
+    content: Required[str]
+    """The content fragment received since the previous event."""
+
+class StreamMessage(TypedDict, total=False):
+    type: Required[Literal["message"]]
+    """The event type, in this case `message`."""
+
+    message: Required[AIMessage]
+    """The fully assembled final message."""
+
+StreamEvent = Union[StreamDelta, StreamMessage]
+
+class StreamAccumulator:
+    """
+    Assemble a streamed assistant message from its deltas in linear time.
+
+    Content fragments and tool call arguments are collected in lists and only joined when a message
+    is requested, and tool call deltas are matched by their `index`. The joined content is kept, so a
+    message per delta only appends the fragments that arrived since the previous one.
+    """
+
+    def __init__(self) -> None:
+        self.__role: str = "assistant"
+        self.__content: List[str] = []
+        self.__text: str = ""
+        self.__joined: int = 0
+        self.__tool_calls: Dict[int, Dict[str, Any]] = {}
+
+    @property
+    def has_tool_calls(self) -> bool:
+        return len(self.__tool_calls) > 0
+
+    def add(self, delta_message: Optional[Message]) -> str:
+        """
+        Merge one delta and return the content fragment it carried, or an empty string.
+        """
+        if not delta_message:
+            return ""
+        self.__role = delta_message.get("role", None) or self.__role
+        fragment = delta_message.get("content", None) or ""
+        if fragment:
+            self.__content.append(fragment)
+        for position, tool_call_delta in enumerate(delta_message.get("tool_calls", None) or []):
+            index = tool_call_delta.get("index", position)
+            tool_call = self.__tool_calls.setdefault(index, {"id": None, "type": None, "name": None, "arguments": []})
+            tool_call["id"] = tool_call_delta.get("id", None) or tool_call["id"]
+            tool_call["type"] = tool_call_delta.get("type", None) or tool_call["type"]
+            function = tool_call_delta.get("function", None) or {}
+            tool_call["name"] = function.get("name", None) or tool_call["name"]
+            if function.get("arguments", None):
+                tool_call["arguments"].append(function["arguments"])
+        return fragment
+
+    def __joined_content(self) -> str:
+        if self.__joined < len(self.__content):
+            self.__text += "".join(self.__content[self.__joined:])
+            self.__joined = len(self.__content)
+        return self.__text
+
+    def message(self) -> AIMessage:
+        message = AIMessage(role=self.__role, content=self.__joined_content())
+        if self.__tool_calls:
+            message["tool_calls"] = [
+                ToolCall(
+                    id=tool_call["id"],
+                    type=tool_call["type"] or "function",
+                    function=Function(name=tool_call["name"], arguments="".join(tool_call["arguments"]))
+                )
+                for _, tool_call in sorted(self.__tool_calls.items())
+            ]
+        return message
+
+def final_message(item: Union[Message, StreamEvent]) -> Optional[Message]:
+    """
+    Return the message carried by one streamed item: the item itself in message mode, the assembled
+    message of a `message` event, or None for a `delta` event.
+    """
+    if item is None:
+        return None
+    if item.get("type", None) == "delta":
+        return None
+    if item.get("type", None) == "message":
+        return item["message"]
+    return item
+
+def collect(stream: Iterable[Union[Message, StreamEvent]]) -> Optional[Message]:
+    """
+    Drain a stream in either mode and return its final message.
+    """
+    message = None
+    for item in stream:
+        message = final_message(item) or message
+    return message
+
+async def acollect(stream: AsyncIterable[Union[Message, StreamEvent]]) -> Optional[Message]:
+    """
+    Drain an async stream in either mode and return its final message.
+    """
+    message = None
+    async for item in stream:
+        message = final_message(item) or message
+    return message
+
+__all__ = [
+    "StreamDelta",
+    "StreamMessage",
+    "StreamEvent",
+    "StreamAccumulator",
+    "final_message",
+    "collect",
+    "acollect"
+]
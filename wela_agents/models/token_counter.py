@@ -0,0 +1,109 @@
+
+import json
+import threading
+
+from collections import OrderedDict
+from typing import Any
+from typing import List
+from typing import Callable
+from typing import Optional
+
+from wela_agents.schema.prompt.openai_chat import Message
+
+# images are resized to at most 600x450 before they are sent, which costs two 512px tiles in high detail
+LOW_DETAIL_IMAGE_TOKENS = 85
+HIGH_DETAIL_IMAGE_TOKENS = 425
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the token count of a text without a tokenizer: about four ASCII characters per token,
+    and one token per non-ASCII character.
+    """
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+class TokenCounter:
+    """
+    Count the prompt tokens of chat messages locally.
+
+    Texts are encoded with tiktoken when it is installed and knows the model, otherwise the count is
+    estimated. Per-message counts are kept in an LRU keyed on the serialized message, so counting a
+    growing conversation again only encodes the messages that are new.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, max_size: int = 4096) -> None:
+        self.__model_name: Optional[str] = model_name
+        self.__max_size: int = max_size
+        self.__lru: OrderedDict[str, int] = OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__encode: Optional[Callable[[str], List[int]]] = None
+        self.__encoder_loaded: bool = False
+
+    def __encoder(self) -> Optional[Callable[[str], List[int]]]:
+        if not self.__encoder_loaded:
+            self.__encoder_loaded = True
+            try:
+                import tiktoken
+                try:
+                    encoding = tiktoken.encoding_for_model(self.__model_name or "")
+                except KeyError:
+                    encoding = tiktoken.get_encoding("o200k_base")
+                self.__encode = encoding.encode
+            except Exception:
+                self.__encode = None
+        return self.__encode
+
+    def count_text(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        encode = self.__encoder()
+        if encode is None:
+            return estimate_tokens(text)
+        return len(encode(text))
+
+    def __count_content(self, content: Any) -> int:
+        if content is None:
+            return 0
+        if isinstance(content, str):
+            return self.count_text(content)
+        tokens = 0
+        for part in content:
+            if part.get("type", None) == "text":
+                tokens += self.count_text(part.get("text", None))
+            elif part.get("type", None) == "image_url":
+                detail = (part.get("image_url", None) or {}).get("detail", None)
+                tokens += LOW_DETAIL_IMAGE_TOKENS if detail == "low" else HIGH_DETAIL_IMAGE_TOKENS
+        return tokens
+
+    def __count_uncached(self, message: Message) -> int:
+        tokens = MESSAGE_OVERHEAD_TOKENS + self.__count_content(message.get("content", None))
+        if message.get("name", None):
+            tokens += self.count_text(message["name"])
+        for tool_call in message.get("tool_calls", None) or []:
+            function = tool_call.get("function", None) or {}
+            tokens += MESSAGE_OVERHEAD_TOKENS + self.count_text(function.get("name", None)) + self.count_text(function.get("arguments", None))
+        return tokens
+
+    def count_message(self, message: Message) -> int:
+        key = json.dumps(message, sort_keys=True, ensure_ascii=False, default=str)
+        with self.__lock:
+            tokens = self.__lru.get(key, None)
+            if tokens is not None:
+                self.__lru.move_to_end(key)
+                return tokens
+        tokens = self.__count_uncached(message)
+        with self.__lock:
+            self.__lru[key] = tokens
+            while len(self.__lru) > self.__max_size:
+                self.__lru.popitem(last=False)
+        return tokens
+
+    def count_messages(self, messages: List[Message]) -> int:
+        return sum(self.count_message(message) for message in messages) + REPLY_PRIMING_TOKENS
+
+__all__ = [
+    "estimate_tokens",
+    "TokenCounter"
+]
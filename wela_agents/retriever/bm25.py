@@ -0,0 +1,111 @@
+
+import re
+import math
+import heapq
+import threading
+
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Iterable
+
+from wela_agents.schema.document.document import Document
+from wela_agents.schema.document.document import document_key
+
+WORD_PATTERN = re.compile(r"[^\W_]+(?:[\-_.:/#][^\W_]+)*")
+CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]+")
+PART_PATTERN = re.compile(r"[^\W_]+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-cased terms. Compound terms such as `ERR_TIMEOUT` or `sku-1042` are kept
+    whole and also split into their parts, and runs of CJK characters are split into bigrams.
+    """
+    terms: List[str] = []
+    for match in WORD_PATTERN.finditer(text.lower()):
+        word = match.group()
+        if CJK_PATTERN.fullmatch(word):
+            terms.extend([word] if len(word) == 1 else [word[idx:idx + 2] for idx in range(len(word) - 1)])
+            continue
+        parts = [part for chunk in CJK_PATTERN.split(word) for part in PART_PATTERN.findall(chunk)]
+        terms.append(word)
+        if len(parts) > 1 or (parts and parts[0] != word):
+            terms.extend(parts)
+        for cjk in CJK_PATTERN.findall(word):
+            terms.extend([cjk] if len(cjk) == 1 else [cjk[idx:idx + 2] for idx in range(len(cjk) - 1)])
+    return terms
+
+class BM25Index:
+    """
+    An in-process inverted index scored with Okapi BM25. Documents are added incrementally; the same
+    document added twice is indexed once.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.__k1: float = k1
+        self.__b: float = b
+        self.__documents: List[Document] = []
+        self.__keys: Dict[str, int] = {}
+        self.__lengths: List[int] = []
+        self.__total_length: int = 0
+        self.__postings: Dict[str, Dict[int, int]] = {}
+        self.__lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__documents)
+
+    def add(self, documents: Iterable[Document]) -> None:
+        for document in documents:
+            key = document_key(document)
+            terms = tokenize(document["page_content"])
+            frequencies: Dict[str, int] = {}
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+            with self.__lock:
+                if key in self.__keys:
+                    continue
+                doc_id = len(self.__documents)
+                self.__keys[key] = doc_id
+                self.__documents.append(document)
+                self.__lengths.append(len(terms))
+                self.__total_length += len(terms)
+                for term, frequency in frequencies.items():
+                    self.__postings.setdefault(term, {})[doc_id] = frequency
+
+    def covers(self, query: str) -> bool:
+        """Whether every term of `query` occurs in at least one indexed document."""
+        terms = tokenize(query)
+        with self.__lock:
+            return bool(terms) and all(term in self.__postings for term in terms)
+
+    def search(self, query: str, limit: int) -> List[Tuple[Document, float]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        scores: Dict[int, float] = {}
+        with self.__lock:
+            count = len(self.__documents)
+            if count == 0:
+                return []
+            average_length = self.__total_length / count
+            for term in terms:
+                postings = self.__postings.get(term, None)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.__k1 * (1 - self.__b + self.__b * self.__lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.__k1 + 1) / (frequency + norm)
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self.__documents[doc_id], score) for doc_id, score in best]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__documents.clear()
+            self.__keys.clear()
+            self.__lengths.clear()
+            self.__total_length = 0
+            self.__postings.clear()
+
+__all__ = [
+    "tokenize",
+    "BM25Index"
+]
@@ -0,0 +1,148 @@
+
+import re
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+
+from wela_agents.retriever.bm25 import BM25Index
+from wela_agents.callback.callback import Callback
+from wela_agents.retriever.retriever import Retriever
+from wela_agents.schema.document.document import Document
+from wela_agents.schema.document.document import document_key
+
+CODE_PATTERN = re.compile(r"\d|[A-Za-z]+[\-_.:/#]\w|\w[\-_.:/#][A-Za-z0-9]|^[A-Z0-9]{2,}$")
+
+def is_keyword_query(query: str) -> bool:
+    """
+    Whether a query reads like a lookup of exact terms rather than a question: a quoted phrase, or a
+    few words that include a code such as `E1042`, `ERR_TIMEOUT`, `v2.3` or `HTTP`.
+    """
+    query = query.strip()
+    if len(query) >= 2 and query[0] == query[-1] and query[0] in "\"'`":
+        return True
+    words = query.split()
+    return 0 < len(words) <= 3 and any(CODE_PATTERN.search(word) for word in words)
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    """
+    Merge rankings of documents by the sum of 1 / (k + rank) over the rankings each document is in.
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = document_key(document)
+            documents.setdefault(key, document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+class HybridRetriever(Retriever):
+    """
+    Combine a dense retriever with a local BM25 index, fusing both rankings by reciprocal rank fusion.
+
+    The index is built incrementally as documents pass through `add_documents` to the dense retriever.
+    It lives in process only, so documents that are already stored in the dense retriever are
+    indexed again on start-up with `index_documents`, e.g. from `QdrantRetriever.iter_documents`.
+    Queries that `keyword_query` judges keyword-like are answered from the index alone, without
+    calling the embedding model, as long as the index knows every term of the query.
+    """
+
+    def __init__(
+        self,
+        retriever_key: str,
+        dense: Retriever,
+        limit: int = 10,
+        sparse_limit: Optional[int] = None,
+        rrf_k: int = 60,
+        keyword_query: Optional[Callable[[str], bool]] = is_keyword_query,
+        k1: float = 1.5,
+        b: float = 0.75
+    ) -> None:
+        Retriever.__init__(self, retriever_key)
+        self.__dense: Retriever = dense
+        self.__limit: int = limit
+        self.__sparse_limit: int = sparse_limit or limit * 2
+        self.__rrf_k: int = rrf_k
+        self.__keyword_query: Optional[Callable[[str], bool]] = keyword_query
+        self.__index: BM25Index = BM25Index(k1=k1, b=b)
+        self.__sparse_only: int = 0
+
+    @property
+    def index(self) -> BM25Index:
+        return self.__index
+
+    @property
+    def sparse_only(self) -> int:
+        """Number of queries answered from the index without a dense search."""
+        return self.__sparse_only
+
+    def set_callback(self, callback: Callback) -> None:
+        self.__dense.set_callback(callback)
+
+    def index_documents(self, documents: Iterable[Document]) -> None:
+        self.__index.add(documents)
+
+    def __indexed(self, documents: Iterable[Document]) -> Iterator[Document]:
+        for document in documents:
+            self.__index.add([document])
+            yield document
+
+    def add_documents(self, documents: Iterable[Document], **kwargs: Any) -> Any:
+        return self.__dense.add_documents(self.__indexed(documents), **kwargs)
+
+    def __sparse(self, query: str) -> List[Document]:
+        return [document for document, _ in self.__index.search(query, self.__sparse_limit)]
+
+    def __fuse(self, sparse: List[Document], dense: List[Document]) -> List[Document]:
+        return reciprocal_rank_fusion([dense, sparse], self.__rrf_k)[:self.__limit]
+
+    def __sparse_enough(self, query: str) -> bool:
+        if self.__keyword_query and self.__keyword_query(query) and self.__index.covers(query):
+            self.__sparse_only += 1
+            return True
+        return False
+
+    def retrieve(self, query: str) -> List[Document]:
+        sparse = self.__sparse(query)
+        if self.__sparse_enough(query):
+            return sparse[:self.__limit]
+        return self.__fuse(sparse, self.__dense.retrieve(query))
+
+    async def aretrieve(self, query: str) -> List[Document]:
+        sparse = self.__sparse(query)
+        if self.__sparse_enough(query):
+            return sparse[:self.__limit]
+        return self.__fuse(sparse, await self.__dense.aretrieve(query))
+
+    def __split(self, queries: List[str]) -> Tuple[List[List[Document]], List[int]]:
+        sparse = [self.__sparse(query) for query in queries]
+        dense_indices = [idx for idx, query in enumerate(queries) if not self.__sparse_enough(query)]
+        return sparse, dense_indices
+
+    def __merge(self, sparse: List[List[Document]], dense_indices: List[int], dense: List[List[Document]]) -> List[List[Document]]:
+        results = [documents[:self.__limit] for documents in sparse]
+        for idx, documents in zip(dense_indices, dense):
+            results[idx] = self.__fuse(sparse[idx], documents)
+        return results
+
+    def retrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        sparse, dense_indices = self.__split(queries)
+        dense = self.__dense.retrieve_many([queries[idx] for idx in dense_indices]) if dense_indices else []
+        return self.__merge(sparse, dense_indices, dense)
+
+    async def aretrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        sparse, dense_indices = self.__split(queries)
+        dense = await self.__dense.aretrieve_many([queries[idx] for idx in dense_indices]) if dense_indices else []
+        return self.__merge(sparse, dense_indices, dense)
+
+__all__ = [
+    "is_keyword_query",
+    "reciprocal_rank_fusion",
+    "HybridRetriever"
+]
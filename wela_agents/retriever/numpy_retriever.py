@@ -0,0 +1,91 @@
+
+import time
+
+from itertools import islice
+from typing import List
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+
+from wela_agents.retriever.retriever import Retriever
+from wela_agents.callback.callback import Callback
+from wela_agents.callback.callback import EmbeddingCallback
+from wela_agents.retriever.retriever import IngestionReport
+from wela_agents.schema.document.document import Document
+from wela_agents.embedding.text_embedding import TextEmbedding
+from wela_agents.vectorstore.numpy_store import NumpyVectorStore
+
+class NumpyRetriever(Retriever):
+    """
+    The QdrantRetriever contract on an in-process NumpyVectorStore, kept in `directory` when given.
+    """
+
+    def __init__(self, retriever_key: str, embedding: TextEmbedding, limit: int = 10, score_threshold: Optional[float] = None, directory: Optional[str] = None) -> None:
+        Retriever.__init__(self, retriever_key)
+        self.__score_threshold: Optional[float] = score_threshold
+        self.__limit: int = limit
+        self.__embedding: TextEmbedding = embedding
+        self.__store: NumpyVectorStore = NumpyVectorStore(directory)
+
+    @property
+    def store(self) -> NumpyVectorStore:
+        return self.__store
+
+    def set_callback(self, callback: Callback) -> None:
+        if isinstance(callback, EmbeddingCallback):
+            self.__embedding.set_callback(callback)
+
+    def add_documents(self, documents: Iterable[Document], batch_size: int = 64, progress: Callable[[IngestionReport], None] = None) -> IngestionReport:
+        start = time.perf_counter()
+        count = 0
+        iterator = iter(documents)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                break
+            payloads = [{**document["metadata"], "page_content": document["page_content"]} for document in batch]
+            self.__store.add(self.__embedding.embed([str(payload) for payload in payloads]), payloads)
+            count += len(batch)
+            if progress:
+                progress(self.__report(count, start))
+        return self.__report(count, start)
+
+    def __report(self, documents: int, start: float) -> IngestionReport:
+        seconds = time.perf_counter() - start
+        return IngestionReport(
+            documents = documents,
+            seconds = seconds,
+            docs_per_second = documents / seconds if seconds > 0 else 0.0
+        )
+
+    def __to_document(self, payload: dict) -> Document:
+        return Document(
+            page_content=payload["page_content"],
+            metadata={k: v for k, v in payload.items() if k != "page_content"}
+        )
+
+    def iter_documents(self) -> Iterator[Document]:
+        for payload in self.__store.payloads():
+            yield self.__to_document(payload)
+
+    def retrieve(self, query: str) -> List[Document]:
+        if not len(self.__store):
+            return []
+        hits = self.__store.search(self.__embedding.embed([query]), self.__limit, self.__score_threshold)[0]
+        return [self.__to_document(hit["payload"]) for hit in hits]
+
+    def retrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        unique_queries = list(dict.fromkeys(queries))
+        if not unique_queries or not len(self.__store):
+            return [[] for _ in queries]
+        results = self.__store.search(self.__embedding.embed(unique_queries), self.__limit, self.__score_threshold)
+        documents = {
+            query: [self.__to_document(hit["payload"]) for hit in hits]
+            for query, hits in zip(unique_queries, results)
+        }
+        return [documents[query] for query in queries]
+
+__all__ = [
+    "NumpyRetriever"
+]
@@ -1,13 +1,26 @@
 
+import time
+
+from itertools import islice
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+
 from typing import List
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 from typing import Optional
 
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance
 from qdrant_client.models import PointStruct
+from qdrant_client.models import QueryRequest
 from qdrant_client.models import VectorParams
 
 from wela_agents.retriever.retriever import Retriever
+from wela_agents.callback.callback import Callback
+from wela_agents.callback.callback import EmbeddingCallback
+from wela_agents.retriever.retriever import IngestionReport
 from wela_agents.schema.document.document import Document
 from wela_agents.embedding.text_embedding import TextEmbedding
 
@@ -26,30 +39,114 @@ class QdrantRetriever(Retriever):
                 vectors_config = VectorParams(size=512, distance = Distance.COSINE)
             )
 
-    def add_documents(self, documents: List[Document]) -> None:
-        count = self.__client.count(collection_name = self.retriever_key).count
-        points = [
-            PointStruct(
-                id = count + idx,
-                vector = self.__embedding.embed([ str({**document["metadata"], "page_content": document["page_content"]}) ])[0],
-                payload = {**document["metadata"], "page_content": document["page_content"]}
-            )
-            for idx, document in enumerate(documents)
-        ]
-        points_list = [points[i:i + 10] for i in range(0, len(points), 10)]
-        for points in points_list:
-            self.__client.upsert(
+    def set_callback(self, callback: Callback) -> None:
+        if isinstance(callback, EmbeddingCallback):
+            self.__embedding.set_callback(callback)
+
+    def add_documents(self, documents: Iterable[Document], batch_size: int = 64, progress: Callable[[IngestionReport], None] = None) -> IngestionReport:
+        """
+        Embed and upsert documents in batches of `batch_size`. The upsert of one batch runs in the
+        background while the next batch is being embedded, and at most two batches are held in memory,
+        so `documents` may be a lazy iterable over an arbitrarily large corpus.
+        """
+        start = time.perf_counter()
+        next_id = self.__client.count(collection_name = self.retriever_key).count
+        written = 0
+        iterator = iter(documents)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending: Optional[Future] = None
+            pending_size = 0
+            while True:
+                batch = list(islice(iterator, batch_size))
+                if not batch:
+                    break
+                payloads = [{**document["metadata"], "page_content": document["page_content"]} for document in batch]
+                vectors = self.__embedding.embed([str(payload) for payload in payloads])
+                points = [
+                    PointStruct(
+                        id = next_id + idx,
+                        vector = [float(x) for x in vector],
+                        payload = payload
+                    )
+                    for idx, (vector, payload) in enumerate(zip(vectors, payloads))
+                ]
+                if pending:
+                    written = self.__settle(pending, written + pending_size, start, progress)
+                pending = executor.submit(self.__client.upsert, collection_name = self.retriever_key, points = points)
+                pending_size = len(batch)
+                next_id += len(batch)
+            if pending:
+                written = self.__settle(pending, written + pending_size, start, progress)
+        return self.__report(written, start)
+
+    def __settle(self, pending: Future, written: int, start: float, progress: Optional[Callable[[IngestionReport], None]]) -> int:
+        # documents count as ingested, and are reported, only once their upsert has returned
+        pending.result()
+        if progress:
+            progress(self.__report(written, start))
+        return written
+
+    def __report(self, documents: int, start: float) -> IngestionReport:
+        seconds = time.perf_counter() - start
+        return IngestionReport(
+            documents = documents,
+            seconds = seconds,
+            docs_per_second = documents / seconds if seconds > 0 else 0.0
+        )
+
+    def __to_document(self, payload: dict) -> Document:
+        return Document(
+            page_content=payload["page_content"],
+            metadata={k: v for k, v in payload.items() if k != "page_content"}
+        )
+
+    def iter_documents(self, batch_size: int = 256) -> Iterator[Document]:
+        """
+        Scroll through every stored document, for example to rebuild a HybridRetriever index.
+        """
+        offset = None
+        while True:
+            records, offset = self.__client.scroll(
                 collection_name = self.retriever_key,
-                points = points
+                limit = batch_size,
+                offset = offset,
+                with_payload = True
             )
+            for record in records:
+                yield self.__to_document(record.payload)
+            if offset is None:
+                break
+
+    def retrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Embed the distinct queries in one batch and search them with one batched query.
+        """
+        unique_queries = list(dict.fromkeys(queries))
+        if not unique_queries:
+            return []
+        vectors = self.__embedding.embed(unique_queries)
+        responses = self.__client.query_batch_points(
+            collection_name = self.retriever_key,
+            requests = [
+                QueryRequest(
+                    query = [float(x) for x in vector],
+                    with_payload = True,
+                    score_threshold = self.__score_threshold,
+                    limit = self.__limit
+                )
+                for vector in vectors
+            ]
+        )
+        documents = {
+            query: [self.__to_document(point.payload) for point in response.points]
+            for query, response in zip(unique_queries, responses)
+        }
+        return [documents[query] for query in queries]
 
     def retrieve(self, retrieve: str) -> List[Document]:
         vector = [float(x) for x in self.__embedding.embed([retrieve])[0]]
         return [
-            Document(
-                page_content=point.payload["page_content"],
-                payload={k: v for k, v in point.payload.items() if k != "page_content"}
-            )
+            self.__to_document(point.payload)
             for point in self.__client.query_points(
                 collection_name = self.retriever_key,
                 query = vector,
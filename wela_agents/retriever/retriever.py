@@ -1,9 +1,24 @@
 
 from abc import ABC
 from abc import abstractmethod
+from typing import Any
 from typing import List
+from typing import Iterable
+from typing_extensions import TypedDict
 
+from wela_agents.callback.callback import Callback
 from wela_agents.schema.document.document import Document
+from wela_agents.utils.concurrency import run_in_thread
+
+class IngestionReport(TypedDict):
+    documents: int
+    """Number of documents written so far."""
+
+    seconds: float
+    """Wall time spent since ingestion started."""
+
+    docs_per_second: float
+    """Observed ingestion throughput."""
 
 class Retriever(ABC):
 
@@ -15,10 +30,34 @@ class Retriever(ABC):
     def retriever_key(self) -> str:
         return self.__retriever_key
 
+    def set_callback(self, callback: Callback) -> None:
+        """
+        Pass a callback down to the components of this retriever that report events.
+        """
+        pass
+
     @abstractmethod
-    def add_documents(self, documents: List[Document]) -> None:
+    def add_documents(self, documents: Iterable[Document]) -> Any:
         pass
 
     @abstractmethod
     def retrieve(self, query: str) -> List[Document]:
         pass
+
+    def retrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Retrieve the documents of several queries, in the order of `queries`. Implementations that can
+        embed and search in batches override this; by default the queries are retrieved one by one.
+        """
+        return [self.retrieve(query) for query in queries]
+
+    async def aretrieve(self, query: str) -> List[Document]:
+        return await run_in_thread(self.retrieve, query)
+
+    async def aretrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        return await run_in_thread(self.retrieve_many, queries)
+
+__all__ = [
+    "IngestionReport",
+    "Retriever"
+]
@@ -1,5 +1,9 @@
 
+import json
+
 from typing import Dict
+from typing import List
+from typing import Iterable
 
 from typing_extensions import Required
 from typing_extensions import TypedDict
@@ -9,3 +13,23 @@ class Document(TypedDict, total=False):
     metadata: Required[Dict]
 
     page_content: Required[str]
+
+def document_key(document: Document) -> str:
+    """
+    Identify a document by its content and metadata, so that the same document returned by different
+    retrievers or queries can be recognised.
+    """
+    return json.dumps([document["page_content"], document.get("metadata", None)], ensure_ascii=False, sort_keys=True, default=str)
+
+def unique_documents(documents: Iterable[Document]) -> List[Document]:
+    """Drop repeated documents, keeping the first occurrence of each."""
+    seen: Dict[str, Document] = {}
+    for document in documents:
+        seen.setdefault(document_key(document), document)
+    return list(seen.values())
+
+__all__ = [
+    "Document",
+    "document_key",
+    "unique_documents"
+]
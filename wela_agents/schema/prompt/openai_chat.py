@@ -5,7 +5,18 @@ from typing import Optional
 from typing_extensions import Literal
 from typing_extensions import Required
 from typing_extensions import TypedDict
-from openai.types.chat.chat_completion_message_tool_call_param import Function
+
+class Function(TypedDict, total=False):
+    arguments: Required[str]
+    """
+    The arguments to call the function with, as generated by the model in JSON
+    format. Note that the model does not always generate valid JSON, and may
+    hallucinate parameters not defined by your function schema. Validate the
+    arguments in your code before calling your function.
+    """
+
+    name: Required[str]
+    """The name of the function to call."""
 
 class ImageURL(TypedDict, total=False):
     url: Required[str]
@@ -101,6 +112,7 @@ class AIMessage(TypedDict, total=False):
 Message = Union[SystemMessage, UserMessage, ToolMessage, AIMessage]
 
 __all__ = [
+    "Function",
     "ImageURL",
     "ImageContent",
     "TextContent",
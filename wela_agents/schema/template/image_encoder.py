@@ -0,0 +1,174 @@
+
+import os
+import base64
+import hashlib
+import mimetypes
+import threading
+
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from typing import Tuple
+from typing import Iterable
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing_extensions import Literal
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+class ImageEncoder:
+    """
+    Turn images into base64 data URLs that fit within `max_width` x `max_height`.
+
+    Decoding is downscaled as early as possible: JPEG files are decoded at a reduced scale with
+    `draft`, and other images are shrunk with `reduce` before the final LANCZOS resample. Encoded
+    URLs are kept in an LRU keyed on the file path, modification time and size, or on a hash of the
+    file content when `cache_key` is "content", so re-attaching the same file costs one `stat`.
+    """
+
+    def __init__(
+        self,
+        max_width: int = 600,
+        max_height: int = 450,
+        cache_size: int = 64,
+        cache_key: Literal["stat", "content"] = "stat",
+        max_workers: Optional[int] = None,
+        encoding: str = "utf-8"
+    ) -> None:
+        self.__max_width: int = max_width
+        self.__max_height: int = max_height
+        self.__cache_size: int = cache_size
+        self.__cache_key: Literal["stat", "content"] = cache_key
+        self.__max_workers: Optional[int] = max_workers
+        self.__encoding: str = encoding
+        self.__lru: OrderedDict[Tuple, str] = OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__hits: int = 0
+        self.__misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def __key(self, image_path: str) -> Tuple:
+        if self.__cache_key == "content":
+            with open(image_path, "rb") as f:
+                return ("content", hashlib.sha256(f.read()).hexdigest(), self.__max_width, self.__max_height)
+        stat = os.stat(image_path)
+        return ("stat", os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, self.__max_width, self.__max_height)
+
+    def __lookup(self, key: Tuple) -> Optional[str]:
+        with self.__lock:
+            data_url = self.__lru.get(key, None)
+            if data_url is None:
+                self.__misses += 1
+            else:
+                self.__lru.move_to_end(key)
+                self.__hits += 1
+            return data_url
+
+    def __remember(self, key: Tuple, data_url: str) -> None:
+        if self.__cache_size <= 0:
+            return
+        with self.__lock:
+            self.__lru[key] = data_url
+            self.__lru.move_to_end(key)
+            while len(self.__lru) > self.__cache_size:
+                self.__lru.popitem(last=False)
+
+    def __target_size(self, width: int, height: int) -> Tuple[int, int]:
+        ratio = min(self.__max_width / width, self.__max_height / height)
+        # a very elongated image would otherwise shrink to zero pixels along its short side
+        return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+    def __resize(self, image: "Image.Image") -> "Image.Image":
+        from PIL import Image
+
+        image_format = image.format
+        target_size = self.__target_size(image.width, image.height)
+        if image_format == "JPEG":
+            image.draft(image.mode, target_size)
+        factor = min(image.width // target_size[0], image.height // target_size[1])
+        if factor >= 2 and image.mode not in ("1", "P"):
+            image = image.reduce(factor)
+        resized_image = image.resize(target_size, Image.LANCZOS)
+        resized_image.format = image_format
+        return resized_image
+
+    def __to_data_url(self, image: "Image.Image", mime_type: str) -> str:
+        buffered = BytesIO()
+        image.save(buffered, format=image.format)
+        encoded_string = base64.b64encode(buffered.getvalue()).decode(self.__encoding)
+        return f"data:{mime_type};base64,{encoded_string}"
+
+    def encode(self, image_path: str) -> Optional[str]:
+        """
+        Encode an image file, or return None if it is missing or cannot be read as an image.
+        """
+        if not os.path.exists(image_path):
+            return None
+
+        mime_type, _ = mimetypes.guess_type(image_path)
+        if mime_type is None or not mime_type.startswith('image'):
+            return None
+
+        from PIL import Image
+
+        try:
+            key = self.__key(image_path)
+            data_url = self.__lookup(key)
+            if data_url is None:
+                with Image.open(image_path) as img:
+                    data_url = self.__to_data_url(self.__resize(img), mime_type)
+                self.__remember(key, data_url)
+            return data_url
+        except IOError as _:
+            return None
+
+    def encode_many(self, image_paths: Iterable[str]) -> List[Optional[str]]:
+        """
+        Encode several image files on a worker pool. Results are in the order of `image_paths`.
+        """
+        image_paths = list(image_paths)
+        unique_paths = list(dict.fromkeys(image_paths))
+        if len(unique_paths) <= 1 or self.__max_workers == 1:
+            data_urls = [self.encode(image_path) for image_path in unique_paths]
+        else:
+            with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+                data_urls = list(executor.map(self.encode, unique_paths))
+        encoded = dict(zip(unique_paths, data_urls))
+        return [encoded[image_path] for image_path in image_paths]
+
+    def encode_image(self, image: "Image.Image") -> Optional[str]:
+        """
+        Encode an image that is already in memory, such as one grabbed from the clipboard. The cache is
+        keyed on a hash of its pixels.
+        """
+        from PIL import Image
+
+        try:
+            mime_type = Image.MIME[image.format]
+            key = ("pixels", hashlib.sha256(image.tobytes()).hexdigest(), image.mode, image.size, image.format, self.__max_width, self.__max_height)
+            data_url = self.__lookup(key)
+            if data_url is None:
+                data_url = self.__to_data_url(self.__resize(image), mime_type)
+                self.__remember(key, data_url)
+            return data_url
+        except Exception as _:
+            return None
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__lru.clear()
+            self.__hits = 0
+            self.__misses = 0
+
+__all__ = [
+    "ImageEncoder"
+]
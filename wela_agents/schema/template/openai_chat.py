@@ -1,16 +1,14 @@
 
 import os
-import base64
-import mimetypes
 
-from io import BytesIO
 from abc import ABC
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 from abc import abstractmethod
-from PIL import Image
-from PIL import ImageGrab
 
 from typing import Any
 from typing import List
+from typing import Tuple
 from typing import Union
 from typing import Optional
 
@@ -23,83 +21,62 @@ from wela_agents.schema.prompt.openai_chat import AIMessage
 from wela_agents.schema.prompt.openai_chat import UserMessage
 from wela_agents.schema.prompt.openai_chat import ToolMessage
 from wela_agents.schema.prompt.openai_chat import SystemMessage
+from wela_agents.schema.template.image_encoder import ImageEncoder
 from wela_agents.schema.template.prompt_template import PromptTemplate
 from wela_agents.schema.template.prompt_template import StringPromptTemplate
 
-def __resize_image(image: Image.Image, max_width: int = 600, max_height: int = 450) -> Image.Image:
+default_image_encoder: ImageEncoder = ImageEncoder()
+
+def encode_image(image_path: str, encoding: str = 'utf-8', encoder: Optional[ImageEncoder] = None) -> Optional[str]:
     """
-    Resize an image to fit within the specified maximum width and height while maintaining the aspect ratio.
+    Encode an image file to a Base64 string after resizing it to fit within the specified dimensions.
 
     Parameters:
-    - image (Image.Image): PIL Image object.
-    - max_width (int): Maximum width for the resized image. Default is 800 pixels.
-    - max_height (int): Maximum height for the resized image. Default is 600 pixels.
+    - image_path (str): Path to the image file.
+    - encoding (str): The encoding to use for the Base64 string. Default is 'utf-8'.
+    - encoder (Optional[ImageEncoder]): The encoder to use. Defaults to a shared, cached encoder.
 
     Returns:
-    - Image.Image: Resized image object.
+    - Optional[str]: Base64 encoded string of the image, or None if the image cannot be processed.
     """
-    width_ratio = max_width / image.width
-    height_ratio = max_height / image.height
-    ratio = min(width_ratio, height_ratio)
-    
-    new_width = int(image.width * ratio)
-    new_height = int(image.height * ratio)
-    
-    resized_img = image.resize((new_width, new_height), Image.LANCZOS)
-    resized_img.format = image.format
-    return resized_img
-
-def encode_image(image_path: str, encoding: str = 'utf-8') -> Optional[str]:
+    if encoder is None:
+        encoder = default_image_encoder if encoding == 'utf-8' else ImageEncoder(encoding=encoding, cache_size=0)
+    return encoder.encode(image_path)
+
+def encode_images(image_paths: List[str], encoder: Optional[ImageEncoder] = None) -> List[Optional[str]]:
     """
-    Encode an image file to a Base64 string after resizing it to fit within the specified dimensions.
+    Encode several image files to Base64 strings on a worker pool.
 
     Parameters:
-    - image_path (str): Path to the image file.
-    - encoding (str): The encoding to use for the Base64 string. Default is 'utf-8'.
+    - image_paths (List[str]): Paths to the image files.
+    - encoder (Optional[ImageEncoder]): The encoder to use. Defaults to a shared, cached encoder.
 
     Returns:
-    - Optional[str]: Base64 encoded string of the image, or None if the image cannot be processed.
+    - List[Optional[str]]: One Base64 encoded string, or None, per path, in the same order.
     """
-    if not os.path.exists(image_path):
-        return None
-    
-    mime_type, _ = mimetypes.guess_type(image_path)
-    if mime_type is None or not mime_type.startswith('image'):
-        return None
-    
-    try:
-        with Image.open(image_path) as img:
-            resized_image = __resize_image(img)
-        
-        buffered = BytesIO()
-        resized_image.save(buffered, format=resized_image.format)
-        encoded_string = base64.b64encode(buffered.getvalue()).decode(encoding)
-        return f"data:{mime_type};base64,{encoded_string}"
-    except IOError as _:
-        return None
+    return (encoder or default_image_encoder).encode_many(image_paths)
 
-def encode_clipboard_image(encoding: str = 'utf-8') -> Optional[str]:
+def encode_clipboard_image(encoding: str = 'utf-8', encoder: Optional[ImageEncoder] = None) -> Optional[str]:
     """
     Encode an image from the clipboard to a Base64 string after resizing it to fit within the specified dimensions.
 
     Parameters:
     - encoding (str): The encoding to use for the Base64 string. Default is 'utf-8'.
+    - encoder (Optional[ImageEncoder]): The encoder to use. Defaults to a shared, cached encoder.
 
     Returns:
     - Optional[str]: Base64 encoded string of the image, or None if no image is found in the clipboard.
     """
+    from PIL import Image
+    from PIL import ImageGrab
+
+    if encoder is None:
+        encoder = default_image_encoder if encoding == 'utf-8' else ImageEncoder(encoding=encoding, cache_size=0)
     try:
         image = ImageGrab.grabclipboard()
         if image is None or not isinstance(image, Image.Image):
             return None
-        
-        resized_image = __resize_image(image)
-        
-        buffered = BytesIO()
-        resized_image.save(buffered, format=resized_image.format)
-        mime_type = Image.MIME[resized_image.format]
-        encoded_string = base64.b64encode(buffered.getvalue()).decode(encoding)
-        return f"data:{mime_type};base64,{encoded_string}"
+        return encoder.encode_image(image)
     except Exception as _:
         return None
 
@@ -108,6 +85,10 @@ class TextContentTemplate(PromptTemplate):
     def __init__(self, template: StringPromptTemplate) -> None:
         self.__template: StringPromptTemplate = template
 
+    @property
+    def static(self) -> bool:
+        return self.__template is None or self.__template.static
+
     def format(self, **kwargs: Any) -> Any:
         if self.__template is None:
             return None
@@ -115,19 +96,46 @@ class TextContentTemplate(PromptTemplate):
         return text_content
 
 class ImageContentTemplate(PromptTemplate):
+    """
+    An image given by `image_url`, by `image_path`, or by the value of `key` at format time. Local file
+    paths are encoded to data URLs with `encoder`, or with the shared cached encoder.
+
+    A value passed through `key` is used as a URL as it is. Only with `allow_local_files` is a local
+    path or `file://` URL read from disk, since the value may come from untrusted input.
+    """
 
-    def __init__(self, image_url: str = None, key: str = None, detail: str = "low") -> None:
+    def __init__(self, image_url: str = None, key: str = None, detail: str = "low", image_path: str = None, encoder: Optional[ImageEncoder] = None, allow_local_files: bool = False) -> None:
         self.__key: str = key
         self.__image_url: str = image_url
+        self.__image_path: str = image_path
         self.__detail = detail
+        self.__encoder: ImageEncoder = encoder or default_image_encoder
+        self.__allow_local_files: bool = allow_local_files
+
+    def __to_url(self, value: str) -> Optional[str]:
+        if not self.__allow_local_files:
+            return value
+        if value.startswith("file://"):
+            return self.__encoder.encode(url2pathname(urlparse(value).path))
+        if "://" not in value and not value.startswith("data:") and os.path.isfile(value):
+            return self.__encoder.encode(value)
+        return value
+
+    @property
+    def static(self) -> bool:
+        return bool(self.__image_url)
 
     def format(self, **kwargs: Any) -> Any:
         image_content = None
+        url = None
         if self.__image_url:
-            image_url = ImageURL(url=self.__image_url, detail=self.__detail)
-            image_content = ImageContent(image_url=image_url, type="image_url")
+            url = self.__image_url
+        elif self.__image_path:
+            url = self.__encoder.encode(self.__image_path)
         elif self.__key and kwargs.get(self.__key, None):
-            image_url = ImageURL(url=kwargs.get(self.__key, None), detail=self.__detail)
+            url = self.__to_url(kwargs.get(self.__key, None))
+        if url:
+            image_url = ImageURL(url=url, detail=self.__detail)
             image_content = ImageContent(image_url=image_url, type="image_url")
 
         return image_content
@@ -136,6 +144,10 @@ class ContentTemplate(PromptTemplate):
     def __init__(self, templates: List[PromptTemplate]) -> None:
         self.__templates: List[PromptTemplate] = templates
 
+    @property
+    def static(self) -> bool:
+        return all(template.static for template in self.__templates)
+
     def format(self, **kwargs: Any) -> Any:
         content_list = []
         for template in self.__templates:
@@ -145,6 +157,11 @@ class ContentTemplate(PromptTemplate):
         return content_list
 
 class MessageTemplate(ABC):
+    @property
+    def static(self) -> bool:
+        """Whether `to_message` returns the same message whatever the arguments."""
+        return False
+
     @abstractmethod
     def to_message(self, **kwargs: Any) -> Message:
         pass
@@ -162,6 +179,10 @@ class ToolMessageTemplate(MessageTemplate):
         self.__template = template
         self.__tool_call_id = tool_call_id
 
+    @property
+    def static(self) -> bool:
+        return self.__template.static
+
     def to_message(self, **kwargs: Any) -> AIMessage:
         if self.__tool_call_id:
             return ToolMessage(role="tool", content=self.__template.format(**kwargs), tool_call_id=self.__tool_call_id)
@@ -180,6 +201,10 @@ class AIMessageTemplate(MessageTemplate):
         self.__name = name
         self.__tool_calls = tool_calls
 
+    @property
+    def static(self) -> bool:
+        return self.__template is None or self.__template.static
+
     def to_message(self, **kwargs: Any) -> AIMessage:
         message = AIMessage(role="assistant")
         if self.__template:
@@ -200,6 +225,10 @@ class SystemMessageTemplate(MessageTemplate):
         self.__template = template
         self.__name = name
 
+    @property
+    def static(self) -> bool:
+        return self.__template.static
+
     def to_message(self, **kwargs: Any) -> Message:
         if self.__name:
             return SystemMessage(
@@ -223,6 +252,10 @@ class UserMessageTemplate(MessageTemplate):
         self.__template = template
         self.__name = name
 
+    @property
+    def static(self) -> bool:
+        return self.__template.static
+
     def to_message(self, **kwargs: Any) -> Message:
         if self.__name:
             return UserMessage(
@@ -237,24 +270,43 @@ class UserMessageTemplate(MessageTemplate):
             )
 
 class ChatTemplate(PromptTemplate):
+    """
+    A list of message templates and placeholders. Messages whose templates are static are rendered once,
+    at construction, and every `format` hands out copies of them.
+    """
 
     def __init__(self, message_template_list: List[MessageTemplate]) -> None:
         self.__message_template_list: List[MessageTemplate] = []
+        self.__compiled: List[Tuple[str, Any]] = []
         for message_template in message_template_list:
             self.__message_template_list.append(message_template)
+            if isinstance(message_template, MessagePlaceholder):
+                self.__compiled.append(("placeholder", message_template.placeholder_key))
+            elif isinstance(message_template, MessageTemplate):
+                if message_template.static:
+                    self.__compiled.append(("message", message_template.to_message()))
+                else:
+                    self.__compiled.append(("template", message_template))
+
+    @property
+    def static(self) -> bool:
+        return all(kind == "message" for kind, _ in self.__compiled)
 
     def format(self, **kwargs: Any) -> Any:
         messages = []
-        for message_template in self.__message_template_list:
-            if isinstance(message_template, MessagePlaceholder):
-                messages.extend(kwargs.get(message_template.placeholder_key))
-            elif isinstance(message_template, MessageTemplate):
-                message = message_template.to_message(**kwargs)
-                messages.append(message)
+        for kind, value in self.__compiled:
+            if kind == "placeholder":
+                messages.extend(kwargs.get(value))
+            elif kind == "message":
+                messages.append(value.copy())
+            else:
+                messages.append(value.to_message(**kwargs))
         return messages
 
 __all__ = [
+    "default_image_encoder",
     "encode_image",
+    "encode_images",
     "encode_clipboard_image",
     "TextContentTemplate",
     "ImageContentTemplate",
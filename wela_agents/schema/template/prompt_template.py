@@ -2,31 +2,84 @@
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import Tuple
+from typing import Optional
 from string import Formatter
 
+Segment = Tuple[str, Optional[str], str, Optional[str]]
+
 class PromptTemplate:
+    @property
+    def static(self) -> bool:
+        """Whether `format` returns the same result whatever the arguments."""
+        return False
+
     def format(self, **kwargs: Any) -> Any:
         pass
 
 class StringPromptTemplate(PromptTemplate):
+    """
+    A `str.format` style template that is parsed once into literal and field segments.
+
+    Plain `{name}` fields, optionally with a conversion and a format spec, are rendered from the
+    segments; templates using positional, attribute, index or nested fields are handed to
+    `string.Formatter` as they are.
+    """
+
+    __formatter: Formatter = Formatter()
 
     def __init__(self, template: str) -> None:
         self.__template: str = template
+        self.__segments: Optional[List[Segment]] = self.__compile(template)
+        self.__static: bool = self.__segments is not None and all(field is None for _, field, _, _ in self.__segments)
+        self.__rendered: Optional[str] = self.__render({}) if self.__static else None
+
+    @staticmethod
+    def __compile(template: Optional[str]) -> Optional[List[Segment]]:
+        if template is None:
+            return None
+        try:
+            segments = list(StringPromptTemplate.__formatter.parse(template))
+        except ValueError:
+            return None
+        for _, field_name, format_spec, _ in segments:
+            if field_name is not None and (not field_name.isidentifier() or "{" in format_spec):
+                return None
+        return segments
+
+    @property
+    def template(self) -> str:
+        return self.__template
+
+    @property
+    def static(self) -> bool:
+        return self.__static
+
+    def __render(self, kwargs: Dict[str, Any]) -> str:
+        parts: List[str] = []
+        for literal, field_name, format_spec, conversion in self.__segments:
+            parts.append(literal)
+            if field_name is not None:
+                value = kwargs[field_name]
+                if conversion:
+                    value = self.__formatter.convert_field(value, conversion)
+                parts.append(format(value, format_spec))
+        return "".join(parts)
 
     def format(self, **kwargs: Any) -> Any:
         if self.__template is None:
             return None
-        return Formatter().format(self.__template, **kwargs)
+        if self.__rendered is not None:
+            return self.__rendered
+        if self.__segments is None:
+            return self.__formatter.vformat(self.__template, (), kwargs)
+        return self.__render(kwargs)
 
 class FewShotTemplate(StringPromptTemplate):
 
     def __init__(self, prefix: str="", suffix: str="", examples: List[Dict]=[], example_template: PromptTemplate="") -> None:
-        template = prefix
-        for example in examples:
-            template +=  example_template.format(**example)
-        template += suffix
-
-        PromptTemplate.__init__(self, template=template)
+        template = "".join([prefix, *[example_template.format(**example) for example in examples], suffix])
+        super().__init__(template)
 
 __all__ = [
     "PromptTemplate",
@@ -8,6 +8,7 @@ from typing import List
 from typing import Callable
 
 from wela_agents.toolkit.tool_result import ToolResult
+from wela_agents.utils.concurrency import run_in_thread
 
 class Tool(ABC):
     def __init__(self, name: str, description: str, required: List[str], **properties: Any) -> None:
@@ -20,10 +21,17 @@ class Tool(ABC):
     def _invoke(self, callback: Callable = None, **kwargs: Any) -> ToolResult:
         pass
 
+    async def _ainvoke(self, callback: Callable = None, **kwargs: Any) -> ToolResult:
+        return await run_in_thread(self._invoke, callback, **kwargs)
+
     def run(self, callback: Callable = None, **kwargs: Any) -> ToolResult:
         result = self._invoke(callback, **kwargs)
         return result
 
+    async def arun(self, callback: Callable = None, **kwargs: Any) -> ToolResult:
+        result = await self._ainvoke(callback, **kwargs)
+        return result
+
     def to_tool_param(self) -> Dict[str, Any]:
         return {
             "type": "function",
@@ -1,9 +1,15 @@
 
 import json
+import time
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
 
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import Tuple
+from typing import Optional
 
 from wela_agents.toolkit.tool import Tool
 from wela_agents.toolkit.tool_result import ToolResult
@@ -24,24 +30,30 @@ class Toolkit(Dict[str, Tool]):
     def set_callback(self, callback: ToolCallback) -> None:
         self.__callback = callback
 
-    def run(self, function: Function) -> ToolResult:
+    def __resolve(self, function: Function) -> Tuple[Optional[Tool], Dict[str, Any], Optional[ToolResult]]:
         tool_name = function.get("name")
         arguments_str = function.get("arguments")
 
         try:
             arguments = json.loads(arguments_str)
         except json.JSONDecodeError:
-            return ToolResult(result="Error: Invalid JSON format for arguments.")
+            return None, {}, ToolResult(result="Error: Invalid JSON format for arguments.")
 
         if tool_name not in self:
-            return ToolResult(result=f"Error: Tool '{tool_name}' not found.")
+            return None, arguments, ToolResult(result=f"Error: Tool '{tool_name}' not found.")
 
-        tool = self[tool_name]
+        return self[tool_name], arguments, None
+
+    def run(self, function: Function) -> ToolResult:
+        tool, arguments, error = self.__resolve(function)
+        if error:
+            return error
 
         if self.__callback:
-            event = ToolEvent(tool_name, arguments)
+            event = ToolEvent(tool.name, arguments)
             self.__callback.before_tool_call(event)
 
+        start = time.perf_counter()
         try:
             if self.__callback:
                 result = tool.run(self.__callback.update_progress, **arguments)
@@ -51,11 +63,57 @@ class Toolkit(Dict[str, Tool]):
             return ToolResult(result=f"Error: An error occurred while running the tool - {str(e)}")
 
         if self.__callback:
-            event = ToolEvent(tool_name, arguments, result)
+            event = ToolEvent(tool.name, arguments, result, time.perf_counter() - start)
+            self.__callback.after_tool_call(event)
+
+        return result
+
+    async def arun(self, function: Function) -> ToolResult:
+        tool, arguments, error = self.__resolve(function)
+        if error:
+            return error
+
+        if self.__callback:
+            event = ToolEvent(tool.name, arguments)
+            self.__callback.before_tool_call(event)
+
+        start = time.perf_counter()
+        try:
+            if self.__callback:
+                result = await tool.arun(self.__callback.update_progress, **arguments)
+            else:
+                result = await tool.arun(None, **arguments)
+        except Exception as e:
+            return ToolResult(result=f"Error: An error occurred while running the tool - {str(e)}")
+
+        if self.__callback:
+            event = ToolEvent(tool.name, arguments, result, time.perf_counter() - start)
             self.__callback.after_tool_call(event)
 
         return result
 
+    def run_many(self, functions: List[Function], max_workers: Optional[int] = None) -> List[ToolResult]:
+        """
+        Run several tool calls on a bounded thread pool. Results keep the order of `functions`.
+        """
+        if len(functions) <= 1 or max_workers == 1:
+            return [self.run(function) for function in functions]
+        with ThreadPoolExecutor(max_workers=min(len(functions), max_workers or len(functions))) as executor:
+            return list(executor.map(self.run, functions))
+
+    async def arun_many(self, functions: List[Function], max_concurrency: Optional[int] = None) -> List[ToolResult]:
+        """
+        Run several tool calls as concurrent coroutines. Results keep the order of `functions`.
+        """
+        if max_concurrency is None:
+            return list(await asyncio.gather(*[self.arun(function) for function in functions]))
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async def bounded_run(function: Function) -> ToolResult:
+            async with semaphore:
+                return await self.arun(function)
+        return list(await asyncio.gather(*[bounded_run(function) for function in functions]))
+
     def to_tools_param(self) -> List[Dict[str, Any]]:
         return [tool.to_tool_param() for tool in self.values()]
 
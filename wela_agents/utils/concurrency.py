@@ -0,0 +1,43 @@
+
+import asyncio
+
+from typing import Any
+from typing import TypeVar
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import AsyncGenerator
+
+T = TypeVar("T")
+
+_STOP = object()
+
+def _next_or_stop(iterator: Iterator[T]) -> Any:
+    try:
+        return next(iterator)
+    except StopIteration:
+        return _STOP
+
+async def run_in_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+async def iterate_in_thread(iterator: Iterator[T]) -> AsyncGenerator[T, None]:
+    """
+    Expose a blocking iterator as an async generator, pulling every item on a worker thread.
+    """
+    iterator = iter(iterator)
+    while True:
+        item = await asyncio.to_thread(_next_or_stop, iterator)
+        if item is _STOP:
+            break
+        yield item
+
+async def iterate_async(items: Iterable[T]) -> AsyncGenerator[T, None]:
+    for item in items:
+        yield item
+
+__all__ = [
+    "run_in_thread",
+    "iterate_in_thread",
+    "iterate_async"
+]
@@ -0,0 +1,214 @@
+
+import os
+import json
+import base64
+import threading
+import numpy as np
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Optional
+from typing import Sequence
+from typing_extensions import TypedDict
+
+class VectorHit(TypedDict):
+    id: int
+    """The row of the vector, in insertion order."""
+
+    score: float
+    """Cosine similarity to the query."""
+
+    payload: Dict[str, Any]
+
+class NumpyVectorStore:
+    """
+    An in-process, append-only vector store searched by cosine similarity.
+
+    Vectors are normalised on insert and kept in one contiguous float32 matrix whose capacity doubles
+    as it grows, so a search is a single matrix product followed by a partial sort. With `directory`,
+    every insert is appended to a raw float32 file and a JSON lines file of payloads; reopening maps the
+    vector file instead of reading it, and the matrix is only copied once the store grows again.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.__directory: Optional[str] = directory
+        self.__lock: threading.Lock = threading.Lock()
+        self.__dimension: Optional[int] = None
+        self.__matrix: Optional[np.ndarray] = None
+        self.__count: int = 0
+        self.__payloads: List[Dict[str, Any]] = []
+        self.__payloads_dirty: bool = False
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.__open()
+
+    def __path(self, name: str) -> str:
+        return os.path.join(self.__directory, name)
+
+    def __open(self) -> None:
+        if not os.path.exists(self.__path("meta.json")):
+            return
+        with open(self.__path("meta.json"), "r") as f:
+            self.__dimension = json.load(f)["dimension"]
+        payloads = self.__read_payloads()
+        vector_bytes = os.path.getsize(self.__path("vectors.f32")) if os.path.exists(self.__path("vectors.f32")) else 0
+        rows = min(len(payloads), vector_bytes // (4 * self.__dimension))
+        # an insert interrupted between the two files leaves one of them ahead; cut both back to the
+        # rows they share, so that the next insert appends vectors and payloads at the same row
+        if vector_bytes != rows * 4 * self.__dimension:
+            with open(self.__path("vectors.f32"), "ab") as f:
+                f.truncate(rows * 4 * self.__dimension)
+        if len(payloads) != rows or self.__payloads_dirty:
+            self.__write_payloads(payloads[:rows])
+        self.__payloads = payloads[:rows]
+        self.__count = rows
+        if rows:
+            self.__matrix = np.memmap(self.__path("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, self.__dimension))
+
+    def __read_payloads(self) -> List[Dict[str, Any]]:
+        # a crash while appending may leave the last line cut short; it is dropped with its row
+        self.__payloads_dirty = False
+        payloads: List[Dict[str, Any]] = []
+        if not os.path.exists(self.__path("payloads.jsonl")):
+            return payloads
+        with open(self.__path("payloads.jsonl"), "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        for idx, line in enumerate(lines):
+            if not line:
+                continue
+            try:
+                payloads.append(json.loads(line))
+            except json.JSONDecodeError:
+                if idx != len(lines) - 1:
+                    raise
+                self.__payloads_dirty = True
+        return payloads
+
+    def __write_payloads(self, payloads: List[Dict[str, Any]]) -> None:
+        temp = self.__path("payloads.jsonl.tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(payload, ensure_ascii=False) + "\n" for payload in payloads))
+        os.replace(temp, self.__path("payloads.jsonl"))
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.__dimension
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __normalize(self, vectors: Any) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def __reserve(self, rows: int) -> None:
+        # must hold the lock; a memory-mapped matrix is read-only, so growing copies it into memory
+        capacity = 0 if self.__matrix is None else self.__matrix.shape[0]
+        if self.__count + rows <= capacity and not isinstance(self.__matrix, np.memmap):
+            return
+        matrix = np.empty((max(16, capacity * 2, self.__count + rows), self.__dimension), dtype=np.float32)
+        if self.__count:
+            matrix[:self.__count] = self.__matrix[:self.__count]
+        self.__matrix = matrix
+
+    def __persist(self, vectors: np.ndarray, payloads: List[Dict[str, Any]]) -> None:
+        if not os.path.exists(self.__path("meta.json")):
+            with open(self.__path("meta.json"), "w") as f:
+                json.dump({"dimension": self.__dimension}, f)
+        with open(self.__path("vectors.f32"), "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.__path("payloads.jsonl"), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(payload, ensure_ascii=False) + "\n" for payload in payloads))
+
+    def add(self, vectors: Any, payloads: Sequence[Dict[str, Any]]) -> List[int]:
+        """
+        Append vectors with their payloads and return their ids.
+        """
+        vectors = self.__normalize(vectors)
+        payloads = list(payloads)
+        assert vectors.shape[0] == len(payloads), "every vector needs a payload"
+        if not payloads:
+            return []
+        with self.__lock:
+            if self.__dimension is None:
+                self.__dimension = int(vectors.shape[1])
+            assert vectors.shape[1] == self.__dimension, f"expected vectors of dimension {self.__dimension}"
+            self.__reserve(len(payloads))
+            start = self.__count
+            self.__matrix[start:start + len(payloads)] = vectors
+            self.__payloads.extend(payloads)
+            if self.__directory:
+                self.__persist(vectors, payloads)
+            self.__count += len(payloads)
+            return list(range(start, self.__count))
+
+    def __snapshot(self) -> Tuple[Optional[np.ndarray], List[Dict[str, Any]]]:
+        # rows are never changed once written, so a search may run on a snapshot outside the lock
+        with self.__lock:
+            if not self.__count:
+                return None, []
+            return self.__matrix[:self.__count], self.__payloads[:self.__count]
+
+    def search(self, queries: Any, limit: int, score_threshold: Optional[float] = None) -> List[List[VectorHit]]:
+        """
+        Return the `limit` most similar vectors for every query, best first.
+        """
+        queries = self.__normalize(queries)
+        matrix, payloads = self.__snapshot()
+        if matrix is None or limit <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        scores = queries @ matrix.T
+        k = min(limit, matrix.shape[0])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < matrix.shape[0] else np.tile(np.arange(k), (queries.shape[0], 1))
+        results: List[List[VectorHit]] = []
+        for row, candidates in enumerate(top):
+            candidates = candidates[np.argsort(-scores[row, candidates], kind="stable")]
+            results.append([
+                VectorHit(id=int(idx), score=float(scores[row, idx]), payload=payloads[idx])
+                for idx in candidates
+                if score_threshold is None or scores[row, idx] >= score_threshold
+            ])
+        return results
+
+    def last(self, n: int) -> List[VectorHit]:
+        """Return the `n` most recently added vectors, oldest first."""
+        _, payloads = self.__snapshot()
+        start = max(0, len(payloads) - n)
+        return [VectorHit(id=idx, score=1.0, payload=payloads[idx]) for idx in range(start, len(payloads))]
+
+    def payloads(self) -> List[Dict[str, Any]]:
+        return self.__snapshot()[1]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__matrix = None
+            self.__count = 0
+            self.__payloads = []
+            self.__dimension = None
+            if self.__directory:
+                for name in ("meta.json", "vectors.f32", "payloads.jsonl"):
+                    if os.path.exists(self.__path(name)):
+                        os.remove(self.__path(name))
+
+    def export_state(self) -> Dict[str, Any]:
+        """Return the vectors and payloads as JSON-compatible data, with the vectors base64-encoded."""
+        matrix, payloads = self.__snapshot()
+        return {
+            "dimension": self.__dimension,
+            "vectors": base64.b64encode(matrix.tobytes()).decode("ascii") if matrix is not None else "",
+            "payloads": payloads
+        }
+
+    def import_state(self, state: Dict[str, Any]) -> None:
+        self.clear()
+        if state and state.get("payloads", None):
+            vectors = np.frombuffer(base64.b64decode(state["vectors"]), dtype=np.float32).reshape(-1, state["dimension"])
+            self.add(vectors, state["payloads"])
+
+__all__ = [
+    "VectorHit",
+    "NumpyVectorStore"
+]